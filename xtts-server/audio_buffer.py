@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Audio Buffer - In-memory synthesized audio shared by every consumer
+
+A synthesis result is encoded to WAV exactly once, in memory. The same
+immutable bytes object is handed to the HTTP response and to the OBS
+WebSocket fan-out, so no temporary file is written and nothing is re-read.
+Other encodings (see audio_formats.py) are memoized the same way, one per
+format and sample rate.
+"""
+
+import struct
+import threading
+import numpy as np
+from typing import Optional, Callable, Dict, Hashable
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+WAV_HEADER_SIZE = 44
+PCM16_MAX = 32767
+
+# ============================================================================
+# ENCODING HELPERS
+# ============================================================================
+
+def wav_header(sample_rate: int, num_samples: Optional[int], channels: int = 1, bits: int = 16) -> bytes:
+    """
+    Build a canonical 44-byte PCM WAV header.
+
+    Args:
+        sample_rate: Sample rate in Hz
+        num_samples: Samples per channel, or None for an open-ended stream
+        channels: Number of channels
+        bits: Bits per sample
+
+    Returns:
+        Header bytes
+    """
+    block_align = channels * bits // 8
+    if num_samples is None:
+        data_size = 0xFFFFFFFF - 36  # Unknown length (streaming)
+    else:
+        data_size = num_samples * block_align
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate,
+        sample_rate * block_align, block_align, bits,
+        b'data', data_size
+    )
+
+
+def float_to_pcm16(samples: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert float samples in [-1, 1] to int16 PCM.
+
+    Args:
+        samples: float32 mono samples
+        out: Optional int16 array to write into (avoids an allocation)
+
+    Returns:
+        int16 array
+    """
+    if out is None:
+        out = np.empty(samples.shape[0], dtype=np.int16)
+    np.multiply(np.clip(samples, -1.0, 1.0), PCM16_MAX, out=out, casting='unsafe')
+    return out
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """
+    Encode float samples as a 16-bit mono WAV file in memory.
+
+    The header and PCM payload are written into a single preallocated
+    buffer (no header/payload concatenation). The conversion still makes a
+    clipped float32 copy of the samples, and bytes() copies the buffer once
+    more into an immutable result.
+    """
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    buffer = bytearray(WAV_HEADER_SIZE + samples.shape[0] * 2)
+    buffer[:WAV_HEADER_SIZE] = wav_header(sample_rate, samples.shape[0])
+    pcm_view = np.frombuffer(buffer, dtype=np.int16, offset=WAV_HEADER_SIZE)
+    float_to_pcm16(samples, out=pcm_view)
+    return bytes(buffer)
+
+# ============================================================================
+# AUDIO RESULT CLASS
+# ============================================================================
+
+class AudioResult:
+    """
+    Synthesized audio held in memory.
+
+    Encodings are produced lazily and memoized, so the HTTP response, the
+    OBS broadcast and any other consumer share the same bytes object.
+    Each encoding key is encoded at most once, even when several consumers
+    ask for it at the same time.
+    """
+
+    def __init__(self, samples: np.ndarray, sample_rate: int):
+        """
+        Args:
+            samples: float32 mono samples in [-1, 1]
+            sample_rate: Sample rate in Hz
+        """
+        self.samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        self.sample_rate = sample_rate
+        self._wav_bytes: Optional[bytes] = None
+        self._encodings: Dict[Hashable, bytes] = {}
+        self._encoding_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def num_samples(self) -> int:
+        return self.samples.shape[0]
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds."""
+        return self.num_samples / self.sample_rate if self.sample_rate else 0.0
+
+    @property
+    def wav_bytes(self) -> bytes:
+        """16-bit PCM WAV encoding (encoded once on first access)."""
+        if self._wav_bytes is None:
+            with self._lock:
+                if self._wav_bytes is None:
+                    self._wav_bytes = encode_wav(self.samples, self.sample_rate)
+        return self._wav_bytes
+
+    @property
+    def wav_ready(self) -> bool:
+        """True once the WAV encoding exists (wav_bytes returns without encoding)."""
+        return self._wav_bytes is not None
+
+    @property
+    def pcm_view(self) -> memoryview:
+        """Raw little-endian int16 PCM, as a view into the WAV encoding."""
+        return memoryview(self.wav_bytes)[WAV_HEADER_SIZE:]
+
+    def get_encoding(self, key: Hashable) -> Optional[bytes]:
+        """Memoized encoding for key, or None if not encoded yet."""
+        return self._encodings.get(key)
+
+    def encoding(self, key: Hashable, encode: Callable[[np.ndarray, int], bytes]) -> bytes:
+        """
+        Encoding for key, produced by encode(samples, sample_rate) on first use.
+
+        Concurrent callers for the same key wait for the first one instead
+        of encoding again; different keys encode in parallel.
+        """
+        data = self._encodings.get(key)
+        if data is not None:
+            return data
+        with self._lock:
+            key_lock = self._encoding_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            data = self._encodings.get(key)
+            if data is None:
+                data = encode(self.samples, self.sample_rate)
+                self._encodings[key] = data
+        return data
+
+    def detached(self) -> "AudioResult":
+        """
+        A new result sharing the samples and the WAV encoding (if already made),
+        without the other memoized encodings. Used by the output cache so the
+        formats a caller encodes never grow a cached entry.
+        """
+        copy = AudioResult(self.samples, self.sample_rate)
+        copy._wav_bytes = self._wav_bytes
+        return copy
+
+    def __repr__(self) -> str:
+        return f"AudioResult(samples={self.num_samples}, sample_rate={self.sample_rate}, duration={self.duration:.2f}s)"
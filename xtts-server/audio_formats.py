@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Audio Formats - Output format negotiation and a bounded encoder pool
+
+Every endpoint used to answer with 24 kHz 16-bit WAV. Clients can now ask
+for a compressed format and/or another sample rate:
+
+- `format=` parameter (form field on /v1/synthesize and /v1/clone-voice,
+  query parameter on /ws/audio): wav, flac, opus (Ogg Opus) or mp3
+- `Accept` header (HTTP only), e.g. `audio/ogg;q=1, audio/mpeg;q=0.8`;
+  an optional `rate=` media type parameter selects the sample rate
+- `sample_rate=` parameter (overrides the rate from Accept)
+
+Compressed encodings go through libsndfile (the soundfile package); a
+format is only offered when the installed libsndfile supports it (Opus
+needs libsndfile >= 1.0.29, MP3 >= 1.1.0). Encoding runs in the
+EncoderPool, off the event loop, and is memoized in the AudioResult, so
+one message is encoded once per format no matter how many HTTP and OBS
+consumers ask for it.
+"""
+
+import io
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple, NamedTuple
+
+import numpy as np
+
+from audio_buffer import AudioResult, encode_wav
+from dsp import resample
+from inference_executor import InferenceExecutor
+
+try:
+    import soundfile as sf
+except ImportError:
+    sf = None
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+DEFAULT_FORMAT = "wav"
+SAMPLE_RATE_RANGE = (8000, 48000)
+
+# libsndfile container/subtype per format; sample_rates=None means any rate
+OUTPUT_FORMATS: Dict[str, Dict[str, Any]] = {
+    "wav": {
+        "media_type": "audio/wav",
+        "extension": "wav",
+        "container": "WAV",
+        "subtype": "PCM_16",
+        "sample_rates": None,
+    },
+    "flac": {
+        "media_type": "audio/flac",
+        "extension": "flac",
+        "container": "FLAC",
+        "subtype": "PCM_16",
+        "sample_rates": None,
+    },
+    "opus": {
+        "media_type": "audio/ogg; codecs=opus",
+        "extension": "ogg",
+        "container": "OGG",
+        "subtype": "OPUS",
+        "sample_rates": (8000, 12000, 16000, 24000, 48000),
+    },
+    "mp3": {
+        "media_type": "audio/mpeg",
+        "extension": "mp3",
+        "container": "MP3",
+        "subtype": "MPEG_LAYER_III",
+        "sample_rates": (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000),
+    },
+}
+
+FORMAT_ALIASES = {
+    "wave": "wav",
+    "ogg": "opus",
+    "ogg_opus": "opus",
+    "mpeg": "mp3",
+}
+
+# Accept header media types (without parameters) -> format
+MEDIA_TYPES = {
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+    "audio/vnd.wave": "wav",
+    "audio/flac": "flac",
+    "audio/x-flac": "flac",
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/*": DEFAULT_FORMAT,
+    "*/*": DEFAULT_FORMAT,
+}
+
+ENCODER_CONFIG = {
+    "workers": 2,          # Concurrent encodes (libsndfile releases the GIL)
+    "max_queue": 64,       # Encodes allowed to wait; past that ExecutorBusy (503)
+}
+
+# ============================================================================
+# EXCEPTIONS
+# ============================================================================
+
+class UnsupportedFormat(ValueError):
+    """Requested format/sample rate cannot be produced (400, or 406 for Accept)."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+# ============================================================================
+# OUTPUT FORMAT
+# ============================================================================
+
+class OutputFormat(NamedTuple):
+    """A negotiated output: format name and sample rate (None = source rate)."""
+    name: str = DEFAULT_FORMAT
+    sample_rate: Optional[int] = None
+
+    @property
+    def spec(self) -> Dict[str, Any]:
+        return OUTPUT_FORMATS[self.name]
+
+    @property
+    def media_type(self) -> str:
+        return self.spec["media_type"]
+
+    @property
+    def extension(self) -> str:
+        return self.spec["extension"]
+
+    def target_rate(self, source_rate: int) -> int:
+        """Output sample rate for audio produced at source_rate."""
+        rate = self.sample_rate or source_rate
+        allowed = self.spec["sample_rates"]
+        if allowed and rate not in allowed:
+            # Only reachable for the source rate; requested rates are validated
+            rate = min(allowed, key=lambda r: (abs(r - rate), -r))
+        return rate
+
+    def is_native_wav(self, source_rate: int) -> bool:
+        """True when this is the plain WAV every result already carries."""
+        return self.name == "wav" and self.target_rate(source_rate) == source_rate
+
+    def key(self, source_rate: int) -> Tuple[str, int]:
+        """Memoization key in AudioResult."""
+        return (self.name, self.target_rate(source_rate))
+
+
+@lru_cache(maxsize=None)
+def is_available(name: str) -> bool:
+    """True when the installed libsndfile can write this format."""
+    if name == "wav":
+        return True
+    if sf is None or name not in OUTPUT_FORMATS:
+        return False
+    spec = OUTPUT_FORMATS[name]
+    try:
+        return spec["subtype"] in sf.available_subtypes(spec["container"])
+    except Exception:
+        return False
+
+
+def available_formats() -> List[str]:
+    return [name for name in OUTPUT_FORMATS if is_available(name)]
+
+# ============================================================================
+# NEGOTIATION
+# ============================================================================
+
+def _resolve_name(name: str) -> str:
+    name = name.strip().lower()
+    return FORMAT_ALIASES.get(name, name)
+
+
+def parse_accept(header: str) -> List[Tuple[str, Dict[str, str], float]]:
+    """
+    Parse an Accept header into (media_type, params, q), highest q first.
+
+    Entries with equal q keep the order in which the client listed them.
+    """
+    entries = []
+    for part in header.split(","):
+        fields = [field.strip() for field in part.split(";")]
+        media_type = fields[0].lower()
+        if not media_type:
+            continue
+        params = {}
+        for field in fields[1:]:
+            if "=" in field:
+                key, value = field.split("=", 1)
+                params[key.strip().lower()] = value.strip().strip('"')
+        try:
+            q = float(params.pop("q", 1.0))
+        except ValueError:
+            q = 0.0
+        entries.append((media_type, params, q))
+    return sorted(entries, key=lambda entry: -entry[2])
+
+
+def _validate_rate(name: str, sample_rate: int) -> int:
+    low, high = SAMPLE_RATE_RANGE
+    if not low <= sample_rate <= high:
+        raise UnsupportedFormat(f"sample_rate must be between {low} and {high} Hz")
+    allowed = OUTPUT_FORMATS[name]["sample_rates"]
+    if allowed and sample_rate not in allowed:
+        raise UnsupportedFormat(
+            f"{name} supports sample rates {', '.join(str(r) for r in allowed)}"
+        )
+    return sample_rate
+
+
+def negotiate(format: Optional[str] = None, accept: Optional[str] = None,
+              sample_rate: Optional[int] = None) -> OutputFormat:
+    """
+    Pick the output format for a request.
+
+    An explicit format wins over Accept; without either the answer is WAV at
+    the source rate, as before. A rate= parameter on the chosen Accept entry
+    is used when sample_rate is not given. An Accept header that lists no
+    audio type at all (e.g. a plain `application/json` client) is ignored.
+
+    Raises:
+        UnsupportedFormat: Unknown/unavailable format or invalid sample rate
+                           (status_code 406 when Accept lists only audio types
+                           that cannot be served)
+    """
+    if format:
+        name = _resolve_name(format)
+        if name not in OUTPUT_FORMATS:
+            raise UnsupportedFormat(
+                f"Unknown format '{format}'. Available: {', '.join(available_formats())}"
+            )
+        if not is_available(name):
+            raise UnsupportedFormat(f"Format '{name}' is not supported by the installed libsndfile")
+    elif accept:
+        name = None
+        entries = parse_accept(accept)
+        for media_type, params, q in entries:
+            candidate = MEDIA_TYPES.get(media_type)
+            if q <= 0 or candidate is None or not is_available(candidate):
+                continue
+            name = candidate
+            if sample_rate is None and "rate" in params:
+                try:
+                    sample_rate = int(params["rate"])
+                except ValueError:
+                    raise UnsupportedFormat(f"Invalid rate in Accept: {params['rate']}", status_code=406)
+            break
+        if name is None and not any(entry[0].startswith("audio/") for entry in entries):
+            name = DEFAULT_FORMAT
+        if name is None:
+            raise UnsupportedFormat(
+                f"None of the accepted media types can be produced. Available: "
+                f"{', '.join(OUTPUT_FORMATS[n]['media_type'] for n in available_formats())}",
+                status_code=406
+            )
+    else:
+        name = DEFAULT_FORMAT
+
+    if sample_rate is not None:
+        sample_rate = _validate_rate(name, int(sample_rate))
+    return OutputFormat(name, sample_rate)
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+def encode(samples: np.ndarray, sample_rate: int, output_format: OutputFormat) -> bytes:
+    """
+    Encode float32 mono samples in the given format (resampling if needed).
+
+    Returns:
+        Complete file bytes (WAV, FLAC, Ogg Opus or MP3)
+    """
+    target_rate = output_format.target_rate(sample_rate)
+    if target_rate != sample_rate:
+        samples = resample(samples, sample_rate, target_rate)
+        np.clip(samples, -1.0, 1.0, out=samples)
+
+    if output_format.name == "wav":
+        return encode_wav(samples, target_rate)
+
+    if sf is None:
+        raise UnsupportedFormat(f"Format '{output_format.name}' requires the soundfile package")
+    spec = output_format.spec
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, target_rate, format=spec["container"], subtype=spec["subtype"])
+    return buffer.getvalue()
+
+
+def encode_result(result: AudioResult, output_format: OutputFormat) -> bytes:
+    """Encoding of a result in output_format, encoded once and memoized in it."""
+    if output_format.is_native_wav(result.sample_rate):
+        return result.wav_bytes
+    return result.encoding(
+        output_format.key(result.sample_rate),
+        lambda samples, sample_rate: encode(samples, sample_rate, output_format)
+    )
+
+# ============================================================================
+# ENCODER POOL CLASS
+# ============================================================================
+
+class EncoderPool:
+    """Bounded thread pool that encodes results off the event loop."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            config: Overrides for ENCODER_CONFIG
+        """
+        self.config = {**ENCODER_CONFIG, **(config or {})}
+        self.executor = InferenceExecutor(
+            "encoder", self.config["workers"], config={"max_queue": self.config["max_queue"]}
+        )
+        self.stats = {"encoded": 0, "reused": 0}
+
+    def ready(self, result: AudioResult, output_format: OutputFormat) -> Optional[bytes]:
+        """Already-available encoding (no pool round trip), or None."""
+        if output_format.is_native_wav(result.sample_rate):
+            return result.wav_bytes if result.wav_ready else None
+        return result.get_encoding(output_format.key(result.sample_rate))
+
+    async def encode(self, result: AudioResult, output_format: OutputFormat) -> bytes:
+        """
+        Encoded bytes of a result, reusing a memoized encoding when present.
+
+        Raises:
+            ExecutorBusy: Encoder queue full
+        """
+        data = self.ready(result, output_format)
+        if data is not None:
+            self.stats["reused"] += 1
+            return data
+        data = await self.executor.run(encode_result, result, output_format)
+        self.stats["encoded"] += 1
+        return data
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "formats": available_formats(),
+            "executor": self.executor.get_statistics()
+        }
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Audio Spool - Bounded scratch directory for audio that must live on disk
+
+Some steps still need a real file (e.g. copying an uploaded voice into the
+voice library). Those files go to a single spool directory inside the
+project cache instead of tempfile(delete=False) in /tmp. A janitor removes
+expired files and enforces file-count and byte budgets, so a long stream
+can never fill the disk with leftovers. Files written but not yet released
+belong to an in-flight request and are never swept.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, Set
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+SPOOL_DIR = Path(__file__).parent / ".tts-cache" / "spool"
+
+SPOOL_CONFIG = {
+    "max_files": 64,                   # Maximum files kept in the spool
+    "max_bytes": 256 * 1024 * 1024,    # 256MB total
+    "ttl_seconds": 600,                # Files older than this are always removed
+    "janitor_interval_seconds": 60,    # How often the janitor sweeps
+}
+
+# ============================================================================
+# AUDIO SPOOL CLASS
+# ============================================================================
+
+class AudioSpool:
+    """Bounded, self-cleaning directory for short-lived audio files."""
+
+    def __init__(self, spool_dir: Path = SPOOL_DIR, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize spool.
+
+        Args:
+            spool_dir: Directory for spooled files
+            config: Overrides for SPOOL_CONFIG
+        """
+        self.spool_dir = Path(spool_dir)
+        self.config = {**SPOOL_CONFIG, **(config or {})}
+        self.lock = threading.Lock()
+        self.active: Set[str] = set()  # Written and not yet released
+        self._janitor_task: Optional[asyncio.Task] = None
+
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+
+    def write(self, data: bytes, suffix: str = ".wav") -> str:
+        """
+        Write bytes to a new spool file.
+
+        Args:
+            data: File contents
+            suffix: File extension
+
+        Returns:
+            Path of the spooled file
+        """
+        path = str(self.spool_dir / f"{uuid.uuid4().hex}{suffix}")
+        with self.lock:
+            self.active.add(path)
+        try:
+            with open(path, 'wb') as f:
+                f.write(data)
+        except OSError:
+            self.release(path)
+            raise
+        self.sweep()
+        return path
+
+    def release(self, path: Optional[str]):
+        """Delete a spooled file if it exists (it becomes sweepable either way)."""
+        if not path:
+            return
+        with self.lock:
+            self.active.discard(path)
+        try:
+            if os.path.exists(path) and Path(path).parent == self.spool_dir:
+                os.unlink(path)
+        except OSError as e:
+            print(f"⚠️ Failed to release spool file {path}: {e}")
+
+    def sweep(self) -> int:
+        """
+        Remove expired files, then the oldest files until within budget.
+
+        Files still in use (written, not released) are skipped, so the
+        budgets are soft while requests are in flight.
+
+        Returns:
+            Number of files removed
+        """
+        removed = 0
+        now = time.time()
+
+        with self.lock:
+            entries = []
+            for entry in os.scandir(self.spool_dir):
+                if not entry.is_file() or entry.path in self.active:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            entries.sort()  # Oldest first
+            total_bytes = sum(size for _, size, _ in entries)
+            total_files = len(entries)
+
+            for mtime, size, path in entries:
+                expired = now - mtime > self.config["ttl_seconds"]
+                over_budget = (
+                    total_files > self.config["max_files"]
+                    or total_bytes > self.config["max_bytes"]
+                )
+                if not expired and not over_budget:
+                    break
+                try:
+                    os.unlink(path)
+                    removed += 1
+                    total_files -= 1
+                    total_bytes -= size
+                except OSError:
+                    pass
+
+        if removed:
+            print(f"🧹 Spool janitor removed {removed} file(s)")
+        return removed
+
+    async def _janitor_loop(self):
+        """Periodically sweep the spool."""
+        while True:
+            await asyncio.sleep(self.config["janitor_interval_seconds"])
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ Spool janitor error: {e}")
+
+    def start_janitor(self):
+        """Start the janitor task on the running event loop (idempotent)."""
+        self.sweep()
+        if self._janitor_task is None or self._janitor_task.done():
+            self._janitor_task = asyncio.get_running_loop().create_task(self._janitor_loop())
+
+    def stop_janitor(self):
+        """Cancel the janitor task."""
+        if self._janitor_task is not None:
+            self._janitor_task.cancel()
+            self._janitor_task = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get spool statistics."""
+        files = [p for p in self.spool_dir.iterdir() if p.is_file()]
+        return {
+            "files": len(files),
+            "size_mb": sum(p.stat().st_size for p in files) / (1024 * 1024),
+            "max_files": self.config["max_files"],
+            "max_mb": self.config["max_bytes"] / (1024 * 1024),
+            "ttl_seconds": self.config["ttl_seconds"]
+        }
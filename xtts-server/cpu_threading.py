@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+CPU Threading - Torch thread counts and core affinity for inference
+
+Without configuration every engine runs with torch's defaults (one intra-op
+thread per core), so concurrent requests on a CPU-only host fight over the
+same cores. This module lets operators:
+
+- set the process-wide intra-op / inter-op thread counts
+- override the intra-op thread count per engine
+- split the usable cores into N pinned inference slots; every inference
+  thread (executor thread or worker process) takes one slot, pins itself to
+  the slot's cores and uses that many torch threads
+
+Environment variables (read by main.py):
+    TORCH_THREADS           intra-op threads (0 = torch default)
+    TORCH_INTEROP_THREADS   inter-op threads (0 = torch default)
+    ENGINE_THREADS          per-engine intra-op threads, e.g. "xtts-v2=8,styletts2=4"
+    CPU_SLOTS               number of pinned slots (0 = no pinning)
+
+Affinity uses os.sched_setaffinity (Linux, per thread) or psutil (per
+process, e.g. Windows worker processes); without either it is skipped.
+"""
+
+import os
+import sys
+import threading
+from typing import Dict, Any, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+CPU_THREADING_CONFIG = {
+    "intra_op_threads": 0,        # 0 = torch default
+    "interop_threads": 0,         # 0 = torch default (only settable before first use)
+    "engine_threads": {},         # engine name -> intra-op threads
+    "slots": 0,                   # Pinned inference slots (0 = no pinning)
+}
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _torch(import_now: bool = True):
+    """
+    torch, or None when it is not installed. Imported on first use, so the API
+    process binds before paying for it; import_now=False only returns it when
+    something already imported it (status reads).
+    """
+    if not import_now:
+        return sys.modules.get("torch")
+    try:
+        import torch
+    except ImportError:
+        return None
+    return torch
+
+
+def parse_engine_threads(value: str) -> Dict[str, int]:
+    """Parse "xtts-v2=8,styletts2=4" into {"xtts-v2": 8, "styletts2": 4}."""
+    result = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        name, threads = item.split("=", 1)
+        try:
+            result[name.strip()] = int(threads)
+        except ValueError:
+            print(f"⚠️ Ignoring invalid ENGINE_THREADS entry: {item!r}")
+    return result
+
+
+def available_cpus() -> List[int]:
+    """CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    if psutil is not None:
+        try:
+            return sorted(psutil.Process().cpu_affinity())
+        except Exception:
+            pass
+    return list(range(os.cpu_count() or 1))
+
+
+def split_slots(cpus: List[int], slots: int) -> List[List[int]]:
+    """Split CPUs into `slots` contiguous groups of (almost) equal size."""
+    slots = max(1, min(slots, len(cpus)))
+    size, extra = divmod(len(cpus), slots)
+    groups, start = [], 0
+    for i in range(slots):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(cpus[start:end])
+        start = end
+    return groups
+
+
+def pin_current(cpus: List[int], whole_process: bool = False) -> bool:
+    """
+    Pin to CPUs. On Linux sched_setaffinity(0) pins the calling thread (and
+    threads it creates later); whole_process falls back to psutil elsewhere.
+
+    Returns:
+        True if affinity was applied
+    """
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+            return True
+        if whole_process and psutil is not None:
+            psutil.Process().cpu_affinity(cpus)
+            return True
+    except Exception as e:
+        print(f"⚠️ Could not set CPU affinity {cpus}: {e}")
+    return False
+
+
+def current_affinity() -> Optional[List[int]]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    if psutil is not None:
+        try:
+            return sorted(psutil.Process().cpu_affinity())
+        except Exception:
+            pass
+    return None
+
+
+def configure_worker_process(threads: int, interop_threads: int = 0, cpus: Optional[List[int]] = None):
+    """Thread/affinity setup for a dedicated inference process (call before loading)."""
+    if cpus:
+        pin_current(cpus, whole_process=True)
+    torch = _torch()
+    if torch is None:
+        return
+    if interop_threads > 0:
+        try:
+            torch.set_interop_threads(interop_threads)
+        except RuntimeError as e:
+            print(f"⚠️ Inter-op threads already fixed: {e}")
+    if threads > 0:
+        torch.set_num_threads(threads)
+
+# ============================================================================
+# CPU PLAN CLASS
+# ============================================================================
+
+class CpuPlan:
+    """Process-wide thread settings and pinned slot assignment."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            config: Overrides for CPU_THREADING_CONFIG
+        """
+        self.config = {**CPU_THREADING_CONFIG, **(config or {})}
+        self.cpus = available_cpus()
+        self.slots = split_slots(self.cpus, self.config["slots"]) if self.config["slots"] > 0 else []
+        self.lock = threading.Lock()
+        self._next_slot = 0
+        self.assignments: Dict[str, List[Dict[str, Any]]] = {}  # engine -> pinned threads
+        self.applied = False
+
+    def apply_process(self):
+        """Apply process-wide thread counts (call once torch is imported, before loading models)."""
+        torch = _torch()
+        if torch is None:
+            return
+        configure_worker_process(self.config["intra_op_threads"], self.config["interop_threads"])
+        self.applied = True
+        print(f"🧮 Torch threads: intra-op={torch.get_num_threads()}, inter-op={torch.get_num_interop_threads()}"
+              + (f", {len(self.slots)} pinned slot(s)" if self.slots else ""))
+
+    def next_slot(self) -> Optional[List[int]]:
+        """Round-robin slot for a new inference thread/process (None when not pinning)."""
+        if not self.slots:
+            return None
+        with self.lock:
+            slot = self.slots[self._next_slot % len(self.slots)]
+            self._next_slot += 1
+        return slot
+
+    def slot(self, index: int) -> Optional[List[int]]:
+        """Fixed slot for worker `index` (None when not pinning)."""
+        return self.slots[index % len(self.slots)] if self.slots else None
+
+    def threads_for(self, engine: str, cpus: Optional[List[int]] = None) -> int:
+        """Intra-op threads for an engine (per-engine override, else slot size, else global)."""
+        if engine in self.config["engine_threads"]:
+            return self.config["engine_threads"][engine]
+        if cpus:
+            return len(cpus)
+        return self.config["intra_op_threads"]
+
+    def init_inference_thread(self, engine: str):
+        """ThreadPoolExecutor initializer: pin the thread to a slot and set its torch threads."""
+        cpus = self.next_slot()
+        if cpus:
+            pin_current(cpus)
+        threads = self.threads_for(engine, cpus)
+        torch = _torch() if threads > 0 else None
+        if torch is not None:
+            torch.set_num_threads(threads)
+        with self.lock:
+            self.assignments.setdefault(engine, []).append({
+                "thread": threading.current_thread().name,
+                "cpus": cpus,
+                "torch_threads": threads or None
+            })
+
+    def get_info(self) -> Dict[str, Any]:
+        """Settings and current state for /v1/info."""
+        with self.lock:
+            assignments = {engine: list(threads) for engine, threads in self.assignments.items()}
+        torch = _torch(import_now=False)
+        return {
+            "cpu_count": os.cpu_count(),
+            "available_cpus": len(self.cpus),
+            "process_affinity": current_affinity(),
+            "intra_op_threads": torch.get_num_threads() if torch is not None else None,
+            "interop_threads": torch.get_num_interop_threads() if torch is not None else None,
+            "configured": {
+                "intra_op_threads": self.config["intra_op_threads"] or None,
+                "interop_threads": self.config["interop_threads"] or None,
+                "engine_threads": self.config["engine_threads"],
+                "slots": self.config["slots"]
+            },
+            "slots": self.slots,
+            "inference_threads": assignments
+        }
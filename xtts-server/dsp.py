@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+DSP - Shared audio processing for every engine and endpoint
+
+One implementation of the sample-level work that used to be copy-pasted in
+main.py, engines/xtts_engine.py and engines/stylets2_engine.py:
+
+- Resampling with polyphase filters whose FIR kernels are cached per rate
+  pair (building a torchaudio Resample / firwin kernel on every call was a
+  large share of short requests)
+- Sanitize (NaN/Inf removal + clipping), peak normalization and PCM
+  conversion done in place on float32 buffers
+- postprocess(): fused rate conversion + speed change + sanitize in one
+  pass, so synthesized audio is copied at most once before encoding
+
+Speed is normally applied by the model itself (XTTS `speed`, StyleTTS2
+duration scaling, see BaseTTSEngine.supports_native_speed); the resampling
+speed change here is only the fallback for engines without that control.
+
+numpy/scipy only (no torch), so worker processes and tools can import it
+cheaply.
+"""
+
+from functools import lru_cache
+from math import gcd
+from typing import Tuple
+
+import numpy as np
+import scipy.io.wavfile as wavfile
+from scipy.signal import firwin, resample_poly
+
+from audio_buffer import encode_wav
+
+try:
+    import soundfile as sf
+except ImportError:
+    sf = None
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+KERNEL_CACHE_SIZE = 32       # Distinct (up, down) rate pairs kept
+KAISER_BETA = 5.0            # Same filter design as scipy's resample_poly default
+
+MIN_REFERENCE_SECONDS = 1.0  # Pad shorter references with silence
+PEAK_HEADROOM = 1.05         # Normalize peak to 1/1.05
+CLIP_LEVEL = 0.95
+
+# ============================================================================
+# RESAMPLING
+# ============================================================================
+
+def rate_ratio(orig_sr: int, target_sr: int) -> Tuple[int, int]:
+    """Reduced (up, down) factors for a rate conversion."""
+    g = gcd(int(orig_sr), int(target_sr))
+    return int(target_sr) // g, int(orig_sr) // g
+
+
+@lru_cache(maxsize=KERNEL_CACHE_SIZE)
+def resampling_kernel(up: int, down: int) -> np.ndarray:
+    """
+    Low-pass FIR kernel for a polyphase (up, down) conversion (cached).
+
+    Same design resample_poly uses internally, computed once per rate pair.
+    The returned array is read-only: resample_poly copies it before use.
+    """
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    kernel = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", KAISER_BETA)).astype(np.float32)
+    kernel.setflags(write=False)
+    return kernel
+
+
+def resample(samples: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    Resample float32 mono audio with a cached polyphase kernel.
+
+    Returns the input unchanged when the rates match.
+    """
+    if orig_sr == target_sr:
+        return samples
+    up, down = rate_ratio(orig_sr, target_sr)
+    out = resample_poly(samples, up, down, window=resampling_kernel(up, down))
+    return out.astype(np.float32, copy=False)
+
+
+def kernel_cache_info() -> dict:
+    """Hit/miss counters of the kernel cache (for diagnostics)."""
+    info = resampling_kernel.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
+# ============================================================================
+# IN-PLACE SAMPLE OPERATIONS
+# ============================================================================
+
+def as_float32(wav) -> np.ndarray:
+    """
+    Writable, contiguous float32 mono buffer from a numpy array, torch tensor
+    or sequence. Copies only when the input cannot be reused as-is.
+    """
+    if hasattr(wav, "detach"):  # torch.Tensor (torch not imported here)
+        wav = wav.detach().float().cpu().numpy()
+    wav = np.asarray(wav)
+    if wav.ndim != 1:
+        wav = wav.reshape(-1)
+    if wav.dtype != np.float32 or not wav.flags.c_contiguous or not wav.flags.writeable:
+        wav = np.array(wav, dtype=np.float32, order="C")
+    return wav
+
+
+def sanitize(wav: np.ndarray, limit: float = 1.0) -> np.ndarray:
+    """Replace NaN/Inf and clip to [-limit, limit], in place."""
+    np.nan_to_num(wav, copy=False, nan=0.0, posinf=limit, neginf=-limit)
+    np.clip(wav, -limit, limit, out=wav)
+    return wav
+
+
+def peak_normalize(wav: np.ndarray, headroom: float = PEAK_HEADROOM, clip_level: float = CLIP_LEVEL) -> np.ndarray:
+    """Scale the peak to 1/headroom and clip to ±clip_level, in place."""
+    max_val = float(np.abs(wav).max()) if wav.size else 0.0
+    if max_val > 0:
+        wav *= 1.0 / (max_val * headroom)
+    np.clip(wav, -clip_level, clip_level, out=wav)
+    return wav
+
+
+def postprocess(wav, sample_rate: int, target_sr: int, speed_factor: float = 1.0) -> np.ndarray:
+    """
+    Fused output pass: float32 conversion, sanitize, rate conversion and
+    (fallback) speed change.
+
+    speed_factor > 1 makes the audio shorter: it is resampled to
+    target_sr / speed_factor and played back at target_sr, which also shifts
+    the pitch. The change is folded into the engine -> target_sr conversion,
+    so it costs no extra resampling pass. Pass 1.0 when the engine already
+    applied the speed natively.
+
+    Returns:
+        float32 mono samples at target_sr in [-1, 1]
+    """
+    wav = sanitize(as_float32(wav))
+    out_sr = int(round(target_sr / speed_factor)) if speed_factor != 1.0 else target_sr
+    if sample_rate != out_sr:
+        wav = resample(wav, sample_rate, out_sr)
+        np.clip(wav, -1.0, 1.0, out=wav)  # The filter can overshoot slightly
+    return wav
+
+
+def apply_speed_adjustment(wav, speed_factor: float, sample_rate: int = 24000) -> np.ndarray:
+    """Resample-based speed change, > 1 is faster (see postprocess); returns float32 samples."""
+    if speed_factor == 1.0:
+        return as_float32(wav)
+    return postprocess(wav, sample_rate, sample_rate, speed_factor)
+
+# ============================================================================
+# FILES / REFERENCES
+# ============================================================================
+
+def decode_audio(source) -> Tuple[np.ndarray, int]:
+    """
+    Decode a WAV file (path or file-like) to float32 mono samples.
+
+    Tries scipy first (robust for browser WAVs) and falls back to soundfile.
+
+    Returns:
+        (samples, sample_rate)
+
+    Raises:
+        ValueError: If the file is empty or cannot be decoded
+    """
+    try:
+        sr, data = wavfile.read(source)
+    except Exception as e:
+        if sf is None:
+            raise ValueError(f"Could not decode audio: {e}")
+        if hasattr(source, "seek"):
+            source.seek(0)
+        data, sr = sf.read(source, dtype="float32", always_2d=False)
+
+    if data.size == 0:
+        raise ValueError("WAV file is empty")
+    if sr <= 0:
+        raise ValueError(f"Invalid sample rate: {sr}")
+
+    if data.dtype.kind in ("i", "u"):
+        info = np.iinfo(data.dtype)
+        data = data.astype(np.float32)
+        if info.min == 0:  # unsigned 8-bit PCM is offset-binary
+            data -= (info.max + 1) / 2
+            data /= (info.max + 1) / 2
+        else:
+            data /= info.max
+    else:
+        data = data.astype(np.float32, copy=False)
+
+    # Convert to mono if stereo (scipy/soundfile use (frames, channels))
+    if data.ndim > 1:
+        data = data.mean(axis=1, dtype=np.float32)
+
+    return data, int(sr)
+
+
+def normalize_reference(samples: np.ndarray, sr: int, target_sr: int) -> np.ndarray:
+    """
+    Sanitize, resample and peak-normalize reference audio.
+
+    Args:
+        samples: float32 mono samples
+        sr: Source sample rate
+        target_sr: Target sample rate
+
+    Returns:
+        float32 mono samples at target_sr in [-0.95, 0.95]
+    """
+    wav = resample(sanitize(as_float32(samples)), sr, target_sr)
+
+    min_samples = int(target_sr * MIN_REFERENCE_SECONDS)
+    if wav.shape[0] < min_samples:
+        wav = np.pad(wav, (0, min_samples - wav.shape[0]))
+
+    return np.ascontiguousarray(peak_normalize(wav), dtype=np.float32)
+
+
+def normalize_audio_file(wav_path: str, target_sr: int = 22050) -> str:
+    """
+    Write a normalized copy of a WAV file (mono, target_sr, peak-normalized
+    16-bit PCM) next to it as *_normalized.wav.
+
+    Used where a library needs a file path (StyleTTS2 target voice, engine
+    clone_voice validation). Returns the original path if it cannot be decoded.
+    """
+    try:
+        samples, sr = decode_audio(wav_path)
+        wav = normalize_reference(samples, sr, target_sr)
+        normalized_path = wav_path.replace('.wav', '_normalized.wav')
+        with open(normalized_path, "wb") as f:
+            f.write(encode_wav(wav, target_sr))
+        return normalized_path
+    except Exception as e:
+        print(f"   ❌ Normalization error: {str(e)}")
+        return wav_path
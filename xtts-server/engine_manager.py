@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+Engine Manager - Single-flight, thread-safe loading of TTS engines
+
+Synthesis runs in the thread pool, so several requests can ask for the same
+engine at once. The first caller starts the load and publishes a Future;
+every concurrent caller waits on that Future instead of constructing and
+loading its own copy. Engines can also be preloaded in the background.
+
+Each engine reports one of these states:
+    idle     never requested (or unloaded)
+    loading  load in progress
+    ready    loaded and usable
+    failed   last load raised (the next request retries)
+
+Memory budget:
+    Each load is measured (CUDA allocated bytes on GPU, process RSS on CPU);
+    get_gpu_vram_required() is only the prior used before the first load.
+    Before a load that would exceed the budget, least-recently-used engines
+    are unloaded. Engines idle for longer than idle_ttl_seconds are unloaded
+    by a janitor. Pinned engines and engines in use are never unloaded.
+
+Reload:
+    Model optimizations (BaseTTSEngine.configure) are applied at load time,
+    so changing them reloads loaded engines: a fresh instance is loaded in
+    the background, optionally benchmarked against the old one, and swapped
+    in. The old instance keeps serving until the swap and is unloaded once
+    its in-flight requests finish.
+"""
+
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from contextlib import contextmanager
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, Optional, List
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+STATE_IDLE = "idle"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+ENGINE_MEMORY_CONFIG = {
+    "budget_mb": 0,               # 0 = unlimited
+    "idle_ttl_seconds": 900,      # Unload engines unused for 15 minutes (0 = never)
+    "janitor_interval_seconds": 60,
+    "pinned": [],                 # Engines that are never unloaded
+    "drain_timeout_seconds": 300, # Reload: max wait for the old instance's requests
+}
+
+# ============================================================================
+# MEMORY HELPERS
+# ============================================================================
+
+def measure_memory_mb(device: str) -> Optional[float]:
+    """Current memory in use on a device: CUDA allocated bytes or process RSS."""
+    if device == "cuda":
+        # Not imported here: the API binds before torch loads, and CUDA memory implies it is loaded
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            return torch.cuda.memory_allocated() / (1024 * 1024)
+        return None
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    return None
+
+# ============================================================================
+# ENGINE MANAGER CLASS
+# ============================================================================
+
+class EngineManager:
+    """Owns engine instances and serializes their loading per engine."""
+
+    def __init__(self, engine_classes: Dict[str, type],
+                 on_loaded: Optional[Callable[[str, Any], None]] = None,
+                 config: Optional[Dict[str, Any]] = None,
+                 options: Optional[Dict[str, Any]] = None):
+        """
+        Initialize manager.
+
+        Args:
+            engine_classes: Engine name -> BaseTTSEngine subclass
+            on_loaded: Called with (name, engine) after each successful load or reload swap
+            config: Overrides for ENGINE_MEMORY_CONFIG
+            options: Model optimizations passed to engine.configure() on every load
+        """
+        self.engine_classes = engine_classes
+        self.on_loaded = on_loaded
+        self.config = {**ENGINE_MEMORY_CONFIG, **(config or {})}
+        self.options: Dict[str, Any] = dict(options or {})
+        self.lock = threading.Lock()
+        self._load_lock = threading.Lock()  # One load at a time keeps memory deltas accurate
+
+        self.engines: Dict[str, Any] = {}          # Loaded instances
+        self._loading: Dict[str, Future] = {}      # In-flight loads
+        self.states: Dict[str, Dict[str, Any]] = {
+            name: {"state": STATE_IDLE} for name in engine_classes
+        }
+        self.memory_mb: Dict[str, float] = {}      # Measured (or prior) resident memory
+        self.measured: Dict[str, bool] = {}        # False while memory_mb is only the prior
+        self.last_used: Dict[str, float] = {}
+        self.in_use: Dict[str, int] = {}
+        self._instance_leases: Dict[int, int] = {}  # id(engine) -> active leases
+        self.reloads: Dict[str, Dict[str, Any]] = {}
+        self._reload_threads: Dict[str, threading.Thread] = {}
+        self.stats = {"loads": 0, "evictions": 0, "idle_unloads": 0}
+        self._janitor_task: Optional[asyncio.Task] = None
+
+    def get(self, name: str) -> Any:
+        """
+        Return a loaded engine, loading it if needed.
+
+        Concurrent callers for the same engine share a single load.
+
+        Raises:
+            ValueError: Unknown engine
+            Exception: Whatever load_model() raised
+        """
+        if name not in self.engine_classes:
+            raise ValueError(f"Unknown engine: {name}. Available: {list(self.engine_classes.keys())}")
+
+        with self.lock:
+            engine = self.engines.get(name)
+            if engine is not None:
+                self.last_used[name] = time.monotonic()
+                return engine
+            future = self._loading.get(name)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._loading[name] = future
+                self.states[name] = {"state": STATE_LOADING, "started_at": datetime.now().isoformat()}
+
+        if not owner:
+            return future.result()
+
+        self._load(name, future)
+        return future.result()
+
+    @contextmanager
+    def lease(self, name: str):
+        """
+        Get an engine and keep it resident for the duration of the block.
+
+        Engines with an active lease are skipped by eviction and idle unload.
+        """
+        while True:
+            engine = self.get(name)
+            with self.lock:
+                # Re-check: the engine may have been unloaded between get() and here
+                if self.engines.get(name) is engine:
+                    self.in_use[name] = self.in_use.get(name, 0) + 1
+                    self._instance_leases[id(engine)] = self._instance_leases.get(id(engine), 0) + 1
+                    break
+        try:
+            yield engine
+        finally:
+            with self.lock:
+                self.in_use[name] -= 1
+                self._instance_leases[id(engine)] -= 1
+                if not self._instance_leases[id(engine)]:
+                    del self._instance_leases[id(engine)]
+                self.last_used[name] = time.monotonic()
+
+    def _expected_memory_mb(self, name: str, engine: Any) -> float:
+        """Measured memory from a previous load, else the engine's declared prior."""
+        if self.measured.get(name):
+            return self.memory_mb[name]
+        try:
+            return float(engine.get_gpu_vram_required())
+        except Exception:
+            return 0.0
+
+    def _evictable(self, exclude: str) -> List[str]:
+        """Loaded engines that may be unloaded, least recently used first (lock held)."""
+        pinned = set(self.config["pinned"])
+        candidates = [
+            n for n in self.engines
+            if n != exclude and n not in pinned and self.in_use.get(n, 0) == 0
+        ]
+        return sorted(candidates, key=lambda n: self.last_used.get(n, 0.0))
+
+    def _make_room(self, name: str, needed_mb: float):
+        """Unload LRU engines until needed_mb fits in the budget."""
+        budget = self.config["budget_mb"]
+        if not budget:
+            return
+        while True:
+            with self.lock:
+                used = sum(self.memory_mb.get(n, 0.0) for n in self.engines)
+                if used + needed_mb <= budget:
+                    return
+                victims = self._evictable(exclude=name)
+                if not victims:
+                    print(f"⚠️ Memory budget exceeded loading {name}: "
+                          f"{used + needed_mb:.0f}MB > {budget:.0f}MB and nothing can be evicted")
+                    return
+                victim = victims[0]
+            print(f"♻️ Evicting engine {victim} (LRU) to fit {name} in {budget:.0f}MB")
+            if self.unload(victim):
+                self.stats["evictions"] += 1
+
+    def unload(self, name: str) -> bool:
+        """
+        Unload an engine unless it is in use.
+
+        Returns:
+            True if the engine was unloaded
+        """
+        with self.lock:
+            engine = self.engines.get(name)
+            if engine is None or self.in_use.get(name, 0) > 0:
+                return False
+            del self.engines[name]
+            self.states[name] = {"state": STATE_IDLE, "unloaded_at": datetime.now().isoformat()}
+        try:
+            engine.unload_model()
+        except Exception as e:
+            print(f"⚠️ Error unloading {name}: {e}")
+        print(f"📤 Engine unloaded: {name}")
+        return True
+
+    def _create(self, name: str) -> Any:
+        """Construct an engine instance with the current model options."""
+        engine_class = self.engine_classes[name]
+        if engine_class is None:
+            # main.py fills the classes in once the background loader has imported them
+            raise RuntimeError(f"Engine {name} is not imported yet")
+        engine = engine_class()
+        if self.options and hasattr(engine, "configure"):
+            engine.configure(**self.options)
+        return engine
+
+    def _load(self, name: str, future: Future):
+        """Construct and load an engine, resolving the shared Future."""
+        print(f"⏳ Loading engine: {name}")
+        start = time.perf_counter()
+        try:
+            with self._load_lock:
+                engine = self._create(name)
+                self._make_room(name, self._expected_memory_mb(name, engine))
+                before = measure_memory_mb(engine.device)
+                engine.load_model()
+                after = measure_memory_mb(engine.device)
+        except Exception as e:
+            traceback.print_exc()
+            with self.lock:
+                self._loading.pop(name, None)
+                self.states[name] = {
+                    "state": STATE_FAILED,
+                    "error": str(e),
+                    "failed_at": datetime.now().isoformat()
+                }
+            future.set_exception(e)
+            return
+
+        load_seconds = time.perf_counter() - start
+        if before is not None and after is not None and after > before:
+            memory_mb, measured = after - before, True
+        else:
+            memory_mb, measured = self._expected_memory_mb(name, engine), False
+
+        with self.lock:
+            self.engines[name] = engine
+            self._loading.pop(name, None)
+            self.memory_mb[name] = memory_mb
+            self.measured[name] = measured
+            self.last_used[name] = time.monotonic()
+            self.stats["loads"] += 1
+            self.states[name] = {
+                "state": STATE_READY,
+                "device": getattr(engine, "device", None),
+                "load_seconds": round(load_seconds, 2),
+                "loaded_at": datetime.now().isoformat()
+            }
+        print(f"✅ Engine ready: {name} ({load_seconds:.1f}s, "
+              f"{memory_mb:.0f}MB {'measured' if measured else 'estimated'})")
+
+        if self.on_loaded:
+            try:
+                self.on_loaded(name, engine)
+            except Exception as e:
+                print(f"⚠️ on_loaded hook failed for {name}: {e}")
+        future.set_result(engine)
+
+    def set_options(self, **options) -> bool:
+        """
+        Update model options for future loads.
+
+        Returns:
+            True if any option changed
+        """
+        changed = {k: v for k, v in options.items() if self.options.get(k) != v}
+        self.options.update(changed)
+        return bool(changed)
+
+    def reload(self, name: str, benchmark: Optional[Callable[[str, Any], Optional[float]]] = None) -> Optional[threading.Thread]:
+        """
+        Reload a loaded engine with the current options, in the background.
+
+        Args:
+            name: Engine name
+            benchmark: Optional fn(name, engine) -> real-time factor, run on the
+                       old instance before and on the new one before the swap
+
+        Returns:
+            The reload thread, or None if the engine is not loaded (the next
+            load picks up the options anyway)
+        """
+        with self.lock:
+            if name not in self.engines:
+                return None
+            running = self._reload_threads.get(name)
+            if running is not None and self.reloads.get(name, {}).get("state") == "reloading":
+                # Options are read when the new instance is created; queue another pass
+                self.reloads[name]["pending"] = True
+                return running
+            self.reloads[name] = {
+                "state": "reloading",
+                "options": dict(self.options),
+                "started_at": datetime.now().isoformat()
+            }
+            thread = threading.Thread(target=self._reload, args=(name, benchmark), name=f"engine-reload-{name}", daemon=True)
+            self._reload_threads[name] = thread
+        thread.start()
+        print(f"🔄 Reloading engine {name} in background with {self.options}")
+        return thread
+
+    def _run_benchmark(self, benchmark, name: str, engine: Any) -> Optional[float]:
+        try:
+            return benchmark(name, engine)
+        except Exception as e:
+            print(f"⚠️ Benchmark of {name} failed: {e}")
+            return None
+
+    def _reload(self, name: str, benchmark):
+        start = time.perf_counter()
+        report: Dict[str, Any] = {}
+        try:
+            if benchmark is not None:
+                with self.lease(name) as current:
+                    report["rtf_before"] = self._run_benchmark(benchmark, name, current)
+
+            with self._load_lock:
+                engine = self._create(name)
+                # Old and new instances are both resident until the swap
+                self._make_room(name, self._expected_memory_mb(name, engine))
+                before = measure_memory_mb(engine.device)
+                engine.load_model()
+                after = measure_memory_mb(engine.device)
+
+            if benchmark is not None:
+                report["rtf_after"] = self._run_benchmark(benchmark, name, engine)
+                if report.get("rtf_before") and report.get("rtf_after"):
+                    report["speedup"] = round(report["rtf_before"] / report["rtf_after"], 2)
+        except Exception as e:
+            traceback.print_exc()
+            with self.lock:
+                self.reloads[name].update({
+                    "state": STATE_FAILED,
+                    "error": str(e),
+                    "failed_at": datetime.now().isoformat()
+                })
+            print(f"❌ Reload of {name} failed, previous instance keeps serving: {e}")
+            return
+
+        with self.lock:
+            old = self.engines.get(name)
+            self.engines[name] = engine
+            if before is not None and after is not None and after > before:
+                self.memory_mb[name], self.measured[name] = after - before, True
+            self.last_used[name] = time.monotonic()
+            self.stats["loads"] += 1
+            self.states[name] = {
+                "state": STATE_READY,
+                "device": getattr(engine, "device", None),
+                "load_seconds": round(time.perf_counter() - start, 2),
+                "loaded_at": datetime.now().isoformat()
+            }
+        print(f"✅ Engine {name} reloaded and swapped in {report}")
+
+        if self.on_loaded:
+            try:
+                self.on_loaded(name, engine)
+            except Exception as e:
+                print(f"⚠️ on_loaded hook failed for {name}: {e}")
+
+        # Let requests that still hold the old instance finish before unloading it
+        if old is not None and old is not engine:
+            deadline = time.monotonic() + self.config["drain_timeout_seconds"]
+            while time.monotonic() < deadline:
+                with self.lock:
+                    if not self._instance_leases.get(id(old)):
+                        break
+                time.sleep(0.2)
+            try:
+                old.unload_model()
+            except Exception as e:
+                print(f"⚠️ Error unloading previous {name} instance: {e}")
+
+        with self.lock:
+            pending = self.reloads[name].pop("pending", False)
+            self.reloads[name].update({
+                "state": "done",
+                "finished_at": datetime.now().isoformat(),
+                **report
+            })
+        if pending:
+            # Options changed again while this reload ran
+            self.reload(name, benchmark)
+
+    def preload(self, names: Iterable[str]) -> Optional[threading.Thread]:
+        """
+        Load engines one after another on a background thread.
+
+        Returns:
+            The preload thread, or None if there is nothing to load
+        """
+        pending = [n for n in names if n in self.engine_classes and n not in self.engines]
+        unknown = [n for n in names if n not in self.engine_classes]
+        if unknown:
+            print(f"⚠️ Ignoring unknown engines in preload list: {unknown}")
+        if not pending:
+            return None
+
+        def run():
+            for name in pending:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"⚠️ Background preload of {name} failed: {e}")
+
+        thread = threading.Thread(target=run, name="engine-preload", daemon=True)
+        thread.start()
+        print(f"🔄 Preloading engines in background: {pending}")
+        return thread
+
+    def is_ready(self, name: str) -> bool:
+        return name in self.engines
+
+    def loaded(self) -> Dict[str, Any]:
+        """Snapshot of loaded engines (name -> instance)."""
+        with self.lock:
+            return dict(self.engines)
+
+    def sweep_idle(self) -> int:
+        """
+        Unload engines idle for longer than idle_ttl_seconds.
+
+        Returns:
+            Number of engines unloaded
+        """
+        ttl = self.config["idle_ttl_seconds"]
+        if not ttl:
+            return 0
+        now = time.monotonic()
+        with self.lock:
+            idle = [
+                n for n in self._evictable(exclude="")
+                if now - self.last_used.get(n, now) > ttl
+            ]
+        unloaded = 0
+        for name in idle:
+            print(f"💤 Engine {name} idle for more than {ttl}s")
+            if self.unload(name):
+                unloaded += 1
+                self.stats["idle_unloads"] += 1
+        return unloaded
+
+    async def _janitor_loop(self):
+        """Periodically unload idle engines (off the event loop)."""
+        while True:
+            await asyncio.sleep(self.config["janitor_interval_seconds"])
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.sweep_idle)
+            except Exception as e:
+                print(f"⚠️ Engine janitor error: {e}")
+
+    def start_janitor(self):
+        """Start the idle-unload task on the running event loop (idempotent)."""
+        if self._janitor_task is None or self._janitor_task.done():
+            self._janitor_task = asyncio.get_running_loop().create_task(self._janitor_loop())
+
+    def stop_janitor(self):
+        """Cancel the idle-unload task."""
+        if self._janitor_task is not None:
+            self._janitor_task.cancel()
+            self._janitor_task = None
+
+    def get_states(self) -> Dict[str, Dict[str, Any]]:
+        """Per-engine state (idle/loading/ready/failed) with details."""
+        now = time.monotonic()
+        with self.lock:
+            states = {name: dict(state) for name, state in self.states.items()}
+            for name in self.engines:
+                states[name].update({
+                    "memory_mb": round(self.memory_mb.get(name, 0.0), 1),
+                    "memory_measured": self.measured.get(name, False),
+                    "idle_seconds": round(now - self.last_used.get(name, now), 1),
+                    "in_use": self.in_use.get(name, 0),
+                    "pinned": name in self.config["pinned"]
+                })
+            for name, reload in self.reloads.items():
+                states[name]["reload"] = dict(reload)
+            return states
+
+    def get_memory_statistics(self) -> Dict[str, Any]:
+        """Budget usage summary."""
+        with self.lock:
+            used = sum(self.memory_mb.get(n, 0.0) for n in self.engines)
+            return {
+                "budget_mb": self.config["budget_mb"] or None,
+                "used_mb": round(used, 1),
+                "idle_ttl_seconds": self.config["idle_ttl_seconds"],
+                "pinned": list(self.config["pinned"]),
+                **self.stats
+            }
+
+    def unload_all(self):
+        """Unload every loaded engine (shutdown)."""
+        with self.lock:
+            engines = list(self.engines.items())
+            self.engines.clear()
+            for name, _ in engines:
+                self.states[name] = {"state": STATE_IDLE}
+        for name, engine in engines:
+            try:
+                engine.unload_model()
+            except Exception as e:
+                print(f"⚠️ Error unloading {name}: {e}")
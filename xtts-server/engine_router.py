@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Engine Router - Latency-aware engine selection for synthesis requests
+
+Tracks, per engine, how many requests are in flight and the observed
+real-time factor (RTF = compute seconds / audio seconds, EWMA). With
+``engine=auto`` a request goes to the preferred (highest quality) engine
+when its predicted latency fits the request's budget, and spills over to a
+cheaper engine during bursts.
+
+Predicted latency for an engine:
+    (in_flight + 1) * estimated_audio_seconds(text) * rtf
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+AUTO_ENGINE = "auto"
+
+ROUTER_CONFIG = {
+    "default_latency_budget_ms": 4000,  # Used when a request gives no budget
+    "chars_per_second": 15.0,           # Speech rate used to estimate audio length
+    "ewma_alpha": 0.2,                  # Smoothing for observed RTF
+    "cpu_rtf_factor": 4.0,              # Prior RTF multiplier when running on CPU
+}
+
+# Prior RTF by BaseTTSEngine.get_engine_speed() until real samples arrive
+SPEED_PRIOR_RTF = {
+    "very-fast": 0.15,
+    "fast": 0.3,
+    "medium": 0.8,
+    "slow": 1.5,
+}
+
+# ============================================================================
+# ENGINE ROUTER CLASS
+# ============================================================================
+
+class EngineRouter:
+    """Chooses an engine per request and records per-engine load and RTF."""
+
+    def __init__(self, preference: List[str], config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize router.
+
+        Args:
+            preference: Engine names, best quality first
+            config: Overrides for ROUTER_CONFIG
+        """
+        self.preference = list(preference)
+        self.config = {**ROUTER_CONFIG, **(config or {})}
+        self.lock = threading.Lock()
+        self.in_flight: Dict[str, int] = {}
+        self.rtf: Dict[str, float] = {}
+        self.requests: Dict[str, int] = {}
+
+    def set_prior(self, engine: str, speed_label: str, device: str = "cuda"):
+        """Seed an engine's RTF from its declared speed (ignored once measured)."""
+        prior = SPEED_PRIOR_RTF.get(speed_label, 1.0)
+        if device != "cuda":
+            prior *= self.config["cpu_rtf_factor"]
+        with self.lock:
+            self.rtf.setdefault(engine, prior)
+
+    def estimate_audio_seconds(self, text: str) -> float:
+        return max(len(text), 1) / self.config["chars_per_second"]
+
+    def predict_latency_ms(self, engine: str, text: str) -> float:
+        """Predicted completion time for one more request on this engine."""
+        with self.lock:
+            depth = self.in_flight.get(engine, 0)
+            rtf = self.rtf.get(engine, 1.0)
+        return (depth + 1) * self.estimate_audio_seconds(text) * rtf * 1000.0
+
+    def choose(self, text: str, candidates: List[str], latency_budget_ms: Optional[float] = None) -> str:
+        """
+        Pick an engine for a request.
+
+        Args:
+            text: Text to synthesize
+            candidates: Engines that may serve it (loaded / usable)
+            latency_budget_ms: Per-request budget (default from config)
+
+        Returns:
+            Engine name: first engine in preference order that fits the
+            budget, otherwise the one with the lowest predicted latency
+        """
+        if latency_budget_ms is None:
+            latency_budget_ms = self.config["default_latency_budget_ms"]
+
+        ordered = [e for e in self.preference if e in candidates]
+        ordered += [e for e in candidates if e not in ordered]
+        if not ordered:
+            raise ValueError("No engine available for routing")
+
+        predictions = {engine: self.predict_latency_ms(engine, text) for engine in ordered}
+        for engine in ordered:
+            if predictions[engine] <= latency_budget_ms:
+                return engine
+        return min(ordered, key=lambda e: predictions[e])
+
+    @contextmanager
+    def track(self, engine: str):
+        """Count a request as in flight on an engine for the duration of the block."""
+        with self.lock:
+            self.in_flight[engine] = self.in_flight.get(engine, 0) + 1
+            self.requests[engine] = self.requests.get(engine, 0) + 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.in_flight[engine] -= 1
+
+    def record(self, engine: str, compute_seconds: float, audio_seconds: float):
+        """Record an observed synthesis (updates the engine's RTF EWMA)."""
+        if audio_seconds <= 0:
+            return
+        observed = compute_seconds / audio_seconds
+        alpha = self.config["ewma_alpha"]
+        with self.lock:
+            previous = self.rtf.get(engine)
+            self.rtf[engine] = observed if previous is None else alpha * observed + (1 - alpha) * previous
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Per-engine load and RTF."""
+        with self.lock:
+            engines = set(self.rtf) | set(self.in_flight) | set(self.preference)
+            return {
+                "preference": self.preference,
+                "default_latency_budget_ms": self.config["default_latency_budget_ms"],
+                "engines": {
+                    engine: {
+                        "in_flight": self.in_flight.get(engine, 0),
+                        "rtf": self.rtf.get(engine),
+                        "requests": self.requests.get(engine, 0)
+                    }
+                    for engine in sorted(engines)
+                }
+            }
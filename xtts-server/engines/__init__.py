@@ -3,6 +3,7 @@ Speakerbot Engines Package
 
 Motores TTS disponíveis:
 - XTTS v2 (default) - Melhor qualidade
+- XTTS v2 ONNX - XTTS com vocoder no ONNX Runtime (CPU)
 - StyleTTS2 - Rápido + qualidade excelente
 - Kokoro - Ultra-rápido
 - VITS2 - Leve + rápido
@@ -18,6 +19,9 @@ except ImportError as e:
     print(f"⚠ StyleTTS2 não disponível: {e}")
     StyleTTS2Engine = None
 
+# XTTS no ONNX Runtime: opcional, depende de onnxruntime
+from .xtts_onnx_engine import XTTSOnnxEngine
+
 __all__ = [
     "BaseTTSEngine",
     "EngineRegistry",
@@ -28,3 +32,5 @@ __all__ = [
 if StyleTTS2Engine is not None:
     __all__.append("StyleTTS2Engine")
 
+if XTTSOnnxEngine is not None:
+    __all__.append("XTTSOnnxEngine")
@@ -13,8 +13,12 @@ Engines disponíveis:
 
 from abc import ABC, abstractmethod
 from typing import List, Tuple, Optional, Dict, Any
+import io
 import logging
 
+import numpy as np
+import scipy.io.wavfile as wavfile
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,6 +42,18 @@ class BaseTTSEngine(ABC):
         self.model_name = model_name
         self.loaded = False
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.optimizations: Dict[str, Any] = {}          # Pedidas (ver engines/optimizations.py)
+        self.applied_optimizations: Dict[str, Any] = {}  # Efetivamente aplicadas no load_model()
+    
+    def configure(self, **optimizations) -> None:
+        """
+        Definir otimizações de modelo (int8, ...) antes do load_model().
+        
+        Engines aplicam o que suportam e registram o resultado em
+        self.applied_optimizations; opções desconhecidas são ignoradas.
+        Mudanças depois do carregamento exigem recarregar o engine.
+        """
+        self.optimizations.update(optimizations)
     
     @abstractmethod
     def load_model(self) -> None:
@@ -94,6 +110,34 @@ class BaseTTSEngine(ABC):
         """
         pass
     
+    def synthesize_array(
+        self,
+        text: str,
+        language: str = "pt",
+        voice: str = "default",
+        speed: float = 1.0,
+        **kwargs
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Sintetizar texto e retornar amostras float32 em vez de bytes WAV.
+        
+        A implementação padrão chama synthesize() e decodifica o WAV;
+        engines que já produzem arrays podem sobrescrever para evitar
+        a ida e volta pelo formato WAV.
+        
+        Returns:
+            Tuple[np.ndarray, int]: (áudio float32 mono em [-1, 1], sample_rate)
+        """
+        wav_bytes, sample_rate = self.synthesize(text, language=language, voice=voice, speed=speed, **kwargs)
+        sample_rate, data = wavfile.read(io.BytesIO(wav_bytes))
+        if data.dtype.kind == "i":
+            samples = data.astype(np.float32) / np.iinfo(data.dtype).max
+        else:
+            samples = data.astype(np.float32, copy=False)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1, dtype=np.float32)
+        return samples, int(sample_rate)
+    
     @abstractmethod
     def get_available_languages(self) -> List[str]:
         """
@@ -168,7 +212,8 @@ class BaseTTSEngine(ABC):
             "gpu_vram_mb": self.get_gpu_vram_required(),
             "gpu_vram_label": self.get_gpu_vram_label(),
             "languages": len(self.get_available_languages()),
-            "supports_cloning": self.supports_voice_cloning()
+            "supports_cloning": self.supports_voice_cloning(),
+            "optimizations": self.applied_optimizations
         }
     
     def get_engine_name(self) -> str:
@@ -201,6 +246,17 @@ class BaseTTSEngine(ABC):
         """Retornar se engine suporta clonagem de voz"""
         return False
     
+    @classmethod
+    def supports_native_speed(cls) -> bool:
+        """
+        Retornar se o próprio modelo aplica `speed` (duração dos fonemas).
+        
+        Quando False, synthesize_array() deve ser chamado com speed=1.0 e o
+        servidor muda a velocidade reamostrando a saída (dsp.postprocess),
+        o que também altera o pitch.
+        """
+        return False
+    
     def validate_text(self, text: str) -> bool:
         """
         Validar texto antes de síntese.
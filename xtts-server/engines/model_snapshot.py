@@ -0,0 +1,222 @@
+"""
+Snapshot local do XTTS v2 para carregamento rápido
+
+TTS(model_name=...) passa pelo ModelManager (resolve/baixa o modelo), lê o
+config e desserializa o checkpoint inteiro com torch.load (pickle, cópia
+completa em memória). Depois do primeiro carregamento o engine grava um
+snapshot em .tts-cache/snapshots/xtts_v2:
+
+- config.json: XttsConfig já resolvido
+- model.safetensors: state_dict do modelo pronto para inferência
+  (lido com mmap pelo safetensors); sem o pacote safetensors, model.pt
+  lido com torch.load(mmap=True, weights_only=True)
+- manifest.json: versões de torch/TTS e tamanho/mtime do checkpoint de
+  origem; qualquer mudança invalida o snapshot (regravado no próximo load)
+
+Os carregamentos seguintes (reinício e reload do EngineManager) montam o
+Xtts direto do snapshot, sem ModelManager e sem pickle.
+"""
+
+import os
+import json
+import time
+import shutil
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+import torch
+
+try:
+    import safetensors.torch as safetensors_torch
+except ImportError:
+    safetensors_torch = None
+
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+SNAPSHOT_DIR = Path(__file__).parent.parent / ".tts-cache" / "snapshots"
+XTTS_MODEL_NAME = "tts_models/multilingual/multi-dataset/xtts_v2"
+SNAPSHOT_FORMAT = 1
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _tts_version() -> str:
+    try:
+        import TTS
+        return getattr(TTS, "__version__", "unknown")
+    except ImportError:
+        return "unknown"
+
+
+def _weights_file(directory: Path) -> Path:
+    return directory / ("model.safetensors" if safetensors_torch is not None else "model.pt")
+
+
+def _source_key(model_dir: Path) -> Dict[str, Any]:
+    """Identidade do checkpoint de origem + versões que afetam o formato."""
+    checkpoint = model_dir / "model.pth"
+    stat = checkpoint.stat() if checkpoint.exists() else None
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "torch": torch.__version__,
+        "tts": _tts_version(),
+        "weights": "safetensors" if safetensors_torch is not None else "torch",
+        "checkpoint_size": stat.st_size if stat else None,
+        "checkpoint_mtime": int(stat.st_mtime) if stat else None,
+    }
+
+
+def xtts_model_dir(api) -> Path:
+    """Diretório do modelo baixado pelo ModelManager (vocab.json, speakers_xtts.pth, model.pth)."""
+    model_dir = getattr(api.synthesizer, "model_dir", None) if api is not None else None
+    if model_dir:
+        return Path(model_dir)
+    from TTS.utils.generic_utils import get_user_data_dir
+    return Path(get_user_data_dir("tts")) / XTTS_MODEL_NAME.replace("/", "--")
+
+
+def snapshot_path(name: str = "xtts_v2") -> Path:
+    return SNAPSHOT_DIR / name
+
+
+# ============================================================================
+# SAVE / LOAD
+# ============================================================================
+
+def save_xtts_snapshot(api, directory: Path) -> Dict[str, Any]:
+    """
+    Gravar o snapshot de um TTS (api) recém-carregado, antes de otimizações
+    que alteram o modelo (INT8, compile).
+
+    Grava em um diretório temporário e troca no final, então um snapshot
+    parcial nunca é usado.
+
+    Returns:
+        {"saved": True, "path", "seconds", "size_mb"}
+    """
+    start = time.perf_counter()
+    model = api.synthesizer.tts_model
+    model_dir = xtts_model_dir(api)
+
+    tmp_dir = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    try:
+        with open(tmp_dir / "config.json", "w", encoding="utf-8") as f:
+            f.write(api.synthesizer.tts_config.to_json())
+
+        weights = _weights_file(tmp_dir)
+        if safetensors_torch is not None:
+            # save_model remove os tensores compartilhados (gpt_inference reaproveita o GPT)
+            safetensors_torch.save_model(model, str(weights))
+        else:
+            torch.save(model.state_dict(), str(weights))
+
+        manifest = {
+            **_source_key(model_dir),
+            "model_dir": str(model_dir),
+            "created_at": time.time(),
+        }
+        with open(tmp_dir / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    size_mb = _weights_file(directory).stat().st_size / (1024 * 1024)
+    return {
+        "saved": True,
+        "path": str(directory),
+        "seconds": round(time.perf_counter() - start, 2),
+        "size_mb": round(size_mb, 1)
+    }
+
+
+def read_manifest(directory: Path) -> Optional[Dict[str, Any]]:
+    """Manifest de um snapshot válido para o ambiente atual (None se ausente/obsoleto)."""
+    manifest_file = directory / "manifest.json"
+    if not manifest_file.exists() or not _weights_file(directory).exists():
+        return None
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception:
+        return None
+    current = _source_key(Path(manifest.get("model_dir", "")))
+    if any(manifest.get(key) != value for key, value in current.items()):
+        return None
+    return manifest
+
+
+def load_xtts_snapshot(directory: Path, device: str):
+    """
+    Montar um TTS (api) a partir do snapshot, sem ModelManager e sem pickle.
+
+    Returns:
+        (api, info) ou (None, motivo) quando não há snapshot válido
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None, "sem snapshot válido"
+
+    start = time.perf_counter()
+    from TTS.api import TTS
+    from TTS.utils.synthesizer import Synthesizer
+    from TTS.tts.configs.xtts_config import XttsConfig
+    from TTS.tts.models.xtts import Xtts
+    from TTS.tts.layers.xtts.tokenizer import VoiceBpeTokenizer
+    from TTS.tts.utils.languages import LanguageManager
+    from TTS.tts.utils.speakers import SpeakerManager
+
+    model_dir = Path(manifest["model_dir"])
+    config = XttsConfig()
+    config.load_json(str(directory / "config.json"))
+
+    # Mesma montagem de Xtts.load_checkpoint, com os pesos vindo do snapshot
+    model = Xtts.init_from_config(config)
+    model.language_manager = LanguageManager(config)
+    speakers_file = model_dir / "speakers_xtts.pth"
+    model.speaker_manager = SpeakerManager(str(speakers_file)) if speakers_file.exists() else None
+    model.tokenizer = VoiceBpeTokenizer(vocab_file=str(model_dir / "vocab.json"))
+    model.init_models()
+    model.gpt.init_gpt_for_inference(kv_cache=model.args.kv_cache, use_deepspeed=False)
+
+    weights = _weights_file(directory)
+    if safetensors_torch is not None:
+        safetensors_torch.load_model(model, str(weights))
+        loader = "safetensors (mmap)"
+    else:
+        state_dict = torch.load(str(weights), mmap=True, weights_only=True, map_location="cpu")
+        model.load_state_dict(state_dict)
+        loader = "torch.load (mmap)"
+
+    model.hifigan_decoder.eval()
+    model.gpt.eval()
+    model.eval()
+    if device == "cuda":
+        model.cuda()
+
+    # TTS sem modelo + Synthesizer vazio apontando para o Xtts montado
+    api = TTS(progress_bar=False)
+    api.model_name = XTTS_MODEL_NAME
+    synthesizer = Synthesizer(use_cuda=(device == "cuda"))
+    synthesizer.tts_model = model
+    synthesizer.tts_config = config
+    synthesizer.output_sample_rate = config.audio["output_sample_rate"]
+    synthesizer.model_dir = str(model_dir)
+    api.synthesizer = synthesizer
+
+    return api, {
+        "loaded": True,
+        "path": str(directory),
+        "loader": loader,
+        "seconds": round(time.perf_counter() - start, 2)
+    }
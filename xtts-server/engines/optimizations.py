@@ -0,0 +1,247 @@
+"""
+Otimizações de modelo aplicadas pelos engines no load_model()
+
+Cada engine recebe um dicionário de otimizações via BaseTTSEngine.configure()
+e aplica o que fizer sentido para a sua arquitetura:
+
+- int8: quantização dinâmica INT8 (torch.ao.quantization.quantize_dynamic)
+  das camadas Linear. Só existe kernel para CPU (fbgemm/qnnpack); em CUDA
+  a opção é ignorada com aviso.
+- precision: "fp32", "bf16" ou "fp16", aplicada com torch.autocast na
+  inferência (pesos continuam em fp32, então latents em cache e a troca de
+  precisão não exigem conversão). fp16 só em CUDA; bf16 em CUDA com suporte
+  ou em CPUs com instruções bf16 (AVX512-BF16 / AMX).
+- compile: torch.compile do vocoder/decoder (módulos convolucionais e
+  estáveis). Os artefatos do Inductor/Triton ficam em .tts-cache/torch-compile,
+  então reinícios reaproveitam a compilação. Se compilar falhar (sem
+  compilador C++, versão antiga do torch, ...), o módulo volta ao modo eager.
+
+Observação sobre o GPT do XTTS: o GPT2 do HuggingFace usa Conv1D (pesos
+transpostos) em vez de nn.Linear, então quantize_dynamic não o enxergaria.
+convert_conv1d_to_linear() troca esses módulos por nn.Linear equivalentes
+antes da quantização.
+"""
+
+import os
+import time
+import contextlib
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterable, Optional, Tuple
+
+import torch
+import torch.nn as nn
+
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+DEFAULT_OPTIMIZATIONS = {
+    "int8": False,        # Quantização dinâmica INT8 (CPU)
+    "precision": "fp32",  # fp32 | bf16 | fp16 (autocast)
+    "compile": False,     # torch.compile do vocoder/decoder
+    "snapshot": True,     # Carregar/gravar snapshot local mmap (ver model_snapshot.py)
+}
+
+COMPILE_CACHE_DIR = Path(__file__).parent.parent / ".tts-cache" / "torch-compile"
+
+PRECISION_DTYPES = {
+    "fp32": torch.float32,
+    "bf16": torch.bfloat16,
+    "fp16": torch.float16,
+}
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def int8_supported(device: str) -> Tuple[bool, str]:
+    """
+    Verificar se a quantização dinâmica INT8 pode ser usada.
+
+    Returns:
+        (suportado, motivo quando não suportado)
+    """
+    if device != "cpu":
+        return False, "quantização dinâmica INT8 só tem kernels para CPU"
+    engines = getattr(torch.backends.quantized, "supported_engines", [])
+    if not any(e in engines for e in ("fbgemm", "x86", "qnnpack")):
+        return False, f"nenhum backend quantizado disponível ({engines})"
+    return True, ""
+
+
+def _is_hf_conv1d(module: nn.Module) -> bool:
+    """Conv1D do transformers (GPT2): weight com shape (in_features, out_features)."""
+    return type(module).__name__ == "Conv1D" and hasattr(module, "nf") and hasattr(module, "weight")
+
+
+def convert_conv1d_to_linear(root: nn.Module) -> int:
+    """
+    Substituir Conv1D (transformers) por nn.Linear equivalentes, in-place.
+
+    Args:
+        root: Módulo raiz (ex: gpt do XTTS)
+
+    Returns:
+        Número de módulos convertidos
+    """
+    converted = 0
+    for parent in list(root.modules()):
+        for name, child in list(parent.named_children()):
+            if not _is_hf_conv1d(child):
+                continue
+            in_features, out_features = child.weight.shape
+            linear = nn.Linear(in_features, out_features, bias=child.bias is not None)
+            linear = linear.to(device=child.weight.device, dtype=child.weight.dtype)
+            with torch.no_grad():
+                linear.weight.copy_(child.weight.t())
+                if child.bias is not None:
+                    linear.bias.copy_(child.bias)
+            setattr(parent, name, linear)
+            converted += 1
+    return converted
+
+
+def count_linear(root: nn.Module) -> int:
+    return sum(1 for m in root.modules() if isinstance(m, nn.Linear))
+
+
+def quantize_int8(root: nn.Module) -> int:
+    """
+    Quantização dinâmica INT8 das camadas Linear de um módulo, in-place.
+
+    Returns:
+        Número de camadas Linear quantizadas
+    """
+    count = count_linear(root)
+    if count:
+        torch.ao.quantization.quantize_dynamic(root, {nn.Linear}, dtype=torch.qint8, inplace=True)
+    return count
+
+
+def quantize_named_modules(container: Any, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Quantizar submódulos por nome (atributos ou chaves de dicionário).
+
+    Nomes ausentes são ignorados (a estrutura varia entre versões dos pacotes).
+
+    Returns:
+        {nome: camadas quantizadas}
+    """
+    result = {}
+    for name in names:
+        if isinstance(container, dict):
+            module = container.get(name)
+        else:
+            module = getattr(container, name, None)
+        if isinstance(module, nn.Module):
+            convert_conv1d_to_linear(module)
+            result[name] = quantize_int8(module)
+    return result
+
+
+def cpu_supports_bf16() -> bool:
+    """Detectar suporte nativo a bf16 na CPU (oneDNN, ou flags do /proc/cpuinfo)."""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        pass
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+        return "avx512_bf16" in flags or "amx_bf16" in flags
+    except OSError:
+        return False
+
+
+def resolve_precision(requested: str, device: str) -> Tuple[str, str]:
+    """
+    Escolher a precisão efetiva para o dispositivo.
+
+    Returns:
+        (precisão efetiva, motivo quando diferente da pedida)
+    """
+    requested = (requested or "fp32").lower()
+    if requested not in PRECISION_DTYPES:
+        return "fp32", f"precisão desconhecida: {requested}"
+    if requested == "fp16" and device != "cuda":
+        return "fp32", "fp16 só é acelerado em CUDA"
+    if requested == "bf16":
+        if device == "cuda" and not torch.cuda.is_bf16_supported():
+            return "fp32", "GPU sem suporte a bf16"
+        if device != "cuda" and not cpu_supports_bf16():
+            return "fp32", "CPU sem instruções bf16"
+    return requested, ""
+
+
+def autocast_context(device: str, precision: str):
+    """Contexto de autocast para a precisão (nullcontext em fp32)."""
+    if precision == "fp32":
+        return contextlib.nullcontext()
+    return torch.autocast(device_type="cuda" if device == "cuda" else "cpu", dtype=PRECISION_DTYPES[precision])
+
+
+def _enable_compile_cache() -> None:
+    """Apontar os caches do Inductor/Triton para .tts-cache (persistem entre reinícios)."""
+    COMPILE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", str(COMPILE_CACHE_DIR / "inductor"))
+    os.environ.setdefault("TRITON_CACHE_DIR", str(COMPILE_CACHE_DIR / "triton"))
+    try:
+        import torch._inductor.config as inductor_config
+        inductor_config.fx_graph_cache = True
+    except Exception:
+        pass
+
+
+def compile_forward(module: nn.Module, label: str, warmup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """
+    Compilar o forward de um módulo com fallback automático para eager.
+
+    O forward é trocado na instância (o módulo e seus submódulos continuam
+    acessíveis normalmente, ex: hifigan_decoder.speaker_encoder). Se a
+    compilação ou uma chamada compilada falhar, o forward eager original
+    é restaurado.
+
+    Args:
+        module: Módulo a compilar
+        label: Nome para logs
+        warmup: Chamada opcional que exercita o módulo (compila no load,
+                não na primeira requisição)
+
+    Returns:
+        {"applied": bool, "reason"/"warmup_seconds": ...}
+    """
+    if not hasattr(torch, "compile"):
+        return {"applied": False, "reason": "torch.compile indisponível (torch < 2.0)"}
+
+    _enable_compile_cache()
+    eager_forward = module.forward
+    try:
+        compiled = torch.compile(eager_forward, dynamic=True)
+    except Exception as e:
+        return {"applied": False, "reason": str(e)}
+
+    def forward(*args, **kwargs):
+        try:
+            return compiled(*args, **kwargs)
+        except Exception as e:
+            print(f"⚠️ {label} compilado falhou ({e}); voltando para eager")
+            module.forward = eager_forward
+            return eager_forward(*args, **kwargs)
+
+    module.forward = forward
+
+    info: Dict[str, Any] = {"applied": True, "cache_dir": str(COMPILE_CACHE_DIR)}
+    if warmup is not None:
+        start = time.perf_counter()
+        try:
+            warmup()
+        except Exception as e:
+            module.forward = eager_forward
+            return {"applied": False, "reason": f"warm-up falhou: {e}"}
+        if module.forward is eager_forward:
+            return {"applied": False, "reason": "compilação falhou no warm-up"}
+        info["warmup_seconds"] = round(time.perf_counter() - start, 2)
+    print(f"⚙️ {label} compilado com torch.compile ({info.get('warmup_seconds', 'lazy')}s)")
+    return info
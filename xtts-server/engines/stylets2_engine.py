@@ -17,9 +17,8 @@ import sys
 import io
 import json
 import torch
+import threading
 import traceback
-import numpy as np
-import scipy.io.wavfile as wavfile
 from pathlib import Path
 from typing import Optional, List, Tuple, Dict, Any
 from datetime import datetime
@@ -32,25 +31,19 @@ if sys.stderr.encoding != 'utf-8':
     import io
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-# Try to import StyleTTS2
-STYLETTS2_AVAILABLE = False
-try:
-    from styletts2 import tts
-    STYLETTS2_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠ StyleTTS2 não encontrado: {e}")
+# StyleTTS2: só verificar se o pacote existe (o import, com phonemizer/nltk,
+# fica para o load_model e não atrasa a subida do servidor)
+import importlib.util
+STYLETTS2_AVAILABLE = importlib.util.find_spec("styletts2") is not None
+if not STYLETTS2_AVAILABLE:
+    print("⚠ StyleTTS2 não encontrado")
     print("   StyleTTS2 é opcional. Use: pip install styletts2")
-    tts = None
-
-try:
-    import torchaudio
-except ImportError as e:
-    if STYLETTS2_AVAILABLE:
-        print(f"❌ ERRO: torchaudio não encontrado: {e}")
-        sys.exit(1)
-    torchaudio = None
 
 from engines.base_engine import BaseTTSEngine, register_engine
+from audio_buffer import encode_wav
+from dsp import normalize_audio_file, apply_speed_adjustment, postprocess, peak_normalize
+from engines.optimizations import int8_supported, quantize_named_modules, compile_forward
+from stage_timing import instrument_module
 
 
 # ============================================================================
@@ -99,103 +92,47 @@ INFERENCE_CONFIG = {
     "embedding_scale": 1.0,    # Emotionality
 }
 
+# Limite das probabilidades por bin do preditor de duração (logit finito)
+DURATION_PROB_EPS = 1e-4
+
 
 # ============================================================================
-# AUDIO PROCESSING UTILITIES
+# DURATION CONTROL
 # ============================================================================
 
-def normalize_audio_file(wav_path: str, target_sr: int = 22050) -> str:
-    """Normalizar arquivo de áudio."""
-    try:
-        try:
-            sr, wav_data = wavfile.read(wav_path)
-            print(f"   📊 Carregado com scipy: sr={sr}, shape={wav_data.shape}")
-            
-            if wav_data.size == 0:
-                raise ValueError("Arquivo WAV vazio")
-            
-            if sr <= 0:
-                raise ValueError(f"Sample rate inválido: {sr}")
-            
-            if wav_data.dtype != np.float32:
-                wav_data = wav_data.astype(np.float32) / np.iinfo(wav_data.dtype).max
-            
-            wav_data = np.clip(wav_data, -1.0, 1.0)
-            wav = torch.from_numpy(wav_data)
-            
-        except Exception as e:
-            print(f"   ⚠️ Scipy falhou: {str(e)}, tentando torchaudio...")
-            wav, sr = torchaudio.load(wav_path)
-            print(f"   📊 Carregado com torchaudio: sr={sr}, shape={wav.shape}")
-            
-            if wav.shape[1] == 0:
-                raise ValueError("Arquivo WAV sem amostras")
-        
-        if not isinstance(wav, torch.Tensor):
-            wav = torch.from_numpy(wav)
-        
-        if wav.dim() == 1:
-            wav = wav.unsqueeze(0)
-        
-        min_samples = int(target_sr * 0.5)
-        if wav.shape[1] < min_samples:
-            padding = min_samples - wav.shape[1]
-            wav = torch.nn.functional.pad(wav, (0, padding), mode='constant', value=0.0)
-        
-        if sr != target_sr:
-            resampler = torchaudio.transforms.Resample(sr, target_sr)
-            wav = resampler(wav)
-        
-        if wav.shape[0] > 1:
-            wav = wav.mean(dim=0, keepdim=True)
-        
-        max_val = torch.abs(wav).max()
-        if max_val > 0:
-            wav = wav / (max_val * 1.05)
-        
-        wav = torch.clamp(wav, -0.95, 0.95)
-        
-        normalized_path = wav_path.replace('.wav', '_normalized.wav')
-        wav_int16 = (wav.squeeze(0).numpy() * 32767).astype(np.int16)
-        wavfile.write(normalized_path, target_sr, wav_int16)
-        
-        print(f"   ✅ Normalizado: {normalized_path}")
-        return normalized_path
-        
-    except Exception as e:
-        print(f"   ❌ Erro de normalização: {str(e)}")
-        return wav_path
-
-
-def apply_speed_adjustment(wav_data, speed_factor: float):
-    """Ajustar velocidade de reprodução."""
-    if speed_factor == 1.0:
-        return wav_data
+class _DurationScale(torch.nn.Module):
+    """
+    Envolve predictor.duration_proj para aplicar `speed` no próprio modelo.
     
-    try:
-        if not isinstance(wav_data, torch.Tensor):
-            wav_tensor = torch.tensor(wav_data, dtype=torch.float32)
-        else:
-            wav_tensor = wav_data.clone()
-        
-        if wav_tensor.dim() == 1:
-            wav_tensor = wav_tensor.unsqueeze(0)
-        
-        new_sr = int(SAMPLE_RATE * speed_factor)
-        resampler = torchaudio.transforms.Resample(SAMPLE_RATE, new_sr)
-        speed_adjusted = resampler(wav_tensor)
-        
-        if isinstance(speed_adjusted, torch.Tensor):
-            speed_adjusted = speed_adjusted.numpy()
-        
-        if speed_adjusted.ndim > 1 and speed_adjusted.shape[0] == 1:
-            speed_adjusted = speed_adjusted.squeeze(0)
-        
-        return speed_adjusted
+    O StyleTTS2 calcula a duração de cada fonema como
+    sigmoid(duration_proj(x)).sum(-1). A escala (1 / speed) da thread atual
+    é aplicada a essa soma: as probabilidades são redistribuídas igualmente
+    entre os bins para que a soma vire duração * escala. Sem reamostragem da
+    saída, então o pitch não muda.
+    """
+    
+    def __init__(self, proj: torch.nn.Module):
+        super().__init__()
+        self.proj = proj
+        self.state = threading.local()
     
-    except Exception as e:
-        print(f"⚠️ Ajuste de velocidade falhou: {e}")
-        return wav_data
+    @property
+    def scale(self) -> float:
+        return getattr(self.state, "scale", 1.0)
+    
+    @scale.setter
+    def scale(self, value: float):
+        self.state.scale = value
+    
+    def forward(self, x):
+        logits = self.proj(x)
+        scale = self.scale
+        if scale == 1.0:
+            return logits
+        bins = logits.shape[-1]
+        total = torch.sigmoid(logits).sum(dim=-1, keepdim=True) * scale
+        probs = (total / bins).clamp(DURATION_PROB_EPS, 1.0 - DURATION_PROB_EPS)
+        return torch.logit(probs).expand_as(logits)
 
 
 # ============================================================================
@@ -214,6 +151,7 @@ if STYLETTS2_AVAILABLE:
             
             super().__init__(device=device, model_name="styletts2")
             self.tts_model = None
+            self.duration_control: Optional[_DurationScale] = None
         
         def load_model(self) -> None:
             """Carregar modelo StyleTTS2."""
@@ -222,7 +160,16 @@ if STYLETTS2_AVAILABLE:
             
             try:
                 print(f"⏳ Carregando modelo StyleTTS2 ({self.device})...")
+                from styletts2 import tts
                 self.tts_model = tts.StyleTTS2()
+                self._apply_optimizations()
+                self._install_duration_control()
+                
+                # Tempo do decoder como estágio "vocoder" da requisição (stage_timing.py)
+                decoder = getattr(self.tts_model, "model", {}).get("decoder")
+                if decoder is not None:
+                    synchronize = torch.cuda.synchronize if self.device == "cuda" else None
+                    instrument_module(decoder, "vocoder", synchronize)
                 
                 print(f"✅ StyleTTS2 carregado com sucesso")
                 print(f"   📊 Model: LibriTTS (multi-speaker)")
@@ -235,6 +182,45 @@ if STYLETTS2_AVAILABLE:
                 traceback.print_exc()
                 raise
         
+        def _apply_optimizations(self) -> None:
+            """Aplicar as otimizações pedidas via configure() ao modelo recém-carregado."""
+            self.applied_optimizations = {}
+            
+            if self.optimizations.get("int8"):
+                supported, reason = int8_supported(self.device)
+                if not supported:
+                    print(f"⚠️ INT8 ignorado: {reason}")
+                    self.applied_optimizations["int8"] = {"applied": False, "reason": reason}
+                else:
+                    # Módulos com muitas Linear (ALBERT, projeção e preditor de duração/prosódia)
+                    modules = quantize_named_modules(
+                        getattr(self.tts_model, "model", {}),
+                        ("bert", "bert_encoder", "predictor")
+                    )
+                    print(f"🔢 INT8 dinâmico aplicado: {modules}")
+                    self.applied_optimizations["int8"] = {"applied": bool(modules), "modules": modules}
+            
+            if self.optimizations.get("compile"):
+                decoder = getattr(self.tts_model, "model", {}).get("decoder")
+                if decoder is None:
+                    self.applied_optimizations["compile"] = {"applied": False, "reason": "decoder não encontrado"}
+                else:
+                    # Compilação preguiçosa: a primeira síntese paga o custo (ou o cache em .tts-cache)
+                    self.applied_optimizations["compile"] = compile_forward(decoder, "Decoder (StyleTTS2)")
+        
+        def _install_duration_control(self) -> None:
+            """Envolver o preditor de duração (depois do INT8, que troca as Linear)."""
+            predictor = getattr(self.tts_model, "model", {}).get("predictor")
+            proj = getattr(predictor, "duration_proj", None)
+            if proj is None:
+                print("⚠️ Preditor de duração não encontrado; velocidade via reamostragem")
+                self.duration_control = None
+                return
+            if not isinstance(proj, _DurationScale):
+                proj = _DurationScale(proj)
+                predictor.duration_proj = proj
+            self.duration_control = proj
+        
         def unload_model(self) -> None:
             """Descarregar modelo."""
             if not self.loaded:
@@ -244,6 +230,7 @@ if STYLETTS2_AVAILABLE:
                 if self.tts_model:
                     del self.tts_model
                     self.tts_model = None
+                self.duration_control = None
                 
                 if self.device == "cuda":
                     torch.cuda.empty_cache()
@@ -285,36 +272,28 @@ if STYLETTS2_AVAILABLE:
                 
                 print(f"🎙️ Sintetizando ({language}): '{text[:50]}...'")
                 
-                wav = self.tts_model.inference(
-                    text=text,
-                    target_voice_path=target_voice_path,
-                    output_wav_file=None,
-                    output_sample_rate=SAMPLE_RATE,
-                    alpha=alpha,
-                    beta=beta,
-                    diffusion_steps=diffusion_steps,
-                    embedding_scale=embedding_scale
-                )
-                
-                if isinstance(wav, torch.Tensor):
-                    wav = wav.cpu().numpy()
-                
-                if wav.ndim > 1:
-                    wav = wav.flatten()
+                # Velocidade no preditor de duração; reamostragem só sem ele
+                native_speed = self.duration_control is not None and speed != 1.0
+                if native_speed:
+                    self.duration_control.scale = 1.0 / max(speed, 0.05)
+                try:
+                    wav = self.tts_model.inference(
+                        text=text,
+                        target_voice_path=target_voice_path,
+                        output_wav_file=None,
+                        output_sample_rate=SAMPLE_RATE,
+                        alpha=alpha,
+                        beta=beta,
+                        diffusion_steps=diffusion_steps,
+                        embedding_scale=embedding_scale
+                    )
+                finally:
+                    if native_speed:
+                        self.duration_control.scale = 1.0
                 
-                if speed != 1.0:
-                    wav = apply_speed_adjustment(wav, speed)
-                
-                max_val = np.abs(wav).max()
-                if max_val > 0:
-                    wav = wav / (max_val * 1.05)
-                wav = np.clip(wav, -0.95, 0.95)
-                
-                wav_int16 = (wav * 32767).astype(np.int16)
-                
-                wav_buffer = io.BytesIO()
-                wavfile.write(wav_buffer, SAMPLE_RATE, wav_int16)
-                wav_bytes = wav_buffer.getvalue()
+                # Normalização in-place, WAV em memória (dsp.py)
+                wav = peak_normalize(postprocess(wav, SAMPLE_RATE, SAMPLE_RATE, 1.0 if native_speed else speed))
+                wav_bytes = encode_wav(wav, SAMPLE_RATE)
                 
                 print(f"✅ Síntese completa: {len(wav_bytes)} bytes")
                 
@@ -379,6 +358,11 @@ if STYLETTS2_AVAILABLE:
         def supports_voice_cloning(self) -> bool:
             """StyleTTS2 suporta clonagem de voz."""
             return True
+        
+        @classmethod
+        def supports_native_speed(cls) -> bool:
+            """StyleTTS2 escala a saída do preditor de duração (_DurationScale)."""
+            return True
 
 
 # ============================================================================
@@ -18,7 +18,6 @@ import json
 import torch
 import traceback
 import numpy as np
-import scipy.io.wavfile as wavfile
 from pathlib import Path
 from typing import Optional, List, Tuple, Dict, Any
 from datetime import datetime
@@ -43,14 +42,28 @@ try:
     
     torch.load = patched_torch_load
     
-    from TTS.api import TTS  # type: ignore
-    import torchaudio
+    # TTS.api (e transformers) só é importado no load_model: importar este
+    # módulo fica barato e o servidor aceita conexões antes do modelo carregar
+    import importlib.util
+    if importlib.util.find_spec("TTS") is None:
+        raise ImportError("No module named 'TTS'")
     
 except ImportError as e:
     print(f"❌ ERRO: Dependências TTS não encontradas: {e}")
     sys.exit(1)
 
 from engines.base_engine import BaseTTSEngine, register_engine
+from engines.optimizations import (
+    int8_supported, convert_conv1d_to_linear, quantize_int8, resolve_precision, autocast_context,
+    compile_forward
+)
+from engines.model_snapshot import (
+    XTTS_MODEL_NAME, snapshot_path, save_xtts_snapshot, load_xtts_snapshot
+)
+from reference_store import load_normalized_audio
+from audio_buffer import encode_wav
+from dsp import normalize_audio_file, apply_speed_adjustment, postprocess, peak_normalize
+from stage_timing import instrument_module
 
 
 # ============================================================================
@@ -108,154 +121,6 @@ LANGUAGE_SUPPORT = [
 ]
 
 
-# ============================================================================
-# AUDIO PROCESSING UTILITIES
-# ============================================================================
-
-def normalize_audio_file(wav_path: str, target_sr: int = 22050) -> str:
-    """
-    Normalizar e converter arquivo de áudio para formato esperado pelo XTTS.
-    Inclui validação robusta e tratamento de erros para arquivos corrompidos.
-    
-    Args:
-        wav_path: Caminho do arquivo WAV de entrada
-        target_sr: Sample rate de destino (default 22050)
-    
-    Returns:
-        Caminho do arquivo WAV normalizado
-    """
-    try:
-        # Tentar carregar com scipy (mais robusto para WAVs de navegador)
-        try:
-            sr, wav_data = wavfile.read(wav_path)
-            print(f"   📊 Carregado com scipy: sr={sr}, shape={wav_data.shape}")
-            
-            if wav_data.size == 0:
-                raise ValueError("Arquivo WAV vazio")
-            
-            if sr <= 0:
-                raise ValueError(f"Sample rate inválido: {sr}")
-            
-            # Converter para float32 se necessário
-            if wav_data.dtype != np.float32:
-                wav_data = wav_data.astype(np.float32) / np.iinfo(wav_data.dtype).max
-            
-            # Clamp para evitar CUDA assertion
-            wav_data = np.clip(wav_data, -1.0, 1.0)
-            
-            wav = torch.from_numpy(wav_data)
-            
-        except Exception as e:
-            print(f"   ⚠️ Scipy falhou: {str(e)}, tentando torchaudio...")
-            wav, sr = torchaudio.load(wav_path)
-            print(f"   📊 Carregado com torchaudio: sr={sr}, shape={wav.shape}")
-            
-            if wav.shape[1] == 0:
-                raise ValueError("Arquivo WAV sem amostras")
-            
-            if sr <= 0:
-                raise ValueError(f"Sample rate inválido: {sr}")
-        
-        # Garantir que é tensor
-        if not isinstance(wav, torch.Tensor):
-            wav = torch.from_numpy(wav)
-        
-        # Validar valores para evitar CUDA assert
-        if torch.isnan(wav).any():
-            print(f"   ⚠️ Valores NaN detectados, substituindo por zeros")
-            wav = torch.nan_to_num(wav, nan=0.0, posinf=1.0, neginf=-1.0)
-        
-        if torch.isinf(wav).any():
-            print(f"   ⚠️ Valores Inf detectados, clamando")
-            wav = torch.clamp(wav, min=-1.0, max=1.0)
-        
-        # Handle shape
-        if wav.dim() == 1:
-            wav = wav.unsqueeze(0)
-        elif wav.dim() == 2:
-            pass
-        else:
-            raise ValueError(f"Shape inesperado: {wav.shape}")
-        
-        print(f"   📊 Após reshape: shape={wav.shape}")
-        
-        # Garantir comprimento mínimo (pelo menos 1 segundo)
-        min_samples = target_sr
-        if wav.shape[1] < min_samples:
-            print(f"   ⚠️ Áudio muito curto ({wav.shape[1]} samples), padding para {min_samples}")
-            padding = min_samples - wav.shape[1]
-            wav = torch.nn.functional.pad(wav, (0, padding), mode='constant', value=0.0)
-        
-        # Resample se necessário
-        if sr != target_sr:
-            resampler = torchaudio.transforms.Resample(sr, target_sr)
-            wav = resampler(wav)
-            print(f"   📊 Reamostrado para {target_sr}Hz")
-        
-        # Converter para mono se estéreo
-        if wav.shape[0] > 1:
-            wav = wav.mean(dim=0, keepdim=True)
-            print(f"   📊 Convertido para mono: shape={wav.shape}")
-        
-        # Normalizar para [-0.95, 0.95]
-        max_val = torch.abs(wav).max()
-        if max_val > 0:
-            wav = wav / (max_val * 1.05)
-        
-        wav = torch.clamp(wav, -0.95, 0.95)
-        
-        # Salvar normalizado usando scipy
-        normalized_path = wav_path.replace('.wav', '_normalized.wav')
-        wav_int16 = (wav.squeeze(0).numpy() * 32767).astype(np.int16)
-        wavfile.write(normalized_path, target_sr, wav_int16)
-        
-        print(f"   ✅ Normalizado: {normalized_path}")
-        
-        return normalized_path
-        
-    except Exception as e:
-        print(f"   ❌ Erro de normalização: {str(e)}")
-        traceback.print_exc()
-        return wav_path
-
-
-def apply_speed_adjustment(wav_data, speed_factor: float):
-    """
-    Ajustar velocidade de reprodução de áudio.
-    
-    Args:
-        wav_data: Dados de áudio (torch.Tensor ou numpy array)
-        speed_factor: Multiplicador de velocidade (0.5 a 2.0)
-    
-    Returns:
-        Áudio com velocidade ajustada
-    """
-    if speed_factor == 1.0:
-        return wav_data
-    
-    try:
-        if not isinstance(wav_data, torch.Tensor):
-            wav_tensor = torch.tensor(wav_data, dtype=torch.float32)
-        else:
-            wav_tensor = wav_data.clone()
-        
-        if wav_tensor.dim() == 1:
-            wav_tensor = wav_tensor.unsqueeze(0)
-        
-        new_sr = int(SAMPLE_RATE * speed_factor)
-        resampler = torchaudio.transforms.Resample(SAMPLE_RATE, new_sr)
-        speed_adjusted = resampler(wav_tensor)
-        
-        if speed_adjusted.shape[0] == 1:
-            speed_adjusted = speed_adjusted.squeeze(0)
-        
-        return speed_adjusted
-    
-    except Exception as e:
-        print(f"⚠️ Ajuste de velocidade falhou: {e}. Retornando áudio original.")
-        return wav_data
-
-
 # ============================================================================
 # XTTS ENGINE CLASS
 # ============================================================================
@@ -284,6 +149,7 @@ class XTTSEngine(BaseTTSEngine):
         
         super().__init__(device=device, model_name="xtts_v2")
         self.tts_model = None
+        self.precision = "fp32"  # Precisão efetiva do GPT + HiFi-GAN (autocast)
     
     def load_model(self) -> None:
         """Carregar modelo XTTS v2."""
@@ -294,12 +160,40 @@ class XTTSEngine(BaseTTSEngine):
             print(f"⏳ Carregando modelo XTTS v2 ({self.device})...")
             
             use_gpu = (self.device == "cuda")
+            snapshot_info = None
             
-            self.tts_model = TTS(
-                model_name="tts_models/multilingual/multi-dataset/xtts_v2",
-                gpu=use_gpu,
-                progress_bar=True
-            )
+            # Snapshot local (mmap, sem ModelManager/pickle) quando existir
+            if self.optimizations.get("snapshot", True):
+                try:
+                    self.tts_model, snapshot_info = load_xtts_snapshot(snapshot_path(), self.device)
+                except Exception as e:
+                    print(f"⚠️ Snapshot inválido ({e}); carregando pelo ModelManager")
+                    self.tts_model, snapshot_info = None, {"loaded": False, "reason": str(e)}
+                if self.tts_model is not None:
+                    print(f"⚡ XTTS v2 carregado do snapshot em {snapshot_info['seconds']}s ({snapshot_info['loader']})")
+            
+            if self.tts_model is None:
+                from TTS.api import TTS  # type: ignore
+                
+                self.tts_model = TTS(
+                    model_name=XTTS_MODEL_NAME,
+                    gpu=use_gpu,
+                    progress_bar=True
+                )
+                
+                # Gravar o snapshot antes de otimizações que alteram o modelo (INT8)
+                if self.optimizations.get("snapshot", True):
+                    try:
+                        snapshot_info = save_xtts_snapshot(self.tts_model, snapshot_path())
+                        print(f"💾 Snapshot do XTTS v2 gravado ({snapshot_info['size_mb']} MB, {snapshot_info['seconds']}s)")
+                    except Exception as e:
+                        print(f"⚠️ Não foi possível gravar o snapshot: {e}")
+                        snapshot_info = {"saved": False, "reason": str(e)}
+            
+            self._apply_optimizations()
+            if snapshot_info is not None:
+                self.applied_optimizations["snapshot"] = snapshot_info
+            self._instrument()
             
             print(f"✅ XTTS v2 carregado com sucesso")
             self.loaded = True
@@ -309,6 +203,60 @@ class XTTSEngine(BaseTTSEngine):
             traceback.print_exc()
             raise
     
+    def _instrument(self) -> None:
+        """Tempo do HiFi-GAN como estágio "vocoder" da requisição (stage_timing.py)."""
+        synchronize = torch.cuda.synchronize if self.device == "cuda" else None
+        instrument_module(self.xtts_model.hifigan_decoder, "vocoder", synchronize)
+    
+    def _apply_optimizations(self) -> None:
+        """Aplicar as otimizações pedidas via configure() ao modelo recém-carregado."""
+        self.applied_optimizations = {}
+        model = self.xtts_model
+        
+        if self.optimizations.get("int8"):
+            supported, reason = int8_supported(self.device)
+            if not supported:
+                print(f"⚠️ INT8 ignorado: {reason}")
+                self.applied_optimizations["int8"] = {"applied": False, "reason": reason}
+            else:
+                # GPT (autoregressivo) concentra o custo na CPU; HiFi-GAN é convolucional
+                converted = convert_conv1d_to_linear(model.gpt)
+                quantized = quantize_int8(model.gpt)
+                print(f"🔢 INT8 dinâmico aplicado ao GPT: {quantized} Linear ({converted} Conv1D convertidos)")
+                self.applied_optimizations["int8"] = {
+                    "applied": True,
+                    "modules": {"gpt": quantized},
+                    "conv1d_converted": converted
+                }
+        
+        requested = self.optimizations.get("precision", "fp32")
+        precision, reason = resolve_precision(requested, self.device)
+        if precision != "fp32" and self.applied_optimizations.get("int8", {}).get("applied"):
+            # Linear quantizadas esperam entradas fp32
+            precision, reason = "fp32", "INT8 ativo (camadas quantizadas usam fp32)"
+        if reason:
+            print(f"⚠️ Precisão {requested} indisponível: {reason}; usando {precision}")
+        self.precision = precision
+        self.applied_optimizations["precision"] = {"requested": requested, "effective": precision, "reason": reason or None}
+        if precision != "fp32":
+            print(f"🔢 Precisão {precision} (autocast) no GPT e HiFi-GAN")
+        
+        if self.optimizations.get("compile"):
+            decoder = model.hifigan_decoder
+            
+            def warmup():
+                # Compila no load (com a precisão efetiva) em vez de na primeira requisição
+                with torch.inference_mode(), self._autocast():
+                    latents = torch.zeros((1, 32, getattr(model.args, "gpt_n_model_channels", 1024)), device=model.device)
+                    speaker = torch.zeros((1, getattr(model.args, "d_vector_dim", 512), 1), device=model.device)
+                    decoder(latents, g=speaker)
+            
+            self.applied_optimizations["compile"] = compile_forward(decoder, "HiFi-GAN (XTTS)", warmup)
+    
+    def _autocast(self):
+        """Autocast na precisão efetiva (GPT + HiFi-GAN; conditioning continua fp32)."""
+        return autocast_context(self.device, self.precision)
+    
     def unload_model(self) -> None:
         """Descarregar modelo e liberar memória."""
         if not self.loaded:
@@ -359,51 +307,40 @@ class XTTSEngine(BaseTTSEngine):
             raise ValueError(f"Idioma não suportado: {language}")
         
         try:
-            # Normalizar idioma para XTTS
-            lang_code = self._normalize_language(language)
+            # Latents pré-calculados (ex: SpeakerEmbeddingManager) têm prioridade
+            gpt_cond_latent = kwargs.get("gpt_cond_latent")
+            speaker_embedding = kwargs.get("speaker_embedding")
             
-            # Determinar tipo de voz
-            speaker_wav = None
-            if voice != "default" and voice is not None:
-                # Tentar carregar como arquivo de clonagem
-                if os.path.exists(voice):
-                    speaker_wav = normalize_audio_file(voice, target_sr=22050)
+            if gpt_cond_latent is None or speaker_embedding is None:
+                # Determinar tipo de voz
+                if voice == "default" or voice is None or not os.path.exists(voice):
+                    raise ValueError("XTTS v2 requer um arquivo de referência (speaker_wav) ou latents")
+                
+                # Normalizar em memória (sem gravar *_normalized.wav)
+                gpt_cond_latent, speaker_embedding = self.compute_conditioning_latents_from_audio(
+                    [load_normalized_audio(voice, target_sr=22050)],
+                    gpt_cond_len=kwargs.get("gpt_cond_len", SYNTHESIS_CONFIG["gpt_cond_len"]),
+                    gpt_cond_chunk_len=kwargs.get("gpt_cond_chunk_len", SYNTHESIS_CONFIG["gpt_cond_chunk_len"]),
+                    max_ref_len=kwargs.get("max_ref_len", SYNTHESIS_CONFIG["max_ref_len"])
+                )
             
-            print(f"🎙️ Sintetizando ({lang_code}): '{text[:50]}...'")
+            print(f"🎙️ Sintetizando ({language}): '{text[:50]}...'")
             
-            # Sintetizar
-            wav = self.tts_model.tts(
+            # Sintetizar (velocidade aplicada pelo próprio modelo)
+            wav = self.inference_with_latents(
                 text=text,
-                language=lang_code,
-                speaker_wav=speaker_wav,
-                progress_bar=False,
-                length_penalty=SYNTHESIS_CONFIG["gpt_cond_len"]
+                language=language,
+                gpt_cond_latent=gpt_cond_latent,
+                speaker_embedding=speaker_embedding,
+                temperature=kwargs.get("temperature", 0.75),
+                top_k=kwargs.get("top_k", 50),
+                top_p=kwargs.get("top_p", 0.85),
+                speed=speed
             )
             
-            # Converter para numpy se necessário
-            if isinstance(wav, torch.Tensor):
-                wav = wav.cpu().numpy()
-            
-            # Aplicar ajuste de velocidade
-            if speed != 1.0:
-                wav = apply_speed_adjustment(wav, speed)
-                if isinstance(wav, torch.Tensor):
-                    wav = wav.numpy()
-            
-            # Normalizar
-            max_val = np.abs(wav).max()
-            if max_val > 0:
-                wav = wav / (max_val * 1.05)
-            wav = np.clip(wav, -0.95, 0.95)
-            
-            # Converter para WAV bytes
-            wav_int16 = (wav * 32767).astype(np.int16)
-            
-            # Salvar em bytes (WAV em memória)
-            import io
-            wav_buffer = io.BytesIO()
-            wavfile.write(wav_buffer, SAMPLE_RATE, wav_int16)
-            wav_bytes = wav_buffer.getvalue()
+            # Normalização in-place, WAV em memória (dsp.py)
+            wav = peak_normalize(postprocess(wav, SAMPLE_RATE, SAMPLE_RATE))
+            wav_bytes = encode_wav(wav, SAMPLE_RATE)
             
             print(f"✅ Síntese completa: {len(wav_bytes)} bytes")
             
@@ -414,6 +351,287 @@ class XTTSEngine(BaseTTSEngine):
             traceback.print_exc()
             raise
     
+    @property
+    def xtts_model(self):
+        """Modelo Xtts interno (synthesizer.tts_model), usado para inferência direta."""
+        if self.tts_model is None:
+            return None
+        return self.tts_model.synthesizer.tts_model
+    
+    def compute_conditioning_latents(
+        self,
+        audio_paths,
+        gpt_cond_len: int = SYNTHESIS_CONFIG["gpt_cond_len"],
+        gpt_cond_chunk_len: int = SYNTHESIS_CONFIG["gpt_cond_chunk_len"],
+        max_ref_len: int = SYNTHESIS_CONFIG["max_ref_len"]
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Calcular latents de conditioning do XTTS a partir de áudio(s) de referência.
+        
+        Args:
+            audio_paths: Caminho (ou lista de caminhos) dos WAVs de referência
+            gpt_cond_len: Segundos de áudio usados no latent do GPT
+            gpt_cond_chunk_len: Tamanho do chunk do latent do GPT
+            max_ref_len: Máximo de segundos de referência
+        
+        Returns:
+            (gpt_cond_latent, speaker_embedding)
+        """
+        if not self.loaded:
+            raise RuntimeError("Modelo não carregado. Chamar load_model() primeiro.")
+        
+        gpt_cond_len = max(1, int(round(gpt_cond_len)))
+        gpt_cond_chunk_len = max(1, min(int(round(gpt_cond_chunk_len)), gpt_cond_len))
+        
+        with torch.inference_mode():
+            gpt_cond_latent, speaker_embedding = self.xtts_model.get_conditioning_latents(
+                audio_path=audio_paths,
+                gpt_cond_len=gpt_cond_len,
+                gpt_cond_chunk_len=gpt_cond_chunk_len,
+                max_ref_length=max(int(round(max_ref_len)), gpt_cond_len)
+            )
+        
+        return gpt_cond_latent, speaker_embedding
+    
+    def compute_conditioning_latents_from_audio(
+        self,
+        audios: List[np.ndarray],
+        sample_rate: int = 22050,
+        gpt_cond_len: int = SYNTHESIS_CONFIG["gpt_cond_len"],
+        gpt_cond_chunk_len: int = SYNTHESIS_CONFIG["gpt_cond_chunk_len"],
+        max_ref_len: int = SYNTHESIS_CONFIG["max_ref_len"]
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Calcular latents de conditioning a partir de áudio já normalizado em memória.
+        
+        Equivalente a Xtts.get_conditioning_latents, mas sem decodificar arquivos:
+        recebe amostras float32 mono (ex: memmap do ReferenceAudioStore).
+        
+        Args:
+            audios: Lista de arrays float32 mono em sample_rate
+            sample_rate: Sample rate das amostras (XTTS espera 22050)
+            gpt_cond_len: Segundos de áudio usados no latent do GPT
+            gpt_cond_chunk_len: Tamanho do chunk do latent do GPT
+            max_ref_len: Máximo de segundos de referência
+        
+        Returns:
+            (gpt_cond_latent, speaker_embedding)
+        """
+        if not self.loaded:
+            raise RuntimeError("Modelo não carregado. Chamar load_model() primeiro.")
+        
+        model = self.xtts_model
+        gpt_cond_len = max(1, int(round(gpt_cond_len)))
+        gpt_cond_chunk_len = max(1, min(int(round(gpt_cond_chunk_len)), gpt_cond_len))
+        max_samples = sample_rate * max(int(round(max_ref_len)), gpt_cond_len)
+        
+        with torch.inference_mode():
+            refs = []
+            speaker_embeddings = []
+            for samples in audios:
+                # Copia apenas o trecho usado (memmaps são somente leitura)
+                audio = torch.from_numpy(np.array(samples[:max_samples], dtype=np.float32))
+                audio = audio.unsqueeze(0).to(self.device)
+                speaker_embeddings.append(model.get_speaker_embedding(audio, sample_rate))
+                refs.append(audio)
+            
+            full_audio = torch.cat(refs, dim=-1)
+            gpt_cond_latent = model.get_gpt_cond_latents(
+                full_audio,
+                sample_rate,
+                length=gpt_cond_len,
+                chunk_length=gpt_cond_chunk_len
+            )
+            speaker_embedding = torch.stack(speaker_embeddings).mean(dim=0)
+        
+        return gpt_cond_latent, speaker_embedding
+    
+    def inference_with_latents(
+        self,
+        text: str,
+        language: str,
+        gpt_cond_latent: torch.Tensor,
+        speaker_embedding: torch.Tensor,
+        temperature: float = 0.75,
+        top_k: int = 50,
+        top_p: float = 0.85,
+        speed: float = 1.0,
+        **kwargs
+    ) -> np.ndarray:
+        """
+        Sintetizar com latents pré-calculados (sem recalcular o conditioning).
+        
+        Args:
+            text: Texto a sintetizar
+            language: Código do idioma
+            gpt_cond_latent: Latent de conditioning do GPT
+            speaker_embedding: Embedding do locutor
+            temperature, top_k, top_p: Parâmetros de amostragem
+            speed: Velocidade de fala (> 1 mais rápido); o Xtts estica os
+                   latents do GPT antes do vocoder, sem alterar o pitch
+            **kwargs: Parâmetros extras repassados para Xtts.inference
+        
+        Returns:
+            Áudio float32 mono em SAMPLE_RATE
+        """
+        if not self.loaded:
+            raise RuntimeError("Modelo não carregado. Chamar load_model() primeiro.")
+        
+        with torch.inference_mode(), self._autocast():
+            out = self.xtts_model.inference(
+                text=text,
+                language=self._normalize_language(language),
+                gpt_cond_latent=gpt_cond_latent,
+                speaker_embedding=speaker_embedding,
+                temperature=temperature,
+                top_k=top_k,
+                top_p=top_p,
+                speed=speed,
+                enable_text_splitting=True,
+                **kwargs
+            )
+        
+        wav = out["wav"]
+        if isinstance(wav, torch.Tensor):
+            wav = wav.float().cpu().numpy()
+        
+        return np.asarray(wav, dtype=np.float32).reshape(-1)
+
+    @staticmethod
+    def _scale_latents(latents: torch.Tensor, speed: float) -> torch.Tensor:
+        """
+        Mudar a duração dos latents do GPT, shape (1, T, C), como o
+        Xtts.inference faz com `speed`: interpolação linear no tempo para
+        T / speed passos antes do vocoder.
+        """
+        if speed == 1.0:
+            return latents
+        length_scale = 1.0 / max(speed, 0.05)
+        return torch.nn.functional.interpolate(
+            latents.transpose(1, 2), scale_factor=length_scale, mode="linear"
+        ).transpose(1, 2)
+
+    def _generate_gpt_latents(
+        self,
+        text: str,
+        language: str,
+        gpt_cond_latent: torch.Tensor,
+        temperature: float,
+        top_k: int,
+        top_p: float
+    ) -> torch.Tensor:
+        """
+        Estágio GPT de Xtts.inference para uma frase: gera os códigos e
+        retorna os latents que alimentam o vocoder, shape (1, T, C).
+        """
+        model = self.xtts_model
+        text_tokens = torch.IntTensor(
+            model.tokenizer.encode(text.strip().lower(), lang=language)
+        ).unsqueeze(0).to(model.device)
+        
+        if text_tokens.shape[-1] >= model.args.gpt_max_text_tokens:
+            raise ValueError("Frase excede o limite de tokens do XTTS; usar frases menores")
+        
+        gpt_codes = model.gpt.generate(
+            cond_latents=gpt_cond_latent,
+            text_inputs=text_tokens,
+            input_tokens=None,
+            do_sample=True,
+            top_p=top_p,
+            top_k=top_k,
+            temperature=temperature,
+            num_return_sequences=model.gpt_batch_size,
+            num_beams=1,
+            length_penalty=model.config.length_penalty,
+            repetition_penalty=model.config.repetition_penalty,
+            output_attentions=False
+        )
+        expected_output_len = torch.tensor(
+            [gpt_codes.shape[-1] * model.gpt.code_stride_len], device=text_tokens.device
+        )
+        text_len = torch.tensor([text_tokens.shape[-1]], device=model.device)
+        return model.gpt(
+            text_tokens,
+            text_len,
+            gpt_codes,
+            expected_output_len,
+            cond_latents=gpt_cond_latent,
+            return_attentions=False,
+            return_latent=True
+        )
+    
+    def inference_batch(self, language: str, items: List[Dict[str, Any]]) -> List[np.ndarray]:
+        """
+        Sintetizar vários pedidos do mesmo idioma em uma passada do vocoder.
+        
+        Só o decoder HiFi-GAN roda em lote (latents com padding no eixo do
+        tempo). O GPT — geração autoregressiva dos códigos e o forward que
+        produz os latents — continua frase a frase, com o conditioning de
+        cada pedido, e domina o tempo do XTTS; o ganho do lote fica restrito
+        ao vocoder (em GPU, várias frases em um forward em vez de vários).
+        
+        Args:
+            language: Código do idioma (igual para todo o lote)
+            items: Dicts com text, gpt_cond_latent, speaker_embedding e
+                   opcionalmente temperature, top_k, top_p, speed
+        
+        Returns:
+            Áudio float32 mono em SAMPLE_RATE, um por item, na mesma ordem
+        """
+        if not self.loaded:
+            raise RuntimeError("Modelo não carregado. Chamar load_model() primeiro.")
+        
+        from TTS.tts.layers.xtts.tokenizer import split_sentence
+        
+        model = self.xtts_model
+        language = self._normalize_language(language).split("-")[0]
+        
+        with torch.inference_mode(), self._autocast():
+            # Estágio 1: GPT por frase (cada item pode virar várias frases)
+            latents: List[torch.Tensor] = []
+            speakers: List[torch.Tensor] = []
+            owners: List[int] = []
+            for index, item in enumerate(items):
+                gpt_cond_latent = item["gpt_cond_latent"].to(model.device)
+                speaker_embedding = item["speaker_embedding"].to(model.device)
+                sentences = split_sentence(item["text"], language, model.tokenizer.char_limits[language])
+                for sentence in sentences:
+                    latents.append(self._scale_latents(self._generate_gpt_latents(
+                        sentence,
+                        language,
+                        gpt_cond_latent,
+                        temperature=item.get("temperature", 0.75),
+                        top_k=item.get("top_k", 50),
+                        top_p=item.get("top_p", 0.85)
+                    ), item.get("speed", 1.0)))
+                    speakers.append(speaker_embedding)
+                    owners.append(index)
+            
+            # Estágio 2: vocoder em lote (latents com padding de zeros no tempo)
+            lengths = [lat.shape[1] for lat in latents]
+            max_len = max(lengths)
+            padded = torch.zeros(
+                (len(latents), max_len, latents[0].shape[2]),
+                dtype=latents[0].dtype,
+                device=latents[0].device
+            )
+            for row, lat in enumerate(latents):
+                padded[row, :lat.shape[1]] = lat[0]
+            
+            wavs = model.hifigan_decoder(padded, g=torch.cat(speakers, dim=0)).float().cpu()
+            wavs = wavs.reshape(len(latents), -1)
+            samples_per_step = wavs.shape[1] / max_len
+        
+        # Cortar o padding e juntar as frases de cada item
+        outputs: List[List[np.ndarray]] = [[] for _ in items]
+        for row, (owner, length) in enumerate(zip(owners, lengths)):
+            outputs[owner].append(wavs[row, :int(round(length * samples_per_step))].numpy())
+        
+        return [
+            np.concatenate(parts).astype(np.float32, copy=False) if parts else np.zeros(0, dtype=np.float32)
+            for parts in outputs
+        ]
+    
     def get_available_languages(self) -> List[str]:
         """Retornar idiomas suportados."""
         return LANGUAGE_SUPPORT
@@ -481,6 +699,11 @@ class XTTSEngine(BaseTTSEngine):
     def supports_voice_cloning(self) -> bool:
         """XTTS suporta clonagem de voz."""
         return True
+    
+    @classmethod
+    def supports_native_speed(cls) -> bool:
+        """XTTS aplica `speed` nos latents do GPT (Xtts.inference)."""
+        return True
 
 
 # ============================================================================
@@ -0,0 +1,392 @@
+"""
+XTTS v2 ONNX Engine - XTTS com ONNX Runtime na CPU
+
+Variante do XTTSEngine para instalações só com CPU: os estágios com formas
+regulares rodam no ONNX Runtime em vez do PyTorch eager.
+
+- Vocoder HiFi-GAN (latents do GPT -> áudio): exportado para ONNX
+- Forward do GPT que produz os latents a partir dos códigos gerados:
+  exportado para ONNX e validado contra o PyTorch com um tamanho diferente
+  do usado na exportação; se divergir, esse estágio fica no PyTorch
+- Geração autoregressiva dos códigos (amostragem com KV cache do
+  transformers), tokenizer e conditioning continuam no PyTorch
+
+Os grafos exportados ficam em .tts-cache/onnx (uma exportação por versão de
+torch/TTS/opset), então só a primeira carga paga a exportação. Latents de
+conditioning são os mesmos do XTTSEngine (mesmo checkpoint), então o cache
+do SpeakerEmbeddingManager serve para os dois engines.
+"""
+
+import os
+import hashlib
+import numpy as np
+import torch
+import torch.nn as nn
+from pathlib import Path
+from typing import List, Dict, Any
+
+# Try to import ONNX Runtime
+ONNXRUNTIME_AVAILABLE = False
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError as e:
+    print(f"⚠ ONNX Runtime não encontrado: {e}")
+    print("   O engine xtts-onnx é opcional. Use: pip install onnxruntime onnx")
+    ort = None
+
+from engines.base_engine import register_engine
+from engines.xtts_engine import XTTSEngine, CACHE_DIR
+from stage_timing import stage
+
+
+# ============================================================================
+# CONSTANTS & CONFIGURATION
+# ============================================================================
+
+ONNX_CACHE_DIR = CACHE_DIR / "onnx"
+
+ONNX_CONFIG = {
+    "opset": 17,
+    "validation_atol": 1e-3,      # Diferença máxima aceita entre ONNX e PyTorch
+    "export_frames": 48,          # Tamanho usado na exportação (eixos são dinâmicos)
+    "validation_frames": 23,      # Tamanho diferente para validar os eixos dinâmicos
+}
+
+
+# ============================================================================
+# EXPORT WRAPPERS
+# ============================================================================
+
+class _VocoderGraph(nn.Module):
+    """HiFi-GAN do XTTS com entradas posicionais (formato exigido pelo exportador)."""
+
+    def __init__(self, decoder: nn.Module):
+        super().__init__()
+        self.decoder = decoder
+
+    def forward(self, latents: torch.Tensor, speaker_embedding: torch.Tensor) -> torch.Tensor:
+        return self.decoder(latents, g=speaker_embedding)
+
+
+class _GptLatentGraph(nn.Module):
+    """Forward do GPT com return_latent=True (códigos gerados -> latents do vocoder)."""
+
+    def __init__(self, gpt: nn.Module):
+        super().__init__()
+        self.gpt = gpt
+
+    def forward(
+        self,
+        text_tokens: torch.Tensor,
+        text_len: torch.Tensor,
+        gpt_codes: torch.Tensor,
+        wav_lengths: torch.Tensor,
+        cond_latents: torch.Tensor
+    ) -> torch.Tensor:
+        return self.gpt(
+            text_tokens,
+            text_len,
+            gpt_codes,
+            wav_lengths,
+            cond_latents=cond_latents,
+            return_attentions=False,
+            return_latent=True
+        )
+
+
+# ============================================================================
+# XTTS ONNX ENGINE CLASS
+# ============================================================================
+
+if ONNXRUNTIME_AVAILABLE:
+    @register_engine("xtts-onnx")
+    class XTTSOnnxEngine(XTTSEngine):
+        """XTTS v2 com vocoder e forward do GPT no ONNX Runtime (CPU)."""
+
+        def __init__(self, device: str = None):
+            """Inicializar engine (sempre CPU; para GPU use xtts-v2)."""
+            super().__init__(device="cpu")
+            self.model_name = "xtts_v2_onnx"
+            self.vocoder_session = None
+            self.gpt_session = None
+            self.onnx_info: Dict[str, Any] = {}
+
+        def _apply_optimizations(self) -> None:
+            """
+            Exportar/carregar os grafos ONNX e depois aplicar as otimizações do
+            PyTorch no que continua nele (geração autoregressiva).
+
+            A exportação roda antes do INT8 (camadas quantizadas não exportam);
+            compile é ignorado porque o vocoder já roda no ONNX Runtime.
+            """
+            ONNX_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            self.onnx_info = {}
+            self.vocoder_session = self._load_or_export("vocoder", self._export_vocoder)
+            try:
+                self.gpt_session = self._load_or_export("gpt_latents", self._export_gpt_latents)
+            except Exception as e:
+                # O vocoder sozinho já compensa; o forward do GPT fica no PyTorch
+                print(f"⚠️ GPT latents em ONNX indisponível ({e}); usando PyTorch nesse estágio")
+                self.onnx_info["gpt_latents"] = {"onnx": False, "reason": str(e)}
+                self.gpt_session = None
+
+            requested = self.optimizations
+            self.optimizations = {**requested, "compile": False}
+            try:
+                super()._apply_optimizations()
+            finally:
+                self.optimizations = requested
+            if requested.get("compile"):
+                self.applied_optimizations["compile"] = {"applied": False, "reason": "vocoder roda no ONNX Runtime"}
+            self.applied_optimizations["onnx"] = self.onnx_info
+            print(f"✅ Grafos ONNX prontos: {', '.join(k for k, v in self.onnx_info.items() if v.get('onnx'))}")
+
+        def unload_model(self) -> None:
+            """Liberar sessões ONNX e o modelo PyTorch."""
+            self.vocoder_session = None
+            self.gpt_session = None
+            super().unload_model()
+
+        # --------------------------------------------------------------------
+        # Exportação e cache
+        # --------------------------------------------------------------------
+
+        def _graph_path(self, name: str) -> Path:
+            """Caminho no cache, versionado por torch/TTS/onnxruntime/opset."""
+            try:
+                import TTS
+                tts_version = getattr(TTS, "__version__", "unknown")
+            except ImportError:
+                tts_version = "unknown"
+            key = f"{name}|{torch.__version__}|{tts_version}|{ort.__version__}|{ONNX_CONFIG['opset']}"
+            digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+            return ONNX_CACHE_DIR / f"xtts_v2_{name}_{digest}.onnx"
+
+        def _session(self, path: Path):
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.intra_op_num_threads = torch.get_num_threads()
+            return ort.InferenceSession(str(path), sess_options=options, providers=["CPUExecutionProvider"])
+
+        def _load_or_export(self, name: str, export_fn):
+            """Sessão ONNX do cache, exportando (e validando) na primeira vez."""
+            path = self._graph_path(name)
+            cached = path.exists()
+            if not cached:
+                print(f"⏳ Exportando {name} para ONNX ({path.name})...")
+                tmp_path = path.with_suffix(".onnx.tmp")
+                try:
+                    export_fn(tmp_path)
+                    session = self._session(tmp_path)
+                    self._validate(name, session)
+                    del session
+                    os.replace(tmp_path, path)
+                finally:
+                    if tmp_path.exists():
+                        tmp_path.unlink()
+
+            session = self._session(path)
+            self.onnx_info[name] = {"onnx": True, "path": str(path), "cached": cached}
+            return session
+
+        def _probe_inputs(self, frames: int) -> Dict[str, torch.Tensor]:
+            """Entradas sintéticas com o formato real dos estágios."""
+            model = self.xtts_model
+            channels = getattr(model.args, "gpt_n_model_channels", 1024)
+            generator = torch.Generator().manual_seed(frames)
+            text_tokens = torch.randint(
+                10, 100, (1, max(4, frames // 4)), generator=generator, dtype=torch.int32
+            )
+            gpt_codes = torch.randint(
+                0, 1000, (1, frames), generator=generator, dtype=torch.int64
+            )
+            return {
+                "latents": torch.randn((1, frames, channels), generator=generator) * 0.1,
+                "speaker_embedding": torch.randn(
+                    (1, getattr(model.args, "d_vector_dim", 512), 1), generator=generator
+                ) * 0.1,
+                "text_tokens": text_tokens,
+                "text_len": torch.tensor([text_tokens.shape[-1]], dtype=torch.int64),
+                "gpt_codes": gpt_codes,
+                "wav_lengths": torch.tensor([frames * model.gpt.code_stride_len], dtype=torch.int64),
+                "cond_latents": torch.randn((1, 32, channels), generator=generator) * 0.1,
+            }
+
+        def _export_vocoder(self, path: Path):
+            probe = self._probe_inputs(ONNX_CONFIG["export_frames"])
+            with torch.inference_mode():
+                torch.onnx.export(
+                    _VocoderGraph(self.xtts_model.hifigan_decoder).eval(),
+                    (probe["latents"], probe["speaker_embedding"]),
+                    str(path),
+                    input_names=["latents", "speaker_embedding"],
+                    output_names=["wav"],
+                    dynamic_axes={"latents": {1: "frames"}, "wav": {2: "samples"}},
+                    opset_version=ONNX_CONFIG["opset"]
+                )
+
+        def _export_gpt_latents(self, path: Path):
+            probe = self._probe_inputs(ONNX_CONFIG["export_frames"])
+            names = ["text_tokens", "text_len", "gpt_codes", "wav_lengths", "cond_latents"]
+            with torch.inference_mode():
+                torch.onnx.export(
+                    _GptLatentGraph(self.xtts_model.gpt).eval(),
+                    tuple(probe[n] for n in names),
+                    str(path),
+                    input_names=names,
+                    output_names=["latents"],
+                    dynamic_axes={
+                        "text_tokens": {1: "text"},
+                        "gpt_codes": {1: "codes"},
+                        "latents": {1: "frames"}
+                    },
+                    opset_version=ONNX_CONFIG["opset"]
+                )
+
+        def _validate(self, name: str, session):
+            """Comparar ONNX e PyTorch com um tamanho diferente do exportado."""
+            probe = self._probe_inputs(ONNX_CONFIG["validation_frames"])
+            model = self.xtts_model
+            with torch.inference_mode():
+                if name == "vocoder":
+                    expected = model.hifigan_decoder(probe["latents"], g=probe["speaker_embedding"])
+                    feeds = {"latents": probe["latents"], "speaker_embedding": probe["speaker_embedding"]}
+                else:
+                    expected = _GptLatentGraph(model.gpt)(
+                        probe["text_tokens"], probe["text_len"], probe["gpt_codes"],
+                        probe["wav_lengths"], probe["cond_latents"]
+                    )
+                    feeds = {k: probe[k] for k in ("text_tokens", "text_len", "gpt_codes", "wav_lengths", "cond_latents")}
+            actual = session.run(None, {k: v.numpy() for k, v in feeds.items()})[0]
+            expected = expected.float().numpy()
+            if actual.shape != expected.shape:
+                raise RuntimeError(f"{name}: formato ONNX {actual.shape} != PyTorch {expected.shape}")
+            error = float(np.max(np.abs(actual - expected)))
+            if error > ONNX_CONFIG["validation_atol"]:
+                raise RuntimeError(f"{name}: diferença ONNX/PyTorch {error:.2e} acima da tolerância")
+            print(f"   ✅ {name} validado (erro máx {error:.1e})")
+
+        # --------------------------------------------------------------------
+        # Inferência
+        # --------------------------------------------------------------------
+
+        def _generate_gpt_latents(
+            self,
+            text: str,
+            language: str,
+            gpt_cond_latent: torch.Tensor,
+            temperature: float,
+            top_k: int,
+            top_p: float
+        ) -> torch.Tensor:
+            """Geração autoregressiva no PyTorch; forward dos latents no ONNX Runtime."""
+            if self.gpt_session is None:
+                return super()._generate_gpt_latents(text, language, gpt_cond_latent, temperature, top_k, top_p)
+
+            model = self.xtts_model
+            text_tokens = torch.IntTensor(
+                model.tokenizer.encode(text.strip().lower(), lang=language)
+            ).unsqueeze(0)
+            if text_tokens.shape[-1] >= model.args.gpt_max_text_tokens:
+                raise ValueError("Frase excede o limite de tokens do XTTS; usar frases menores")
+
+            gpt_codes = model.gpt.generate(
+                cond_latents=gpt_cond_latent,
+                text_inputs=text_tokens,
+                input_tokens=None,
+                do_sample=True,
+                top_p=top_p,
+                top_k=top_k,
+                temperature=temperature,
+                num_return_sequences=model.gpt_batch_size,
+                num_beams=1,
+                length_penalty=model.config.length_penalty,
+                repetition_penalty=model.config.repetition_penalty,
+                output_attentions=False
+            )
+            latents = self.gpt_session.run(None, {
+                "text_tokens": text_tokens.numpy(),
+                "text_len": np.array([text_tokens.shape[-1]], dtype=np.int64),
+                "gpt_codes": gpt_codes.cpu().numpy().astype(np.int64),
+                "wav_lengths": np.array([gpt_codes.shape[-1] * model.gpt.code_stride_len], dtype=np.int64),
+                "cond_latents": gpt_cond_latent.float().cpu().numpy()
+            })[0]
+            return torch.from_numpy(latents)
+
+        def _vocode(self, latents: torch.Tensor, speaker_embedding: torch.Tensor) -> np.ndarray:
+            with stage("vocoder"):
+                wav = self.vocoder_session.run(None, {
+                    "latents": latents.float().cpu().numpy(),
+                    "speaker_embedding": speaker_embedding.float().cpu().numpy()
+                })[0]
+            return wav.reshape(-1).astype(np.float32, copy=False)
+
+        def inference_with_latents(
+            self,
+            text: str,
+            language: str,
+            gpt_cond_latent: torch.Tensor,
+            speaker_embedding: torch.Tensor,
+            temperature: float = 0.75,
+            top_k: int = 50,
+            top_p: float = 0.85,
+            speed: float = 1.0,
+            **kwargs
+        ) -> np.ndarray:
+            """Mesmo contrato do XTTSEngine: frase a frase, GPT -> (speed) -> vocoder ONNX."""
+            if not self.loaded:
+                raise RuntimeError("Modelo não carregado. Chamar load_model() primeiro.")
+
+            from TTS.tts.layers.xtts.tokenizer import split_sentence
+
+            model = self.xtts_model
+            language = self._normalize_language(language).split("-")[0]
+            gpt_cond_latent = gpt_cond_latent.to("cpu")
+            speaker_embedding = speaker_embedding.to("cpu")
+
+            parts = []
+            with torch.inference_mode(), self._autocast():
+                for sentence in split_sentence(text, language, model.tokenizer.char_limits[language]):
+                    latents = self._scale_latents(self._generate_gpt_latents(
+                        sentence, language, gpt_cond_latent, temperature, top_k, top_p
+                    ), speed)
+                    parts.append(self._vocode(latents, speaker_embedding))
+
+            if not parts:
+                return np.zeros(0, dtype=np.float32)
+            return np.concatenate(parts)
+
+        def inference_batch(self, language: str, items: List[Dict[str, Any]]) -> List[np.ndarray]:
+            """Sessões ONNX não ganham com padding; cada item roda em sequência."""
+            return [
+                self.inference_with_latents(
+                    text=item["text"],
+                    language=language,
+                    gpt_cond_latent=item["gpt_cond_latent"],
+                    speaker_embedding=item["speaker_embedding"],
+                    temperature=item.get("temperature", 0.75),
+                    top_k=item.get("top_k", 50),
+                    top_p=item.get("top_p", 0.85),
+                    speed=item.get("speed", 1.0)
+                )
+                for item in items
+            ]
+
+        def get_engine_name(self) -> str:
+            """Retornar nome técnico."""
+            return "xtts-onnx"
+
+        def get_engine_label(self) -> str:
+            """Retornar label amigável."""
+            return "XTTS v2 (ONNX Runtime, CPU)"
+
+        def get_engine_speed(self) -> str:
+            """Retornar velocidade relativa."""
+            return "medium"
+
+        def get_gpu_vram_required(self) -> int:
+            """Roda na CPU (valor usado como estimativa de RAM pelo EngineManager)."""
+            return 3000
+else:
+    XTTSOnnxEngine = None
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Inference Executor - Bounded per-engine executors for synthesis work
+
+Inference used to share Starlette's default threadpool (~40 threads), so a
+burst of chat messages ran that many model calls at once on the same model
+object and oversubscribed the CPU. Each engine now gets its own executor:
+
+- At most `limit` jobs run at the same time (per engine)
+- At most `max_queue` jobs wait behind them; past that, submit() raises
+  ExecutorBusy right away (the API answers 503 + Retry-After) unless the
+  caller asks to wait for room (batch jobs)
+- Wait time (queued) and run time are measured separately
+
+Light endpoints (/health, /v1/voices, ...) never go through these
+executors, so they never queue behind inference.
+"""
+
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict, Any, Optional
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+EXECUTOR_CONFIG = {
+    "max_queue": 32,              # Jobs allowed to wait per engine
+    "admission_timeout_seconds": 120,  # submit(wait=True): max wait for room in the queue
+    "retry_after_seconds": 2,     # Hint returned with ExecutorBusy
+    "ewma_alpha": 0.2,            # Smoothing for wait/run time averages
+}
+
+# ============================================================================
+# EXCEPTIONS
+# ============================================================================
+
+class ExecutorBusy(RuntimeError):
+    """Raised when an engine's wait queue is full."""
+
+    def __init__(self, engine: str, retry_after: int):
+        super().__init__(f"Engine '{engine}' is busy, try again later")
+        self.engine = engine
+        self.retry_after = retry_after
+
+# ============================================================================
+# INFERENCE EXECUTOR CLASS
+# ============================================================================
+
+class InferenceExecutor:
+    """Bounded executor for one engine."""
+
+    def __init__(self, engine: str, limit: int, config: Optional[Dict[str, Any]] = None,
+                 initializer: Optional[Callable[[str], None]] = None):
+        """
+        Initialize executor.
+
+        Args:
+            engine: Engine name (for messages and metrics)
+            limit: Maximum concurrent jobs
+            config: Overrides for EXECUTOR_CONFIG
+            initializer: Called with the engine name in each new executor thread
+                         (thread count / CPU affinity setup)
+        """
+        self.engine = engine
+        self.config = {**EXECUTOR_CONFIG, **(config or {})}
+        self.initializer = initializer
+        self.lock = threading.Condition()
+        self.limit = max(1, int(limit))
+        self._pool = self._new_pool(self.limit)
+
+        self.queued = 0
+        self.running = 0
+        self.stats = {
+            "submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "cancelled": 0,
+            "wait_ms_avg": None, "wait_ms_max": 0.0, "run_ms_avg": None, "run_ms_max": 0.0
+        }
+
+    def _new_pool(self, limit: int) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=limit,
+            thread_name_prefix=f"infer-{self.engine}",
+            initializer=self.initializer,
+            initargs=(self.engine,) if self.initializer else ()
+        )
+
+    def set_limit(self, limit: int):
+        """Change the concurrency limit (running jobs finish on the old pool)."""
+        limit = max(1, int(limit))
+        with self.lock:
+            if limit == self.limit:
+                return
+            old_pool = self._pool
+            self._pool = self._new_pool(limit)
+            self.limit = limit
+        old_pool.shutdown(wait=False)
+        print(f"⚙️ Inference concurrency for '{self.engine}': {limit}")
+
+    def _admit(self, wait: bool):
+        """Reserve a queue slot (lock held)."""
+        capacity = self.limit + self.config["max_queue"]
+        deadline = time.monotonic() + self.config["admission_timeout_seconds"]
+        while self.queued + self.running >= capacity:
+            remaining = deadline - time.monotonic()
+            if not wait or remaining <= 0:
+                self.stats["rejected"] += 1
+                raise ExecutorBusy(self.engine, self.config["retry_after_seconds"])
+            self.lock.wait(timeout=remaining)
+        self.queued += 1
+        self.stats["submitted"] += 1
+
+    def _average(self, key: str, value_ms: float):
+        alpha = self.config["ewma_alpha"]
+        previous = self.stats[f"{key}_avg"]
+        self.stats[f"{key}_avg"] = value_ms if previous is None else alpha * value_ms + (1 - alpha) * previous
+        self.stats[f"{key}_max"] = max(self.stats[f"{key}_max"], value_ms)
+
+    def submit(self, fn: Callable, *args, wait: bool = False, **kwargs) -> Future:
+        """
+        Queue a job.
+
+        Args:
+            fn: Blocking function to run
+            wait: Block until there is room in the queue instead of raising
+
+        Returns:
+            concurrent.futures.Future with fn's result
+
+        Raises:
+            ExecutorBusy: Queue full (or still full after admission_timeout_seconds)
+        """
+        enqueued_at = time.perf_counter()
+        started = []
+
+        def job():
+            started_at = time.perf_counter()
+            with self.lock:
+                self.queued -= 1
+                self.running += 1
+                started.append(True)
+                self._average("wait_ms", (started_at - enqueued_at) * 1000.0)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    self._average("run_ms", (time.perf_counter() - started_at) * 1000.0)
+
+        def done(future: Future):
+            with self.lock:
+                if future.cancelled():
+                    self.stats["cancelled"] += 1
+                    if not started:
+                        self.queued -= 1
+                elif future.exception() is not None:
+                    self.stats["failed"] += 1
+                else:
+                    self.stats["completed"] += 1
+                self.lock.notify_all()
+
+        with self.lock:
+            self._admit(wait)
+            pool = self._pool
+        future = pool.submit(job)
+        future.add_done_callback(done)
+        return future
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Await fn(*args) on this executor (raises ExecutorBusy when the queue is full)."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Blocking call that waits for room in the queue instead of failing fast."""
+        return self.submit(fn, *args, wait=True, **kwargs).result()
+
+    def shutdown(self):
+        with self.lock:
+            pool = self._pool
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                **self.stats,
+                "limit": self.limit,
+                "max_queue": self.config["max_queue"],
+                "running": self.running,
+                "queued": self.queued
+            }
+
+
+class EngineExecutors:
+    """Lazily created InferenceExecutor per engine."""
+
+    def __init__(self, limit_for: Callable[[str], int], config: Optional[Dict[str, Any]] = None,
+                 initializer: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            limit_for: Returns the concurrency limit for an engine name
+            config: Overrides for EXECUTOR_CONFIG (shared by all engines)
+            initializer: Per-thread setup, called with the engine name
+        """
+        self.limit_for = limit_for
+        self.config = config
+        self.initializer = initializer
+        self.lock = threading.Lock()
+        self.executors: Dict[str, InferenceExecutor] = {}
+
+    def get(self, engine: str) -> InferenceExecutor:
+        with self.lock:
+            executor = self.executors.get(engine)
+            if executor is None:
+                executor = InferenceExecutor(engine, self.limit_for(engine), self.config, self.initializer)
+                self.executors[engine] = executor
+            return executor
+
+    def refresh_limits(self):
+        """Re-evaluate limit_for() for every executor (after a settings change)."""
+        with self.lock:
+            executors = list(self.executors.values())
+        for executor in executors:
+            executor.set_limit(self.limit_for(executor.engine))
+
+    def shutdown(self):
+        with self.lock:
+            executors = list(self.executors.values())
+        for executor in executors:
+            executor.shutdown()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self.lock:
+            executors = dict(self.executors)
+        return {engine: executor.get_statistics() for engine, executor in executors.items()}
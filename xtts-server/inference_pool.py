@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+Inference Pool - Multi-process inference workers with shared-memory results
+
+Each worker is a separate process that owns its own engine instance and
+torch thread allotment, so several chat messages are synthesized truly in
+parallel on a many-core CPU and a crash or hang in a model call cannot take
+the API process down.
+
+- Jobs go to the worker with the fewest outstanding jobs.
+- Finished audio is written by the worker into a SharedMemory block; only
+  the block name travels through the result queue. The API process copies
+  the samples out and tells the worker to release the block.
+- A supervisor thread restarts dead workers and kills workers whose job
+  exceeds job_timeout_seconds; their pending jobs fail with RuntimeError.
+- reload() applies new engine options with a rolling restart: each worker's
+  replacement loads the model while the old process keeps serving, then
+  takes over new jobs; the old process finishes its queue and exits.
+- Workers share the on-disk reference store and conditioning-latent cache
+  with the API process (VoiceManager / SpeakerEmbeddingManager).
+
+The job functions (run_synthesis_job / run_clone_job) are also used
+in-process when the pool is disabled, so both paths run the same code.
+They record their stages (reference, conditioning, gpt/model, vocoder)
+into the active StageTimer; workers send those timings back with the audio.
+"""
+
+import io
+import os
+import time
+import uuid
+import queue
+import threading
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Tuple, List
+
+import numpy as np
+
+from stage_timing import StageTimer, activate, stage
+from inference_worker import as_main
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+POOL_CONFIG = {
+    "workers": 0,                 # 0 = run inference in the API process
+    "engine": "xtts-v2",          # Engine owned by every worker
+    "torch_threads": 0,           # Per worker; 0 = slot size, else cpu_count // workers
+    "interop_threads": 0,         # Per worker; 0 = torch default
+    "slots": [],                  # CPU list per worker index (empty = no pinning)
+    "engine_options": {},         # Model optimizations (BaseTTSEngine.configure), read at worker start
+    "job_timeout_seconds": 300,   # Worker is killed and restarted past this
+    "load_timeout_seconds": 600,  # Rolling restart: give up on a replacement that is not ready by then
+    "supervise_interval_seconds": 1.0,
+    "restart_backoff_seconds": 2.0,
+}
+
+CONDITIONING_DEFAULTS = {
+    "gpt_cond_len": 12,
+    "gpt_cond_chunk_len": 4,
+    "max_ref_len": 10,
+}
+
+# ============================================================================
+# JOB FUNCTIONS (shared by workers and the in-process path)
+# ============================================================================
+
+def run_synthesis_job(job: Dict[str, Any], engine, voice_manager, embedding_manager) -> Tuple[np.ndarray, int]:
+    """
+    Run the engine stage of a synthesis request.
+
+    Args:
+        job: text, language, voice, temperature, top_k, top_p, gpt_cond_len
+             (+ optional gpt_cond_chunk_len, max_ref_len, speed)
+        engine: Loaded BaseTTSEngine
+        voice_manager: VoiceManager (reference store access)
+        embedding_manager: SpeakerEmbeddingManager or None
+
+    Returns:
+        (float32 mono samples, sample_rate)
+    """
+    from reference_store import XTTS_REFERENCE_SR
+
+    params = {**CONDITIONING_DEFAULTS, **{k: job[k] for k in CONDITIONING_DEFAULTS if k in job}}
+
+    if hasattr(engine, "inference_with_latents"):
+        with stage("voice"):
+            reference = voice_manager.get_reference(job["voice"], XTTS_REFERENCE_SR)
+        if reference is None:
+            raise RuntimeError(f"Voice '{job['voice']}' not found")
+        with stage("conditioning"):
+            if embedding_manager is not None:
+                gpt_cond_latent, speaker_embedding = embedding_manager.get_or_compute_latents(reference, **params)
+            else:
+                gpt_cond_latent, speaker_embedding = engine.compute_conditioning_latents_from_audio(
+                    [reference.samples], sample_rate=reference.sample_rate, **params
+                )
+        with stage("gpt"):
+            wav = engine.inference_with_latents(
+                text=job["text"],
+                language=job["language"],
+                gpt_cond_latent=gpt_cond_latent,
+                speaker_embedding=speaker_embedding,
+                temperature=job["temperature"],
+                top_k=job["top_k"],
+                top_p=job["top_p"],
+                speed=job.get("speed", 1.0)
+            )
+        return wav, job.get("sample_rate", 24000)
+
+    # The caller only sends speed != 1.0 to engines with native speed control
+    with stage("model"):
+        return engine.synthesize_array(
+            job["text"],
+            language=job["language"],
+            voice=voice_manager.get_voice_file(job["voice"]),
+            speed=job.get("speed", 1.0),
+            temperature=job["temperature"],
+            top_k=job["top_k"],
+            top_p=job["top_p"]
+        )
+
+
+def run_clone_job(job: Dict[str, Any], engine) -> Tuple[np.ndarray, int]:
+    """
+    Run the engine stage of a one-off voice cloning request.
+
+    Args:
+        job: text, language, speaker_wav_contents (list of WAV bytes),
+             temperature, top_k, top_p, gpt_cond_len (+ optional speed)
+        engine: Loaded XTTS engine
+
+    Returns:
+        (float32 mono samples, sample_rate)
+    """
+    from reference_store import load_normalized_audio, XTTS_REFERENCE_SR
+
+    # Decode, validate and normalize all uploaded references in memory
+    normalized_wavs = []
+    with stage("reference"):
+        for content in job["speaker_wav_contents"]:
+            try:
+                normalized_wavs.append(load_normalized_audio(io.BytesIO(content), XTTS_REFERENCE_SR))
+            except Exception as e:
+                raise RuntimeError(f"Invalid WAV file: {str(e)}")
+
+    params = {**CONDITIONING_DEFAULTS, **{k: job[k] for k in CONDITIONING_DEFAULTS if k in job}}
+
+    # Uploaded references are one-off, so their latents are not cached
+    with stage("conditioning"):
+        gpt_cond_latent, speaker_embedding = engine.compute_conditioning_latents_from_audio(
+            normalized_wavs, sample_rate=XTTS_REFERENCE_SR, **params
+        )
+    with stage("gpt"):
+        wav = engine.inference_with_latents(
+            text=job["text"],
+            language=job["language"],
+            gpt_cond_latent=gpt_cond_latent,
+            speaker_embedding=speaker_embedding,
+            temperature=job["temperature"],
+            top_k=job["top_k"],
+            top_p=job["top_p"],
+            speed=job.get("speed", 1.0)
+        )
+    return wav, job.get("sample_rate", 24000)
+
+# ============================================================================
+# WORKER PROCESS
+# ============================================================================
+
+def worker_main(worker_id: int, engine_name: str, torch_threads: int, requests, responses,
+                interop_threads: int = 0, cpus: Optional[List[int]] = None,
+                engine_options: Optional[Dict[str, Any]] = None):
+    """
+    Worker process entry point: load the engine, then serve jobs until None.
+
+    Messages in:  ("job", job_id, job) | ("release", shm_name) | None
+    Messages out: ("ready", worker_id, pid) | ("load_failed", worker_id, error)
+                  ("ok", worker_id, job_id, shm_name, num_samples, sample_rate, timings)
+                  ("error", worker_id, job_id, error)
+    """
+    import torch
+    from cpu_threading import configure_worker_process
+    configure_worker_process(torch_threads, interop_threads, cpus)
+
+    try:
+        from engines import EngineRegistry
+        from voice_manager import VoiceManager
+        from speaker_embedding_manager import SpeakerEmbeddingManager
+
+        engine = EngineRegistry.get(engine_name)()
+        engine.configure(**(engine_options or {}))
+        engine.load_model()
+        voice_manager = VoiceManager()
+        embedding_manager = SpeakerEmbeddingManager(engine) if hasattr(engine, "inference_with_latents") else None
+    except Exception as e:
+        traceback.print_exc()
+        responses.put(("load_failed", worker_id, str(e)))
+        return
+
+    print(f"✅ Inference worker {worker_id} ready (pid={os.getpid()}, engine={engine_name}, "
+          f"threads={torch.get_num_threads()}, cpus={cpus or 'all'})")
+    responses.put(("ready", worker_id, os.getpid()))
+
+    blocks: Dict[str, shared_memory.SharedMemory] = {}  # Kept open until the API process copied them
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+
+        if message[0] == "release":
+            block = blocks.pop(message[1], None)
+            if block is not None:
+                block.close()
+                block.unlink()
+            continue
+
+        _, job_id, job = message
+        try:
+            timer = StageTimer()
+            with activate(timer):
+                if job["kind"] == "clone":
+                    wav, sample_rate = run_clone_job(job, engine)
+                else:
+                    wav, sample_rate = run_synthesis_job(job, engine, voice_manager, embedding_manager)
+
+            samples = np.ascontiguousarray(np.asarray(wav, dtype=np.float32).reshape(-1))
+            block = shared_memory.SharedMemory(create=True, size=max(samples.nbytes, 1))
+            np.ndarray(samples.shape, dtype=np.float32, buffer=block.buf)[:] = samples
+            blocks[block.name] = block
+            responses.put(("ok", worker_id, job_id, block.name, samples.shape[0], sample_rate, timer.as_dict()))
+        except Exception as e:
+            traceback.print_exc()
+            responses.put(("error", worker_id, job_id, f"{type(e).__name__}: {e}"))
+
+    for block in blocks.values():
+        block.close()
+        block.unlink()
+
+# ============================================================================
+# INFERENCE POOL CLASS
+# ============================================================================
+
+class _Worker:
+    """API-process view of one worker process."""
+
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.process = None
+        self.requests = None
+        self.ready = False
+        self.pid: Optional[int] = None
+        self.replacement = None      # Process loading during a rolling restart
+        self.replacement_ready = False
+        self.outstanding: Dict[str, Tuple[Future, float, Any]] = {}  # job_id -> (future, sent_at, requests queue)
+        self.jobs_done = 0
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+        self.started_at = 0.0
+
+
+class InferencePool:
+    """Supervised pool of inference worker processes."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            config: Overrides for POOL_CONFIG
+        """
+        self.config = {**POOL_CONFIG, **(config or {})}
+        self.context = mp.get_context("spawn")  # Required for CUDA; default on Windows
+        self.responses = None
+        self.workers: List[_Worker] = []
+        self.lock = threading.Lock()
+        self._running = False
+        self._threads: List[threading.Thread] = []
+        self._reload_thread: Optional[threading.Thread] = None
+        self._reload_generation = 0
+        self.reloads = {"requested": 0, "completed": 0, "failed_workers": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._running
+
+    def worker_cpus(self, worker_id: int) -> Optional[List[int]]:
+        slots = self.config["slots"]
+        return list(slots[worker_id % len(slots)]) if slots else None
+
+    def torch_threads_per_worker(self, worker_id: int = 0) -> int:
+        if self.config["torch_threads"]:
+            return self.config["torch_threads"]
+        cpus = self.worker_cpus(worker_id)
+        if cpus:
+            return len(cpus)
+        return max(1, (os.cpu_count() or 1) // max(1, self.config["workers"]))
+
+    def start(self):
+        """Spawn workers and start the result collector and supervisor threads."""
+        if self._running or self.config["workers"] <= 0:
+            return
+        self.responses = self.context.Queue()
+        self.workers = [_Worker(i) for i in range(self.config["workers"])]
+        for worker in self.workers:
+            self._spawn(worker)
+
+        self._running = True
+        for target, name in ((self._collect_loop, "pool-collector"), (self._supervise_loop, "pool-supervisor")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"🧵 Inference pool started: {len(self.workers)} worker(s) × "
+              f"{self.torch_threads_per_worker()} torch thread(s), engine={self.config['engine']}")
+
+    def _start_process(self, worker_id: int, requests):
+        process = self.context.Process(
+            target=worker_main,
+            args=(worker_id, self.config["engine"], self.torch_threads_per_worker(worker_id),
+                  requests, self.responses, self.config["interop_threads"],
+                  self.worker_cpus(worker_id), self.config["engine_options"]),
+            name=f"inference-worker-{worker_id}",
+            daemon=True
+        )
+        # Children re-import __main__: give them the thin module, not main.py
+        with as_main():
+            process.start()
+        return process
+
+    def _spawn(self, worker: _Worker):
+        worker.requests = self.context.Queue()
+        worker.ready = False
+        worker.started_at = time.monotonic()
+        worker.process = self._start_process(worker.worker_id, worker.requests)
+        worker.pid = worker.process.pid
+
+    def reload(self, engine_options: Dict[str, Any]) -> bool:
+        """
+        Restart the workers with new engine options, one at a time, in the background.
+
+        Returns:
+            True if a rolling restart was started or queued (False when the pool is off)
+        """
+        with self.lock:
+            self.config["engine_options"] = dict(engine_options)
+            if not self._running:
+                return False
+            self._reload_generation += 1
+            self.reloads["requested"] += 1
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return True  # The running pass picks the new generation up
+            self._reload_thread = threading.Thread(target=self._reload_loop, name="pool-reload", daemon=True)
+            self._reload_thread.start()
+        print(f"🔄 Restarting inference workers with {engine_options}")
+        return True
+
+    def _reload_loop(self):
+        while self._running:
+            with self.lock:
+                generation = self._reload_generation
+            for worker in list(self.workers):
+                if not self._running:
+                    return
+                self._replace(worker)
+            with self.lock:
+                if generation == self._reload_generation:
+                    self.reloads["completed"] += 1
+                    break
+        print("✅ Inference workers restarted with the new engine options")
+
+    def _replace(self, worker: _Worker):
+        """Start a replacement for worker, switch new jobs to it once ready, then retire the old process."""
+        requests = self.context.Queue()
+        process = self._start_process(worker.worker_id, requests)
+        with self.lock:
+            worker.replacement, worker.replacement_ready = process, False
+
+        deadline = time.monotonic() + self.config["load_timeout_seconds"]
+        while self._running and process.is_alive() and not worker.replacement_ready and time.monotonic() < deadline:
+            time.sleep(0.2)
+
+        with self.lock:
+            ready = worker.replacement_ready
+            worker.replacement, worker.replacement_ready = None, False
+            if ready and self._running:
+                old_process, old_requests = worker.process, worker.requests
+                worker.process, worker.requests, worker.pid = process, requests, process.pid
+                worker.ready, worker.started_at = True, time.monotonic()
+        if not ready or not self._running:
+            print(f"❌ Replacement for inference worker {worker.worker_id} did not get ready, keeping the old one")
+            self.reloads["failed_workers"] += 1
+            if process.is_alive():
+                process.terminate()
+            return
+
+        # The old process finishes the jobs already sent to it (and their releases), then exits
+        deadline = time.monotonic() + self.config["job_timeout_seconds"]
+        while time.monotonic() < deadline and old_process.is_alive():
+            with self.lock:
+                if not any(entry[2] is old_requests for entry in worker.outstanding.values()):
+                    break
+            time.sleep(0.1)
+        old_requests.put(None)
+        old_process.join(timeout=5)
+        if old_process.is_alive():
+            old_process.terminate()
+        with self.lock:
+            stranded = [job_id for job_id, entry in worker.outstanding.items() if entry[2] is old_requests]
+            failed = [worker.outstanding.pop(job_id)[0] for job_id in stranded]
+        for future in failed:
+            if not future.done():
+                future.set_exception(RuntimeError(f"Inference worker {worker.worker_id} was restarted"))
+
+    def stop(self):
+        """Stop all workers (pending jobs fail)."""
+        if not self._running:
+            return
+        self._running = False
+        for worker in self.workers:
+            try:
+                worker.requests.put(None)
+            except Exception:
+                pass
+        for worker in self.workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            replacement = worker.replacement
+            if replacement is not None and replacement.is_alive():
+                replacement.terminate()
+            self._fail_outstanding(worker, "Inference pool stopped")
+        self.responses.put(None)  # Wake the collector
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def submit(self, job: Dict[str, Any]) -> Future:
+        """
+        Queue a job on the least busy worker.
+
+        Returns:
+            Future resolved with (float32 samples, sample_rate, stage timings in seconds)
+        """
+        future: Future = Future()
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            alive = [w for w in self.workers if w.process is not None and w.process.is_alive()]
+            if not self._running or not alive:
+                raise RuntimeError("Inference pool has no live workers")
+            # Prefer ready workers; a loading worker picks the job up once loaded
+            worker = min(alive, key=lambda w: (not w.ready, len(w.outstanding)))
+            worker.outstanding[job_id] = (future, time.monotonic(), worker.requests)
+            worker.requests.put(("job", job_id, job))
+        return future
+
+    def _collect_loop(self):
+        """Resolve futures from worker responses."""
+        while self._running:
+            try:
+                message = self.responses.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if message is None:
+                return
+            try:
+                self._handle(message)
+            except Exception as e:
+                print(f"⚠️ Inference pool collector error: {e}")
+                traceback.print_exc()
+
+    def _handle(self, message):
+        kind, worker_id = message[0], message[1]
+        worker = self.workers[worker_id]
+
+        if kind == "ready":
+            with self.lock:
+                if worker.replacement is not None and message[2] == worker.replacement.pid:
+                    worker.replacement_ready = True
+                    return
+            worker.ready = True
+            worker.last_error = None
+            return
+        if kind == "load_failed":
+            worker.last_error = message[2]
+            print(f"❌ Inference worker {worker_id} failed to load: {message[2]}")
+            return
+
+        job_id = message[2]
+        if kind == "error":
+            with self.lock:
+                entry = worker.outstanding.pop(job_id, None)
+            if entry is not None:
+                entry[0].set_exception(RuntimeError(message[3]))
+            return
+
+        # Released to the process that ran the job (a rolling restart may have
+        # switched the worker to a new process); popped only after the copy, so
+        # that process is never told to exit while holding an unread block
+        with self.lock:
+            entry = worker.outstanding.get(job_id)
+        _, _, _, shm_name, num_samples, sample_rate, timings = message
+        block = shared_memory.SharedMemory(name=shm_name)
+        try:
+            samples = np.ndarray((num_samples,), dtype=np.float32, buffer=block.buf).copy()
+        finally:
+            block.close()
+            (entry[2] if entry is not None else worker.requests).put(("release", shm_name))
+        with self.lock:
+            worker.outstanding.pop(job_id, None)
+        worker.jobs_done += 1
+        if entry is not None:
+            entry[0].set_result((samples, sample_rate, timings))
+
+    def _fail_outstanding(self, worker: _Worker, reason: str):
+        with self.lock:
+            pending = list(worker.outstanding.values())
+            worker.outstanding.clear()
+        for future, _, _ in pending:
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+
+    def _supervise_loop(self):
+        """Restart dead workers and kill workers stuck on a job."""
+        while self._running:
+            time.sleep(self.config["supervise_interval_seconds"])
+            now = time.monotonic()
+            for worker in self.workers:
+                if not self._running:
+                    return
+                process = worker.process
+                with self.lock:
+                    oldest = min((t for _, t, _ in worker.outstanding.values()), default=None)
+
+                if process.is_alive() and oldest is not None and now - oldest > self.config["job_timeout_seconds"]:
+                    print(f"⏱️ Inference worker {worker.worker_id} stuck for more than "
+                          f"{self.config['job_timeout_seconds']}s, terminating")
+                    process.terminate()
+                    process.join(timeout=5)
+
+                if not process.is_alive():
+                    exitcode = process.exitcode
+                    print(f"💥 Inference worker {worker.worker_id} (pid={worker.pid}) exited with {exitcode}, restarting")
+                    worker.last_error = f"exited with {exitcode}"
+                    self._fail_outstanding(worker, f"Inference worker {worker.worker_id} died (exit code {exitcode})")
+                    # Back off harder when the worker keeps dying before it gets ready (e.g. load failure)
+                    backoff = self.config["restart_backoff_seconds"]
+                    if not worker.ready:
+                        backoff = min(backoff * 2 ** min(worker.restarts, 5), 60.0)
+                    time.sleep(backoff)
+                    if self._running:
+                        self._spawn(worker)
+                        worker.restarts += 1
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Pool and per-worker status."""
+        with self.lock:
+            return {
+                "enabled": self._running,
+                "engine": self.config["engine"],
+                "engine_options": self.config["engine_options"],
+                "reloading": bool(self._reload_thread and self._reload_thread.is_alive()),
+                "reloads": dict(self.reloads),
+                "workers": [
+                    {
+                        "id": w.worker_id,
+                        "pid": w.pid,
+                        "alive": bool(w.process and w.process.is_alive()),
+                        "ready": w.ready,
+                        "outstanding": len(w.outstanding),
+                        "jobs_done": w.jobs_done,
+                        "restarts": w.restarts,
+                        "last_error": w.last_error,
+                        "cpus": self.worker_cpus(w.worker_id),
+                        "torch_threads": self.torch_threads_per_worker(w.worker_id)
+                    }
+                    for w in self.workers
+                ],
+                "torch_threads_per_worker": self.torch_threads_per_worker() if self.workers else None
+            }
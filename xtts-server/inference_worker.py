@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Inference Worker - Thin __main__ for inference pool processes
+
+A spawn-context child re-imports the parent's __main__ module before it
+runs its target. With the server started as `python main.py` that re-ran
+all of main.py's module-level setup in every worker: torch, the FastAPI app,
+the output cache, the audio spool, the encoder pool and the rest, only to
+throw it away and load the engine again.
+
+InferencePool starts its workers while this module stands in as __main__,
+so a worker imports this file (stdlib only) and then whatever worker_main
+itself needs. Keep it free of heavy imports.
+"""
+
+import sys
+import threading
+from contextlib import contextmanager
+
+_swap_lock = threading.Lock()
+
+
+@contextmanager
+def as_main():
+    """Make this module __main__ while worker processes are started."""
+    with _swap_lock:
+        previous = sys.modules.get("__main__")
+        sys.modules["__main__"] = sys.modules[__name__]
+        try:
+            yield
+        finally:
+            if previous is not None:
+                sys.modules["__main__"] = previous
@@ -8,6 +8,11 @@ Multilingual Text-to-Speech Engine for Speakerbot
 import os
 import io
 import sys
+import time
+
+# Boot timing report (stdlib only; see startup_timing.py)
+from startup_timing import StartupTimeline
+startup_timeline = StartupTimeline()
 
 # ============================================================================
 # AUTO-ACCEPT COQUI LICENSE FOR AUTOMATION
@@ -30,28 +35,15 @@ if sys.stderr.encoding != 'utf-8':
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 # ============================================================================
-# IMPORTAR TORCH ANTES DE TUDO PARA MONKEYPATCH
-# ============================================================================
-import torch
-import torch.serialization
-
-# Monkeypatch torch.load IMEDIATAMENTE após importar torch
-original_torch_load = torch.load
-
-def patched_torch_load(f, *args, **kwargs):
-    """Patched torch.load que desabilita weights_only para compatibilidade com TTS"""
-    kwargs['weights_only'] = False
-    return original_torch_load(f, *args, **kwargs)
-
-torch.load = patched_torch_load
-
+# TORCH, TTS E ENGINES SÃO IMPORTADOS NO CARREGAMENTO EM BACKGROUND
 # ============================================================================
-# AGORA IMPORTAR TTS (QUE USA torch.load)
-# ============================================================================
-try:
-    from TTS.api import TTS  # type: ignore
-except ImportError as e:
-    print(f"❌ ERRO: Módulo TTS não encontrado! {e}")
+# import torch (com o monkeypatch de torch.load), os engines e TTS.api
+# (transformers, etc.) levam segundos; acontecem em _import_engines(), no
+# carregamento em background, não antes do servidor aceitar conexões.
+# Aqui só verificamos se o pacote existe.
+import importlib.util
+if importlib.util.find_spec("TTS") is None:
+    print("❌ ERRO: Módulo TTS não encontrado!")
     print("Execute: pip install TTS")
     sys.exit(1)
 
@@ -60,62 +52,122 @@ except ImportError as e:
 # ============================================================================
 import json
 import shutil
-import tempfile
-import time
+import asyncio
+import threading
 import numpy as np
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, Dict, Any
 from datetime import datetime
+from concurrent.futures import Future
 import traceback
-import scipy.io.wavfile as wavfile
-
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form, BackgroundTasks, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse, JSONResponse, HTMLResponse
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from starlette.concurrency import run_in_threadpool
-from pydantic import BaseModel
-import uvicorn
-import torchaudio
-
-try:
-    from voice_manager import VoiceManager
-    from speaker_embedding_manager import SpeakerEmbeddingManager
-except ImportError as e:
-    print(f"❌ ERRO: Módulos locais não encontrados: {e}")
-    traceback.print_exc()
-    sys.exit(1)
 
-try:
-    from engines import XTTSEngine, EngineRegistry
-    # Tentar importar StyleTTS2Engine opcionalmente
+with startup_timeline.stage("import fastapi/uvicorn"):
+    from fastapi import FastAPI, HTTPException, File, UploadFile, Form, BackgroundTasks, WebSocket, WebSocketDisconnect, Request
+    from fastapi.responses import FileResponse, JSONResponse, HTMLResponse, Response, StreamingResponse
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.staticfiles import StaticFiles
+    from starlette.concurrency import run_in_threadpool
+    from pydantic import BaseModel
+    import uvicorn
+
+with startup_timeline.stage("import local modules"):
     try:
-        from engines import StyleTTS2Engine
-    except ImportError:
-        StyleTTS2Engine = None
-except ImportError as e:
-    print(f"❌ ERRO: Engines module não encontrado: {e}")
-    traceback.print_exc()
-    sys.exit(1)
+        from voice_manager import VoiceManager
+        from reference_store import load_normalized_audio, XTTS_REFERENCE_SR
+        from audio_buffer import AudioResult, wav_header, encode_wav
+        from dsp import postprocess, decode_audio
+        from text_segmenter import split_sentences
+        from obs_stream import ObsAudioHub, MODE_JSON
+        from audio_formats import EncoderPool, OutputFormat, UnsupportedFormat, negotiate, available_formats
+        from stage_timing import StageTimer, TimingStats, activate, stage, end as end_stage, merge as merge_stages
+        from metrics import ServerMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+        from output_cache import OutputCache, make_cache_key
+        from micro_batcher import MicroBatcher
+        from engine_router import EngineRouter, AUTO_ENGINE
+        from engine_manager import EngineManager, measure_memory_mb
+        from audio_spool import AudioSpool
+        from inference_pool import InferencePool, run_synthesis_job, run_clone_job
+        from inference_executor import EngineExecutors, ExecutorBusy
+        from cpu_threading import CpuPlan, parse_engine_threads
+        from warmup import WarmupRunner
+    except ImportError as e:
+        print(f"❌ ERRO: Módulos locais não encontrados: {e}")
+        traceback.print_exc()
+        sys.exit(1)
+
+# Imported by _import_torch() / _import_engines() in the background loader
+torch = None
+XTTSEngine = None
+StyleTTS2Engine = None
+XTTSOnnxEngine = None
+_heavy_import_lock = threading.Lock()
+
+def _import_torch():
+    """Import torch once and patch torch.load (weights_only=False, needed by TTS checkpoints)."""
+    global torch
+    with _heavy_import_lock:
+        if torch is None:
+            with startup_timeline.stage("import torch"):
+                torch_module = importlib.import_module("torch")
+                importlib.import_module("torch.serialization")
+            
+            original_torch_load = torch_module.load
+            
+            def patched_torch_load(f, *args, **kwargs):
+                """Patched torch.load que desabilita weights_only para compatibilidade com TTS"""
+                kwargs['weights_only'] = False
+                return original_torch_load(f, *args, **kwargs)
+            
+            torch_module.load = patched_torch_load
+            torch = torch_module
+    return torch
+
+def _import_engines():
+    """Import torch, then the engine classes into ENGINES (names were known up front)."""
+    global XTTSEngine, StyleTTS2Engine, XTTSOnnxEngine
+    _import_torch()
+    with startup_timeline.stage("import engines"):
+        from engines import XTTSEngine
+        # StyleTTS2 e XTTS no ONNX Runtime são opcionais
+        try:
+            from engines import StyleTTS2Engine
+        except ImportError:
+            StyleTTS2Engine = None
+        try:
+            from engines import XTTSOnnxEngine
+        except ImportError:
+            XTTSOnnxEngine = None
+    classes = {"xtts-v2": XTTSEngine, "stylets2": StyleTTS2Engine, "xtts-onnx": XTTSOnnxEngine}
+    for name in ENGINES:
+        ENGINES[name] = classes.get(name)
 
 # ============================================================================
 # ENGINES REGISTRY & CONFIGURATION
 # ============================================================================
 
 # Available TTS Engines - registry maps engine names to classes
-ENGINES = {
-    "xtts-v2": XTTSEngine,
+# (classes are None until _import_engines(); names only need a find_spec)
+ENGINES: Dict[str, Any] = {
+    "xtts-v2": None,
 }
 
 # Adicionar StyleTTS2 se disponível
-if StyleTTS2Engine is not None:
-    ENGINES["stylets2"] = StyleTTS2Engine
+if importlib.util.find_spec("styletts2") is not None:
+    ENGINES["stylets2"] = None
+
+# XTTS com vocoder/GPT no ONNX Runtime (CPU), se onnxruntime estiver instalado
+if importlib.util.find_spec("onnxruntime") is not None:
+    ENGINES["xtts-onnx"] = None
 
 # Default engine (can be overridden via request parameter)
 DEFAULT_ENGINE = "xtts-v2"
 
-# Active engine instances (lazy-loaded on demand)
-active_engines: Dict[str, Any] = {}
+# Engines to load in the background after startup (comma-separated, e.g. "stylets2")
+PRELOAD_ENGINES = [e.strip() for e in os.getenv("PRELOAD_ENGINES", "").split(",") if e.strip()]
+
+# Routes engine=auto requests by queue depth, observed RTF and latency budget
+# (preference order = ENGINES order, best quality first)
+engine_router = EngineRouter(preference=list(ENGINES.keys()))
 
 # Monitor engine selection (tracks which engine is selected for monitor-based synthesis)
 monitor_selected_engine: str = DEFAULT_ENGINE
@@ -137,6 +189,7 @@ class FileMonitorRequest(BaseModel):
 HOST = "127.0.0.1"
 PORT = 8877
 DEBUG = False
+OPEN_BROWSER = os.getenv("OPEN_BROWSER", "1") == "1"  # Open the web UI once the server starts
 
 # Audio Configuration (Updated to 24kHz for XTTS v2 best quality)
 SAMPLE_RATE = 24000  # XTTS v2 native sample rate (was 22050 for better voice cloning quality)
@@ -146,16 +199,24 @@ LANGUAGE_SUPPORT = [
 ]
 
 # GPU Configuration
-GPU_AVAILABLE = torch.cuda.is_available()
-GPU_DEVICE = torch.device('cuda' if GPU_AVAILABLE else 'cpu')
+# (detected by _apply_device_defaults() once the background loader has imported torch)
+GPU_AVAILABLE = False
+GPU_DEVICE = None
 GPU_MEMORY_FRACTION = 0.8  # Use 80% of GPU memory by default
 
+# Model precision: fp32 | bf16 | fp16 (autocast in the engines; see engines/optimizations.py)
+# Unset: fp16 on GPU, fp32 on CPU (resolved with the device)
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32").lower()
+
 # Global GPU optimization settings (can be modified by user)
 GPU_OPTIMIZATIONS = {
     "memory_fraction": 0.8,      # 0.8 = 80%, 0.9 = 90%, 0.95 = 95%
-    "use_half_precision": True,  # FP16 for faster inference (2-3x speedup)
-    "batch_processing": False,   # Process multiple synthesis requests in parallel
-    "use_int8_quantization": False,  # INT8 quantization for faster inference
+    "precision": MODEL_PRECISION,
+    "use_half_precision": MODEL_PRECISION == "fp16",  # Legacy switch for precision="fp16"
+    "batch_processing": False,   # Micro-batch concurrent synthesis requests (see micro_batcher.py)
+    "use_int8_quantization": os.getenv("USE_INT8_QUANTIZATION", "0") == "1",  # Dynamic INT8 (CPU), applied at load
+    "compile_decoder": os.getenv("COMPILE_DECODER", "0") == "1",  # torch.compile of the vocoder/decoder
+    "model_snapshot": os.getenv("MODEL_SNAPSHOT", "1") == "1",  # mmap weight snapshot in .tts-cache (fast load)
     "enable_model_cache": True   # Cache model in memory for faster subsequent calls
 }
 
@@ -173,162 +234,72 @@ SYNTHESIS_CONFIG = {
     "max_ref_len": 10  # Maximum seconds of audio for decoder conditioning
 }
 
-# ============================================================================
-# AUDIO PROCESSING UTILITIES
-# ============================================================================
-
-def apply_speed_adjustment(wav_data, speed_factor: float):
+# Engine memory budget: measured per load, LRU eviction + idle unload.
+# Default budget is the GPU memory fraction of total VRAM (unlimited on CPU).
+# DEFAULT_ENGINE is pinned: tts_engine/embedding_manager keep references to it.
+def _default_engine_budget_mb() -> float:
+    env = os.getenv("ENGINE_MEMORY_BUDGET_MB")
+    if env:
+        return float(env)
+    if GPU_AVAILABLE:
+        total_mb = torch.cuda.get_device_properties(0).total_memory / (1024 * 1024)
+        return total_mb * GPU_OPTIMIZATIONS["memory_fraction"]
+    return 0
+
+def _apply_device_defaults():
     """
-    Adjust audio playback speed using librosa or torch resampling.
-    
-    Args:
-        wav_data: Audio data (torch.Tensor or numpy array)
-        speed_factor: Speed multiplier (0.5 to 2.0)
-    
-    Returns:
-        Speed-adjusted audio data
+    Resolve the GPU-dependent defaults once torch is imported: device, default
+    precision, engine memory budget and executor concurrency.
     """
-    if speed_factor == 1.0:
-        return wav_data
-    
-    try:
-        # Convert to torch tensor if needed
-        if not isinstance(wav_data, torch.Tensor):
-            wav_tensor = torch.tensor(wav_data, dtype=torch.float32)
-        else:
-            wav_tensor = wav_data.clone()
-        
-        # Ensure 1D or 2D tensor
-        if wav_tensor.dim() == 1:
-            wav_tensor = wav_tensor.unsqueeze(0)
-        
-        # Calculate new sample rate (speed increases = higher effective SR)
-        new_sr = int(SAMPLE_RATE * speed_factor)
-        
-        # Use torchaudio resample to adjust speed
-        resampler = torchaudio.transforms.Resample(SAMPLE_RATE, new_sr)
-        speed_adjusted = resampler(wav_tensor)
-        
-        # Squeeze back to 1D if input was 1D
-        if speed_adjusted.shape[0] == 1:
-            speed_adjusted = speed_adjusted.squeeze(0)
-        
-        return speed_adjusted
-    
-    except Exception as e:
-        print(f"⚠️ Speed adjustment failed: {e}. Returning original audio.")
-        return wav_data
+    global GPU_AVAILABLE, GPU_DEVICE, MODEL_PRECISION
+    GPU_AVAILABLE = torch.cuda.is_available()
+    GPU_DEVICE = torch.device('cuda' if GPU_AVAILABLE else 'cpu')
+    SYNTHESIS_CONFIG["gpu_enabled"] = GPU_AVAILABLE
+    SYNTHESIS_CONFIG["use_half_precision"] = GPU_AVAILABLE
+    if "MODEL_PRECISION" not in os.environ and GPU_AVAILABLE and GPU_OPTIMIZATIONS["precision"] == MODEL_PRECISION:
+        MODEL_PRECISION = "fp16"
+        GPU_OPTIMIZATIONS["precision"] = MODEL_PRECISION
+        GPU_OPTIMIZATIONS["use_half_precision"] = True
+    engine_manager.config["budget_mb"] = _default_engine_budget_mb()
+    engine_manager.set_options(**_model_options())
+    INFERENCE_POOL_CONFIG["engine_options"] = _model_options()
+    inference_executors.refresh_limits()
+    print(f"🖥️  Device: {GPU_DEVICE}")
+
+def _device_label() -> str:
+    """Device for status endpoints ("detecting" until torch is imported)."""
+    return str(GPU_DEVICE) if GPU_DEVICE is not None else "detecting"
+
+def _on_engine_loaded(name: str, engine):
+    """Seed router priors; after a reload swap, repoint the XTTS globals to the new instance."""
+    global tts_engine, tts_model
+    engine_router.set_prior(name, engine.get_engine_speed(), engine.device)
+    if name == DEFAULT_ENGINE and tts_engine is not None and engine is not tts_engine:
+        tts_engine = engine
+        tts_model = engine.tts_model
+        if embedding_manager:
+            embedding_manager.engine = engine
+
+def _model_options() -> Dict[str, Any]:
+    """Model optimizations applied by the engines at load time (see engines/optimizations.py)."""
+    return {
+        "int8": GPU_OPTIMIZATIONS["use_int8_quantization"],
+        "precision": GPU_OPTIMIZATIONS["precision"],
+        "compile": GPU_OPTIMIZATIONS["compile_decoder"],
+        "snapshot": GPU_OPTIMIZATIONS["model_snapshot"]
+    }
 
-def normalize_audio_file(wav_path: str, target_sr: int = 22050) -> str:
-    """
-    Normalize and convert audio file to the format expected by XTTS.
-    Includes robust validation and error handling for corrupted files.
-    
-    Args:
-        wav_path: Path to input WAV file
-        target_sr: Target sample rate (default 22050)
-    
-    Returns:
-        Path to normalized WAV file
-    """
-    try:
-        # Try loading with scipy first (more robust for browser WAVs)
-        try:
-            sr, wav_data = wavfile.read(wav_path)
-            print(f"   📊 Loaded with scipy: sr={sr}, shape={wav_data.shape}")
-            
-            # Validate data
-            if wav_data.size == 0:
-                raise ValueError("WAV file is empty")
-            
-            if sr <= 0:
-                raise ValueError(f"Invalid sample rate: {sr}")
-            
-            # Convert to float32 if needed
-            if wav_data.dtype != np.float32:
-                wav_data = wav_data.astype(np.float32) / np.iinfo(wav_data.dtype).max
-            
-            # Clamp values to prevent CUDA assertion
-            wav_data = np.clip(wav_data, -1.0, 1.0)
-            
-            # Convert to tensor
-            wav = torch.from_numpy(wav_data)
-        except Exception as e:
-            print(f"   ⚠️ Scipy failed: {str(e)}, trying torchaudio...")
-            wav, sr = torchaudio.load(wav_path)
-            print(f"   📊 Loaded with torchaudio: sr={sr}, shape={wav.shape}")
-            
-            # Validate loaded data
-            if wav.shape[1] == 0:
-                raise ValueError("WAV file has no samples")
-            
-            if sr <= 0:
-                raise ValueError(f"Invalid sample rate: {sr}")
-        
-        # Ensure it's a tensor
-        if not isinstance(wav, torch.Tensor):
-            wav = torch.from_numpy(wav)
-        
-        # Validate tensor values to prevent CUDA assert
-        if torch.isnan(wav).any():
-            print(f"   ⚠️ NaN values detected, replacing with zeros")
-            wav = torch.nan_to_num(wav, nan=0.0, posinf=1.0, neginf=-1.0)
-        
-        if torch.isinf(wav).any():
-            print(f"   ⚠️ Inf values detected, clamping")
-            wav = torch.clamp(wav, min=-1.0, max=1.0)
-        
-        # Handle shape
-        if wav.dim() == 1:
-            wav = wav.unsqueeze(0)
-        elif wav.dim() == 2:
-            pass
-        else:
-            raise ValueError(f"Unexpected tensor shape: {wav.shape}")
-        
-        print(f"   📊 After reshape: shape={wav.shape}")
-        
-        # Ensure minimum length (at least 1 second at target_sr)
-        min_samples = target_sr  # 1 second minimum
-        if wav.shape[1] < min_samples:
-            print(f"   ⚠️ Audio too short ({wav.shape[1]} samples), padding to {min_samples}")
-            padding = min_samples - wav.shape[1]
-            wav = torch.nn.functional.pad(wav, (0, padding), mode='constant', value=0.0)
-        
-        # Resample if needed
-        if sr != target_sr:
-            resampler = torchaudio.transforms.Resample(sr, target_sr)
-            wav = resampler(wav)
-            print(f"   📊 Resampled to {target_sr}Hz")
-        
-        # Convert to mono if stereo
-        if wav.shape[0] > 1:
-            wav = wav.mean(dim=0, keepdim=True)
-            print(f"   📊 Converted to mono: shape={wav.shape}")
-        
-        # Normalize to [-0.95, 0.95]
-        max_val = torch.abs(wav).max()
-        if max_val > 0:
-            wav = wav / (max_val * 1.05)  # Slight headroom
-        
-        wav = torch.clamp(wav, -0.95, 0.95)
-        
-        # Save normalized using scipy
-        normalized_path = wav_path.replace('.wav', '_normalized.wav')
-        
-        # Convert to int16 for saving
-        wav_int16 = (wav.squeeze(0).numpy() * 32767).astype(np.int16)
-        wavfile.write(normalized_path, target_sr, wav_int16)
-        
-        print(f"   ✅ Normalized: {normalized_path}")
-        
-        return normalized_path
-        
-    except Exception as e:
-        print(f"   ❌ Normalization error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return wav_path
+# Active engine instances (lazy-loaded on demand, single-flight per engine)
+engine_manager = EngineManager(
+    ENGINES,
+    on_loaded=_on_engine_loaded,
+    options=_model_options(),
+    config={
+        "budget_mb": _default_engine_budget_mb(),
+        "idle_ttl_seconds": int(os.getenv("ENGINE_IDLE_TTL_SECONDS", "900")),
+        "pinned": [DEFAULT_ENGINE]
+    }
+)
 
 # ============================================================================
 
@@ -338,7 +309,37 @@ app = FastAPI(
     version="0.1.5"
 )
 
-# Add CORS middleware
+# Endpoints that need a loaded model (503 + Retry-After while models load)
+MODEL_ROUTES = (
+    "/v1/synthesize",  # also /v1/synthesize/stream
+    "/v1/clone-voice",
+    "/v1/batch-synthesize",
+    "/v1/precompute-embeddings",
+    "/v1/monitor/read-file",
+    "/v1/monitor/process-queue",
+)
+MODEL_LOAD_RETRY_AFTER_SECONDS = 5
+
+# Model load state (models load in the background after the server binds)
+model_state = {"state": "loading", "error": None}
+
+@app.middleware("http")
+async def require_loaded_models(request: Request, call_next):
+    """Answer model endpoints with 503 until the background model load finishes."""
+    if model_state["state"] != "ready" and request.url.path.startswith(MODEL_ROUTES):
+        if model_state["state"] == "failed":
+            return JSONResponse(
+                status_code=503,
+                content={"detail": f"Model failed to load: {model_state['error']}"}
+            )
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Model is loading, try again shortly"},
+            headers={"Retry-After": str(MODEL_LOAD_RETRY_AFTER_SECONDS)}
+        )
+    return await call_next(request)
+
+# Add CORS middleware (added last so it wraps the 503s above too)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -418,10 +419,76 @@ async def serve_obs_audio():
         const statusDiv = document.getElementById('status');
         let isPlaying = false;
         
+        // Modo binário: cabeçalho JSON + chunks PCM tocados via Web Audio
+        let audioCtx = null;
+        let stream = null;       // { sampleRate, channels } do stream atual
+        let nextStartTime = 0;   // Próximo instante livre na linha do tempo
+        const START_DELAY = 0.05;
+        
+        function getAudioContext() {
+            if (!audioCtx) {
+                audioCtx = new (window.AudioContext || window.webkitAudioContext)();
+            }
+            if (audioCtx.state === 'suspended') {
+                audioCtx.resume();
+            }
+            return audioCtx;
+        }
+        
+        function playPcmChunk(buffer) {
+            if (!stream) return;
+            const ctx = getAudioContext();
+            const pcm = new Int16Array(buffer);
+            const frames = pcm.length / stream.channels;
+            const audioBuffer = ctx.createBuffer(stream.channels, frames, stream.sampleRate);
+            for (let ch = 0; ch < stream.channels; ch++) {
+                const out = audioBuffer.getChannelData(ch);
+                for (let i = 0; i < frames; i++) {
+                    out[i] = pcm[i * stream.channels + ch] / 32768;
+                }
+            }
+            const source = ctx.createBufferSource();
+            source.buffer = audioBuffer;
+            source.connect(ctx.destination);
+            
+            // Encadear chunks sem lacunas; reiniciar se a fila esvaziou
+            const startAt = Math.max(nextStartTime, ctx.currentTime + START_DELAY);
+            source.start(startAt);
+            nextStartTime = startAt + audioBuffer.duration;
+            
+            source.onended = () => {
+                if (ctx.currentTime >= nextStartTime - 0.01) {
+                    isPlaying = false;
+                    statusDiv.textContent = 'Aguardando...';
+                }
+            };
+            statusDiv.textContent = 'Reproduzindo';
+            isPlaying = true;
+        }
+        
+        // Modo JSON (legado): WAV completo em base64
+        function playBase64Wav(audioB64) {
+            const binaryString = atob(audioB64);
+            const bytes = new Uint8Array(binaryString.length);
+            for (let i = 0; i < binaryString.length; i++) {
+                bytes[i] = binaryString.charCodeAt(i);
+            }
+            
+            const blob = new Blob([bytes], { type: 'audio/wav' });
+            player.src = URL.createObjectURL(blob);
+            player.play().catch(err => {
+                console.error('Erro ao reproduzir áudio:', err);
+            });
+            
+            statusDiv.textContent = 'Reproduzindo';
+            isPlaying = true;
+        }
+        
         // WebSocket para receber áudio em tempo real
         function connectWebSocket() {
             const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-            const ws = new WebSocket(`${protocol}//${window.location.host}/ws/audio`);
+            const ws = new WebSocket(`${protocol}//${window.location.host}/ws/audio?mode=binary`);
+            ws.binaryType = 'arraybuffer';
             
             ws.onopen = () => {
                 statusDiv.textContent = 'Conectado';
@@ -430,28 +497,24 @@ async def serve_obs_audio():
             
             ws.onmessage = (event) => {
                 try {
+                    if (event.data instanceof ArrayBuffer) {
+                        playPcmChunk(event.data);
+                        return;
+                    }
+                    
                     const data = JSON.parse(event.data);
                     
+                    if (data.type === 'audio_start') {
+                        stream = { sampleRate: data.sample_rate, channels: data.channels || 1 };
+                        getAudioContext();
+                    }
+                    
+                    if (data.type === 'audio_end') {
+                        stream = null;
+                    }
+                    
                     if (data.type === 'audio' && data.audio) {
-                        // Decodificar áudio base64
-                        const binaryString = atob(data.audio);
-                        const bytes = new Uint8Array(binaryString.length);
-                        for (let i = 0; i < binaryString.length; i++) {
-                            bytes[i] = binaryString.charCodeAt(i);
-                        }
-                        
-                        // Criar Blob e URL para o player
-                        const blob = new Blob([bytes], { type: 'audio/wav' });
-                        const audioUrl = URL.createObjectURL(blob);
-                        
-                        // Reproduzir áudio
-                        player.src = audioUrl;
-                        player.play().catch(err => {
-                            console.error('Erro ao reproduzir áudio:', err);
-                        });
-                        
-                        statusDiv.textContent = 'Reproduzindo';
-                        isPlaying = true;
+                        playBase64Wav(data.audio);
                     }
                     
                     if (data.type === 'status') {
@@ -469,6 +532,7 @@ async def serve_obs_audio():
             
             ws.onclose = () => {
                 statusDiv.textContent = 'Desconectado';
+                stream = null;
                 // Reconectar em 3 segundos
                 setTimeout(connectWebSocket, 3000);
             };
@@ -499,10 +563,69 @@ async def serve_obs_audio():
 # Global instances - using the new multi-engine system
 # Note: tts_engine and tts_model are primarily for XTTS v2 (legacy)
 # For multi-engine support, use get_active_engine(engine_name) function
-tts_engine: Optional[XTTSEngine] = None  # Primary XTTS v2 engine instance
+tts_engine: Optional[Any] = None  # Primary XTTS v2 engine instance (XTTSEngine)
 tts_model: Optional[Any] = None  # Legacy reference (points to tts_engine.tts_model)
 voice_manager: Optional[VoiceManager] = None
-embedding_manager: Optional[SpeakerEmbeddingManager] = None
+embedding_manager: Optional[Any] = None  # SpeakerEmbeddingManager, created by the background loader
+audio_spool = AudioSpool()  # Bounded scratch dir for files that must touch disk
+output_cache = OutputCache()  # Content-addressed cache of synthesized audio
+micro_batcher: Optional[MicroBatcher] = None  # Used when GPU_OPTIMIZATIONS["batch_processing"] is on
+inference_pool: Optional[InferencePool] = None  # Multi-process workers (INFERENCE_WORKERS > 0)
+warmup_runner: Optional[WarmupRunner] = None  # Startup warm-up (see warmup.py)
+
+# Compressed/resampled output encodings run here, off the event loop (see audio_formats.py)
+encoder_pool = EncoderPool({"workers": int(os.getenv("ENCODER_WORKERS", "2"))})
+timing_stats = TimingStats()  # Per-request stage breakdowns + RTF (see stage_timing.py)
+server_metrics = ServerMetrics()  # Prometheus exposition for GET /metrics (see metrics.py)
+
+# Startup warm-up: dummy phrases per language + latents of the most used voices
+WARMUP_SETTINGS = {
+    "enabled": os.getenv("WARMUP_ENABLED", "1") == "1",
+    "languages": [l.strip() for l in os.getenv("WARMUP_LANGUAGES", "pt").split(",") if l.strip()],
+    "voices": int(os.getenv("WARMUP_VOICES", "3")),
+}
+
+# Torch threads and CPU affinity (see cpu_threading.py)
+cpu_plan = CpuPlan({
+    "intra_op_threads": int(os.getenv("TORCH_THREADS", "0")),
+    "interop_threads": int(os.getenv("TORCH_INTEROP_THREADS", "0")),
+    "engine_threads": parse_engine_threads(os.getenv("ENGINE_THREADS", "")),
+    "slots": int(os.getenv("CPU_SLOTS", "0")),
+})
+
+# Inference worker processes (0 = synthesize in the API process)
+INFERENCE_POOL_CONFIG = {
+    "workers": int(os.getenv("INFERENCE_WORKERS", "0")),
+    "engine": os.getenv("INFERENCE_WORKER_ENGINE", DEFAULT_ENGINE),
+    "torch_threads": int(os.getenv("INFERENCE_WORKER_THREADS", "0")),
+    "job_timeout_seconds": int(os.getenv("INFERENCE_JOB_TIMEOUT_SECONDS", "300")),
+    "interop_threads": cpu_plan.config["interop_threads"],
+    "engine_options": _model_options(),
+}
+
+# Concurrent synthesis jobs per engine (0 = derive from device / workers / batching)
+INFERENCE_CONCURRENCY = int(os.getenv("INFERENCE_CONCURRENCY", "0"))
+
+def _inference_concurrency(engine_name: str) -> int:
+    """Concurrency limit of an engine's inference executor."""
+    if INFERENCE_CONCURRENCY > 0:
+        limit = INFERENCE_CONCURRENCY
+    elif _pool_serves(engine_name):
+        limit = INFERENCE_POOL_CONFIG["workers"]
+    else:
+        limit = 2 if GPU_AVAILABLE else 1
+    # The micro-batcher can only group requests that run concurrently
+    # (on CPU its limit follows the measured batch cost, often 1)
+    if GPU_OPTIMIZATIONS["batch_processing"] and micro_batcher is not None and engine_name == DEFAULT_ENGINE:
+        limit = max(limit, micro_batcher.max_batch_size())
+    return limit
+
+# Bounded executor per engine (inference no longer shares Starlette's threadpool)
+inference_executors = EngineExecutors(
+    _inference_concurrency,
+    config={"max_queue": int(os.getenv("INFERENCE_MAX_QUEUE", "32"))},
+    initializer=cpu_plan.init_inference_thread
+)
 
 # ============================================================================
 # STARTUP & SHUTDOWN
@@ -526,18 +649,28 @@ def get_active_engine(engine_name: Optional[str] = None) -> Any:
     if engine_name not in ENGINES:
         raise ValueError(f"Unknown engine: {engine_name}. Available: {list(ENGINES.keys())}")
     
-    # Return cached instance if already loaded
-    if engine_name in active_engines:
-        return active_engines[engine_name]
+    # Concurrent first requests share one load (see engine_manager.py)
+    return engine_manager.get(engine_name)
+
+
+def _route_engine(engine_name: str, text: str, language: str, latency_budget_ms: Optional[float] = None) -> str:
+    """
+    Resolve engine=auto to a concrete engine name.
     
-    # Load engine for the first time
-    print(f"⏳ Loading engine: {engine_name}")
-    engine_class = ENGINES[engine_name]
-    engine = engine_class()
-    engine.load_model()
-    active_engines[engine_name] = engine
+    Only engines that are already loaded (plus the default) are candidates,
+    so routing never triggers a cold model load in the request path.
+    """
+    if engine_name != AUTO_ENGINE:
+        return engine_name
+    
+    candidates = [DEFAULT_ENGINE]
+    for name, instance in engine_manager.loaded().items():
+        if name != DEFAULT_ENGINE and instance.validate_language(language):
+            candidates.append(name)
     
-    return engine
+    chosen = engine_router.choose(text, candidates, latency_budget_ms)
+    print(f"🧭 engine=auto → {chosen} (candidates: {candidates})")
+    return chosen
 
 
 def get_preferred_device() -> str:
@@ -548,6 +681,7 @@ def get_preferred_device() -> str:
       if 'cuda' is requested and CUDA isn't available).
     - Otherwise, use CUDA if `torch.cuda.is_available()` is True, else CPU.
     """
+    torch = _import_torch()
     env = os.getenv("XTTS_DEVICE", "").strip().lower()
     if env in ("cuda", "gpu"):
         if torch.cuda.is_available():
@@ -592,13 +726,104 @@ def initialize_tts_model(model_name: str = "tts_models/multilingual/multi-datase
         traceback.print_exc()
         raise
 
+def _load_models():
+    """
+    Background model load: XTTS engine, embedding manager, schedulers, workers
+    and the warm-up. Model endpoints answer 503 until this finishes.
+    """
+    global tts_engine, tts_model, embedding_manager, micro_batcher, inference_pool, warmup_runner
+    
+    try:
+        # Heavy imports run here, with the server already accepting connections
+        _import_engines()
+        _apply_device_defaults()
+        
+        # Torch thread counts must be set before the first model runs
+        cpu_plan.apply_process()
+        
+        # Inference worker processes (each loads its own engine in the background);
+        # started first so the API process knows whether it needs its own copy
+        if INFERENCE_POOL_CONFIG["workers"] > 0:
+            # One pinned CPU slot per worker when CPU_SLOTS is set
+            slots = [cpu_plan.slot(i) for i in range(INFERENCE_POOL_CONFIG["workers"])] if cpu_plan.slots else []
+            inference_pool = InferencePool({**INFERENCE_POOL_CONFIG, "slots": slots})
+            inference_pool.start()
+        
+        if _pool_serves(DEFAULT_ENGINE):
+            # N workers hold N copies of the model; the API process does not add one more
+            print(f"⏭️ {DEFAULT_ENGINE} is served by the inference workers, not loaded in the API process")
+        else:
+            # Initialize TTS engine
+            print("⏳ Loading XTTS v2 engine (this may take a moment)...")
+            with startup_timeline.stage("load XTTS v2 (background)"):
+                tts_model = initialize_tts_model("tts_models/multilingual/multi-dataset/xtts_v2")
+            print(f"✅ XTTS v2 engine loaded successfully")
+            
+            # Initialize embedding manager
+            try:
+                from speaker_embedding_manager import SpeakerEmbeddingManager
+                if tts_engine:
+                    embedding_manager = SpeakerEmbeddingManager(tts_engine)
+                    print("✅ Speaker Embedding Manager initialized")
+                else:
+                    print("⚠️ Skipping Embedding Manager (TTS engine not loaded)")
+                    embedding_manager = None
+            except Exception as e:
+                print(f"⚠️ Embedding Manager initialization warning: {str(e)}")
+                embedding_manager = None
+        
+        # Load other configured engines without blocking startup
+        if PRELOAD_ENGINES:
+            engine_manager.preload(PRELOAD_ENGINES)
+        
+        # Micro-batching scheduler (idle until batch_processing is enabled)
+        if tts_engine:
+            micro_batcher = MicroBatcher(
+                _run_synthesis_batch,
+                device=tts_engine.device,
+                on_resize=lambda _limit: inference_executors.refresh_limits()
+            )
+            micro_batcher.start()
+        
+        model_state["state"] = "ready"
+        startup_timeline.mark("models_ready")
+        startup_timeline.print_report()
+        
+        # Prime kernels, frontends and latents before the first real request
+        if tts_engine:
+            warmup_runner = WarmupRunner(
+                voices_for=lambda limit: voice_manager.most_used(limit) if voice_manager else [],
+                prime_voice=_warmup_prime_voice,
+                synthesize=_warmup_synthesis,
+                config=WARMUP_SETTINGS
+            )
+            warmup_runner.start()
+        
+    except Exception as e:
+        model_state["state"] = "failed"
+        model_state["error"] = str(e)
+        print(f"❌ Model load error: {str(e)}")
+        traceback.print_exc()
+
+def _open_browser():
+    """Open the web UI (runs off the event loop; webbrowser.open can block)."""
+    print("\n🌐 Abrindo navegador em http://localhost:8877...")
+    try:
+        import webbrowser
+        webbrowser.open('http://localhost:8877')
+    except Exception as e:
+        print(f"⚠️ Não foi possível abrir o navegador automaticamente: {e}")
+        print("   Acesse manualmente: http://localhost:8877")
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize TTS engine, voice manager, and embedding manager on startup."""
-    global tts_engine, tts_model, voice_manager, embedding_manager
+    """
+    Start lightweight services and return right away so the server binds
+    immediately; models load in a background thread (see _load_models).
+    """
+    global voice_manager
     
     print("🚀 Starting XTTS v2 Server with Multi-Engine Support...")
-    print(f"🖥️  Device: {torch.device('cuda' if torch.cuda.is_available() else 'cpu')}")
     
     # Debug: List all registered routes
     print("\n📋 Registered routes:")
@@ -608,13 +833,8 @@ async def startup_event():
             print(f"  {route_info}")
     print()
     
-    try:
-        # Initialize TTS engine
-        print("⏳ Loading XTTS v2 engine (this may take a moment)...")
-        tts_model = initialize_tts_model("tts_models/multilingual/multi-dataset/xtts_v2")
-        print(f"✅ XTTS v2 engine loaded successfully")
-        
-        # Initialize voice manager
+    with startup_timeline.stage("startup event"):
+        # Initialize voice manager (no model needed)
         try:
             voice_manager = VoiceManager()
             print(f"✅ Voice Manager initialized - {len(voice_manager.list_voices())} voices available")
@@ -622,31 +842,19 @@ async def startup_event():
             print(f"⚠️ Voice Manager initialization warning: {str(e)}")
             voice_manager = None
         
-        # Initialize embedding manager
-        try:
-            if tts_engine:
-                embedding_manager = SpeakerEmbeddingManager(tts_engine.tts_model)
-                print("✅ Speaker Embedding Manager initialized")
-            else:
-                print("⚠️ Skipping Embedding Manager (TTS engine not loaded)")
-                embedding_manager = None
-        except Exception as e:
-            print(f"⚠️ Embedding Manager initialization warning: {str(e)}")
-            embedding_manager = None
-        
-        # Open browser automatically
-        print("\n🌐 Abrindo navegador em http://localhost:8877...")
-        try:
-            import webbrowser
-            webbrowser.open('http://localhost:8877')
-        except Exception as e:
-            print(f"⚠️ Não foi possível abrir o navegador automaticamente: {e}")
-            print("   Acesse manualmente: http://localhost:8877")
+        # Start spool janitor (removes expired/over-budget scratch files)
+        audio_spool.start_janitor()
         
-    except Exception as e:
-        print(f"❌ Startup error: {str(e)}")
-        traceback.print_exc()
-        raise
+        # Unload engines that stay idle past ENGINE_IDLE_TTL_SECONDS
+        engine_manager.start_janitor()
+    
+    # Models load in the background; model endpoints answer 503 + Retry-After meanwhile
+    threading.Thread(target=_load_models, name="model-loader", daemon=True).start()
+    startup_timeline.mark("accepting_connections")
+    print(f"✅ Server accepting connections after {startup_timeline.marks['accepting_connections']:.1f}s (models loading in background)")
+    
+    if OPEN_BROWSER:
+        threading.Thread(target=_open_browser, name="open-browser", daemon=True).start()
 
 
 @app.on_event("shutdown")
@@ -656,12 +864,24 @@ async def shutdown_event():
     
     print("🛑 Shutting down XTTS v2 Server...")
     
-    if tts_engine:
-        try:
-            tts_engine.unload_model()
-            print("✅ TTS engine unloaded")
-        except Exception as e:
-            print(f"⚠️ Error unloading engine: {e}")
+    audio_spool.stop_janitor()
+    engine_manager.stop_janitor()
+    
+    if micro_batcher:
+        micro_batcher.stop()
+    
+    inference_executors.shutdown()
+    encoder_pool.shutdown()
+    
+    if inference_pool:
+        inference_pool.stop()
+        print("✅ Inference workers stopped")
+    
+    engine_manager.unload_all()
+    print("✅ TTS engines unloaded")
+    
+    if voice_manager:
+        voice_manager.save_usage()
     
     print("✅ Server shutdown complete")
 
@@ -671,11 +891,27 @@ async def shutdown_event():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """
+    Health check endpoint.
+    
+    Status is "loading" until the background model load finishes ("failed"
+    if it did not), then "warming" until the startup warm-up finishes.
+    """
+    if model_state["state"] != "ready":
+        status = model_state["state"]
+    elif warmup_runner is not None and warmup_runner.warming:
+        status = "warming"
+    else:
+        status = "healthy"
     return {
-        "status": "healthy",
+        "status": status,
+        "model_error": model_state["error"],
+        "warmup": warmup_runner.get_status() if warmup_runner else {"state": "disabled"},
         "model": "xtts_v2",
-        "device": str(torch.device('cuda' if torch.cuda.is_available() else 'cpu')),
+        "device": _device_label(),
+        "engines": engine_manager.get_states(),
+        "inference_pool": inference_pool.get_statistics() if inference_pool else {"enabled": False},
+        "startup": startup_timeline.get_report(),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -687,7 +923,7 @@ async def get_info():
         "name": "XTTS v2 Server",
         "version": "0.1.5",
         "model": "xtts_v2",
-        "device": str(torch.device('cuda' if torch.cuda.is_available() else 'cpu')),
+        "device": _device_label(),
         "languages": LANGUAGE_SUPPORT,
         "features": {
             "voice_cloning": True,
@@ -698,12 +934,16 @@ async def get_info():
         },
         "endpoints": {
             "tts": "POST /v1/synthesize",
+            "tts_stream": "POST /v1/synthesize/stream",
             "voice_clone": "POST /v1/clone-voice",
             "upload_voice": "POST /v1/voices/upload",
             "list_voices": "GET /v1/voices",
             "delete_voice": "DELETE /v1/voices/{voice_id}",
             "get_voice": "GET /v1/voices/{voice_id}",
             "batch_tts": "POST /v1/batch-synthesize",
+            "output_cache": "GET/DELETE /v1/output-cache",
+            "timings": "GET /v1/timings",
+            "metrics": "GET /metrics",
             "precompute_embeddings": "POST /v1/precompute-embeddings",
             "synthesis_config": "GET /v1/synthesis-config",
             "obs_audio_player": "GET /obs-audio",
@@ -714,8 +954,14 @@ async def get_info():
         },
         "max_text_length": 1000,
         "supported_sample_rate": SAMPLE_RATE,
+        "output_formats": available_formats(),
+        "encoder": encoder_pool.get_statistics(),
         "max_voice_size_mb": 50,
-        "max_custom_voices": 100
+        "max_custom_voices": 100,
+        "cpu_threading": cpu_plan.get_info(),
+        "inference_pool": inference_pool.get_statistics() if inference_pool else {"enabled": False},
+        "models": model_state,
+        "startup": startup_timeline.get_report()
     }
 
 @app.get("/v1/synthesis-config")
@@ -781,10 +1027,10 @@ async def get_synthesis_config():
         },
         "advanced_settings": {
             "gpu_enabled": GPU_AVAILABLE,
-            "gpu_device": str(GPU_DEVICE),
+            "gpu_device": _device_label(),
             "gpu_memory_fraction": GPU_MEMORY_FRACTION,
             "use_half_precision": SYNTHESIS_CONFIG["use_half_precision"],
-            "batch_processing_available": False,
+            "batch_processing_available": True,
             "gpu_optimizations": {
                 "memory_fraction": {
                     "description": "GPU memory allocation (higher = faster but riskier)",
@@ -802,26 +1048,48 @@ async def get_synthesis_config():
                         {"label": "95% (Very Fast)", "value": 0.95}
                     ]
                 },
+                "precision": {
+                    "description": "Inference precision of the XTTS GPT and HiFi-GAN (switching reloads the model in the background)",
+                    "type": "select",
+                    "default": "fp16" if GPU_AVAILABLE else "fp32",
+                    "current": GPU_OPTIMIZATIONS["precision"],
+                    "effective": (tts_engine.applied_optimizations.get("precision") if tts_engine else None),
+                    "options": [
+                        {"label": "FP32 (Reference)", "value": "fp32"},
+                        {"label": "BF16 (GPU / CPUs with AVX512-BF16 or AMX)", "value": "bf16"},
+                        {"label": "FP16 (GPU only)", "value": "fp16"}
+                    ]
+                },
+                "compile_decoder": {
+                    "description": "torch.compile the XTTS HiFi-GAN / StyleTTS2 decoder (cached in .tts-cache, eager fallback)",
+                    "type": "boolean",
+                    "default": False,
+                    "current": GPU_OPTIMIZATIONS["compile_decoder"],
+                    "effective": (tts_engine.applied_optimizations.get("compile") if tts_engine else None)
+                },
                 "use_half_precision": {
-                    "description": "Use FP16 for 2-3x faster inference (slight quality loss)",
+                    "description": "Use FP16 inference (slight quality loss); same as precision=fp16",
                     "type": "boolean",
-                    "default": True,
-                    "current": GPU_OPTIMIZATIONS["use_half_precision"],
-                    "speedup": "2-3x"
+                    "default": GPU_AVAILABLE,
+                    "current": GPU_OPTIMIZATIONS["use_half_precision"]
                 },
                 "batch_processing": {
-                    "description": "Process multiple synthesis requests in parallel",
+                    "description": "Micro-batch concurrent synthesis requests (same engine and language)",
                     "type": "boolean",
                     "default": False,
                     "current": GPU_OPTIMIZATIONS["batch_processing"],
-                    "note": "Experimental - reduces individual latency for batch requests"
+                    "stats": micro_batcher.get_statistics() if micro_batcher else None,
+                    "note": "Only the XTTS vocoder runs batched (GPT generation stays per sentence); adds up to the batch window of latency"
+                },
+                "inference_executors": {
+                    "description": "Per-engine concurrency limit and wait queue (INFERENCE_CONCURRENCY, INFERENCE_MAX_QUEUE)",
+                    "stats": inference_executors.get_statistics()
                 },
                 "use_int8_quantization": {
                     "description": "Use INT8 quantization for faster inference",
                     "type": "boolean",
                     "default": False,
                     "current": GPU_OPTIMIZATIONS["use_int8_quantization"],
-                    "speedup": "1.5-2x",
                     "note": "Experimental - may affect quality"
                 },
                 "enable_model_cache": {
@@ -830,6 +1098,10 @@ async def get_synthesis_config():
                     "default": True,
                     "current": GPU_OPTIMIZATIONS["enable_model_cache"],
                     "benefit": "Faster subsequent requests (eliminates load time)"
+                },
+                "measured": {
+                    "description": "Real-time factor before/after the last option change, per reloaded engine",
+                    "reloads": {name: state["reload"] for name, state in engine_manager.get_states().items() if "reload" in state}
                 }
             }
         },
@@ -906,6 +1178,13 @@ async def get_available_engines():
     engines_info = {
         "available": list(ENGINES.keys()),
         "current": DEFAULT_ENGINE,
+        "states": engine_manager.get_states(),
+        "memory": engine_manager.get_memory_statistics(),
+        "auto": {
+            "name": AUTO_ENGINE,
+            "description": "Pick an engine per request from queue depth, observed RTF and latency_budget_ms",
+            "router": engine_router.get_statistics()
+        },
         "engines": {
             "xtts-v2": {
                 "label": "XTTS v2 (Default)",
@@ -955,6 +1234,29 @@ async def get_available_engines():
                     "Slightly fewer languages",
                     "Newer engine (less tested)"
                 ]
+            },
+            "xtts-onnx": {
+                "label": "XTTS v2 (ONNX Runtime, CPU)",
+                "description": "XTTS v2 with the vocoder and GPT latent pass exported to ONNX Runtime for CPU-only hosts",
+                "languages": 16,
+                "speed": "medium",
+                "quality": "excellent",
+                "vram_mb": 0,
+                "available": "xtts-onnx" in ENGINES,
+                "features": [
+                    "Same voices and conditioning cache as xtts-v2",
+                    "ONNX graphs exported once and cached in .tts-cache/onnx",
+                    "Falls back to PyTorch per stage if validation fails"
+                ],
+                "pros": [
+                    "Faster vocoder on CPU",
+                    "No GPU required"
+                ],
+                "cons": [
+                    "Autoregressive sampling still runs in PyTorch",
+                    "Loads its own XTTS copy (extra RAM)",
+                    "Requires onnxruntime"
+                ]
             }
         }
     }
@@ -964,23 +1266,55 @@ async def get_available_engines():
     
     return engines_info
 
+BENCHMARK_TEXT = "Olá! Este é um teste rápido de desempenho da síntese de voz."
+
+def _benchmark_rtf(engine_name: str, engine) -> Optional[float]:
+    """
+    Real-time factor (compute seconds / audio seconds) of a fixed phrase.
+    
+    Used to report measured before/after numbers when an engine is reloaded
+    with different model options. Best of two runs (the first warms up).
+    """
+    if not voice_manager or not voice_manager.voices:
+        return None
+    voice = "default" if "default" in voice_manager.voices else next(iter(voice_manager.voices))
+    job = {
+        "text": BENCHMARK_TEXT, "language": "pt", "voice": voice,
+        "temperature": 0.75, "top_k": 50, "top_p": 0.85,
+        "gpt_cond_len": SYNTHESIS_CONFIG["gpt_cond_len"],
+        "sample_rate": SAMPLE_RATE
+    }
+    best = None
+    for _ in range(2):
+        start = time.perf_counter()
+        wav, sample_rate = run_synthesis_job(job, engine, voice_manager, embedding_manager)
+        audio_seconds = np.asarray(wav).reshape(-1).shape[0] / sample_rate
+        if audio_seconds > 0:
+            rtf = (time.perf_counter() - start) / audio_seconds
+            best = rtf if best is None else min(best, rtf)
+    return round(best, 3) if best is not None else None
+
 @app.post("/v1/gpu-settings")
 async def update_gpu_settings(
     memory_fraction: float = Form(None),
+    precision: str = Form(None),
     use_half_precision: bool = Form(None),
     batch_processing: bool = Form(None),
     use_int8_quantization: bool = Form(None),
-    enable_model_cache: bool = Form(None)
+    enable_model_cache: bool = Form(None),
+    compile_decoder: bool = Form(None)
 ):
     """
     Update GPU optimization settings for faster inference.
     
     Args:
         memory_fraction: GPU memory allocation (0.5 to 0.95)
-        use_half_precision: Enable FP16 for faster inference
-        batch_processing: Enable batch processing
+        precision: fp32, bf16 or fp16 (reloads loaded engines in the background)
+        use_half_precision: Enable FP16 for faster inference (legacy for precision=fp16/fp32)
+        batch_processing: Enable micro-batching of concurrent synthesis requests
         use_int8_quantization: Enable INT8 quantization
         enable_model_cache: Keep model in memory between requests
+        compile_decoder: torch.compile the vocoder/decoder (reloads loaded engines in the background)
     
     Returns:
         Updated settings and performance metrics
@@ -995,13 +1329,27 @@ async def update_gpu_settings(
         GPU_OPTIMIZATIONS["memory_fraction"] = memory_fraction
         print(f"   📊 GPU Memory Fraction: {memory_fraction * 100:.0f}%")
     
-    if use_half_precision is not None:
-        GPU_OPTIMIZATIONS["use_half_precision"] = use_half_precision
-        print(f"   🔢 Half-Precision (FP16): {use_half_precision}")
+    if precision is not None:
+        precision = precision.lower()
+        if precision not in ("fp32", "bf16", "fp16"):
+            raise HTTPException(status_code=400, detail="precision must be 'fp32', 'bf16' or 'fp16'")
+    elif use_half_precision is not None:
+        # Legacy switch: only moves between fp16 and fp32 (keeps bf16 unless FP16 is requested)
+        if use_half_precision:
+            precision = "fp16"
+        elif GPU_OPTIMIZATIONS["precision"] == "fp16":
+            precision = "fp32"
+    
+    if precision is not None:
+        GPU_OPTIMIZATIONS["precision"] = precision
+        GPU_OPTIMIZATIONS["use_half_precision"] = precision == "fp16"
+        print(f"   🔢 Precision: {precision}")
     
     if batch_processing is not None:
         GPU_OPTIMIZATIONS["batch_processing"] = batch_processing
         print(f"   📦 Batch Processing: {batch_processing}")
+        # Batching needs enough concurrent jobs to group
+        inference_executors.refresh_limits()
     
     if use_int8_quantization is not None:
         GPU_OPTIMIZATIONS["use_int8_quantization"] = use_int8_quantization
@@ -1011,26 +1359,29 @@ async def update_gpu_settings(
         GPU_OPTIMIZATIONS["enable_model_cache"] = enable_model_cache
         print(f"   💾 Model Cache: {enable_model_cache}")
     
-    # Return updated settings with performance estimates
-    performance_estimate = {
-        "base_latency_ms": 1000,  # Baseline without optimizations
-        "estimated_speedup": 1.0
-    }
-    
-    if GPU_OPTIMIZATIONS["use_half_precision"]:
-        performance_estimate["estimated_speedup"] *= 2.5
-    
-    if GPU_OPTIMIZATIONS["use_int8_quantization"]:
-        performance_estimate["estimated_speedup"] *= 1.5
-    
-    performance_estimate["estimated_latency_ms"] = int(
-        performance_estimate["base_latency_ms"] / performance_estimate["estimated_speedup"]
-    )
-    
+    if compile_decoder is not None:
+        GPU_OPTIMIZATIONS["compile_decoder"] = compile_decoder
+        print(f"   ⚙️ Compiled decoder: {compile_decoder}")
+    
+    # Model options are applied at load time: reload loaded engines in the background
+    # (the current instances keep serving until the new ones are swapped in)
+    reloading = []
+    if engine_manager.set_options(**_model_options()):
+        for name in engine_manager.loaded():
+            if engine_manager.reload(name, benchmark=_benchmark_rtf):
+                reloading.append(name)
+        # Workers read the options at spawn: rolling restart, one worker at a time
+        INFERENCE_POOL_CONFIG["engine_options"] = _model_options()
+        if inference_pool is not None and inference_pool.reload(_model_options()):
+            reloading.append(f"{inference_pool.config['engine']} (inference workers)")
+    
+    # Speed is reported as measured (rtf_before/rtf_after/speedup per reloaded
+    # engine, filled in when the background reload finishes), never estimated
     return {
         "status": "✅ GPU settings updated",
         "current_settings": GPU_OPTIMIZATIONS,
-        "performance_estimate": performance_estimate,
+        "reloading": reloading,
+        "measured": {name: state.get("reload") for name, state in engine_manager.get_states().items() if "reload" in state},
         "recommendations": {
             "for_speed": "Enable FP16 + increase memory to 90%",
             "for_quality": "Keep FP16 off + low memory (0.7-0.8)",
@@ -1042,14 +1393,242 @@ async def update_gpu_settings(
 # TTS ENDPOINTS
 # ============================================================================
 
-def _do_synthesis(text, language, voice, speed, temperature, top_k, top_p, length_scale, gpt_cond_len, engine=None):
+def _get_conditioning_latents(reference, gpt_cond_len):
+    """
+    Return XTTS conditioning latents for a normalized voice reference.
+    
+    Uses the embedding manager cache when available so the conditioning cost
+    is paid once per voice/reference/gpt_cond_len instead of on every request.
+    """
+    if embedding_manager:
+        return embedding_manager.get_or_compute_latents(
+            reference,
+            gpt_cond_len=gpt_cond_len,
+            gpt_cond_chunk_len=SYNTHESIS_CONFIG["gpt_cond_chunk_len"],
+            max_ref_len=SYNTHESIS_CONFIG["max_ref_len"]
+        )
+    
+    return tts_engine.compute_conditioning_latents_from_audio(
+        [reference.samples],
+        sample_rate=reference.sample_rate,
+        gpt_cond_len=gpt_cond_len,
+        gpt_cond_chunk_len=SYNTHESIS_CONFIG["gpt_cond_chunk_len"],
+        max_ref_len=SYNTHESIS_CONFIG["max_ref_len"]
+    )
+
+def _negotiate_output(request: Request, format: Optional[str], sample_rate: Optional[int]) -> OutputFormat:
+    """Output format from format=/sample_rate= or the Accept header (400/406 if impossible)."""
+    try:
+        return negotiate(format, request.headers.get("accept"), sample_rate)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+def _finish_timing(response: Response, timer: StageTimer, endpoint: str, engine: Optional[str], result: AudioResult):
+    """Record the request's stage breakdown + RTF and attach it as Server-Timing."""
+    summary = timing_stats.record(endpoint, engine, timer, result.duration)
+    server_metrics.observe_request(endpoint, engine, summary["total_ms"] / 1000, result.duration)
+    response.headers["Server-Timing"] = timer.server_timing()
+    if summary["rtf"] is not None:
+        response.headers["X-Real-Time-Factor"] = str(summary["rtf"])
+    stages = ", ".join(f"{name} {ms:.0f}" for name, ms in summary["stages_ms"].items())
+    print(f"⏱️ {endpoint}: {summary['total_ms']:.0f}ms for {result.duration:.2f}s audio (RTF {summary['rtf']}) [{stages}]")
+
+async def _audio_response(result: AudioResult, output_format: OutputFormat, name: str) -> Response:
+    """Build an in-memory response in the negotiated format (encoded once per result)."""
+    content = await encoder_pool.encode(result, output_format)
+    return Response(
+        content=content,
+        media_type=output_format.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{output_format.extension}"',
+            "X-Sample-Rate": str(output_format.target_rate(result.sample_rate)),
+            "Vary": "Accept"
+        }
+    )
+
+def _warmup_prime_voice(voice: str):
+    """Warm-up step: normalized reference + cached conditioning latents of a voice."""
+    reference = voice_manager.get_reference(voice, XTTS_REFERENCE_SR)
+    if reference is None:
+        raise RuntimeError(f"Voice '{voice}' not found")
+    if _pool_serves(DEFAULT_ENGINE):
+        return  # Workers condition on their own engine (primed by the synthesis step)
+    _get_conditioning_latents(reference, SYNTHESIS_CONFIG["gpt_cond_len"])
+
+def _warmup_synthesis(text: str, language: str, voice: str):
+    """Warm-up step: one synthesis on the default engine's executor (output discarded)."""
+    def run():
+        reference = voice_manager.get_reference(voice, XTTS_REFERENCE_SR)
+        if reference is None:
+            raise RuntimeError(f"Voice '{voice}' not found")
+        if _pool_serves(DEFAULT_ENGINE):
+            inference_pool.submit({
+                "kind": "synthesis", "text": text, "language": language, "voice": voice,
+                "temperature": 0.75, "top_k": 50, "top_p": 0.85,
+                "gpt_cond_len": SYNTHESIS_CONFIG["gpt_cond_len"],
+                "gpt_cond_chunk_len": SYNTHESIS_CONFIG["gpt_cond_chunk_len"],
+                "max_ref_len": SYNTHESIS_CONFIG["max_ref_len"],
+                "sample_rate": SAMPLE_RATE
+            }).result()
+            return
+        with engine_manager.lease(DEFAULT_ENGINE) as active_engine:
+            _synthesize_with_engine(
+                active_engine, DEFAULT_ENGINE, text, language, voice, reference,
+                0.75, 50, 0.85, SYNTHESIS_CONFIG["gpt_cond_len"]
+            )
+    
+    # Through the executor so its thread setup (threads/affinity) is primed too
+    inference_executors.get(DEFAULT_ENGINE).call(run)
+
+def _run_synthesis_batch(key, items):
+    """MicroBatcher runner: one batched XTTS pass for items sharing (engine, language)."""
+    engine_name, language = key
+    # Leased like every other synthesis path: reloads and evictions wait for the batch
+    with engine_manager.lease(engine_name) as active_engine:
+        return active_engine.inference_batch(language, items)
+
+def _busy_error(error: ExecutorBusy) -> HTTPException:
+    """503 with Retry-After for a full inference queue."""
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def _pool_serves(engine_name: str) -> bool:
+    """True when the inference worker pool runs this engine."""
+    return inference_pool is not None and inference_pool.enabled and inference_pool.config["engine"] == engine_name
+
+def _xtts_ready() -> bool:
+    """True when XTTS can serve requests (in-process model or the worker pool)."""
+    return bool(tts_model) or _pool_serves(DEFAULT_ENGINE)
+
+def _native_speed(engine_name: str) -> bool:
+    """True when the engine applies speed in the model (no resampling fallback)."""
+    engine_class = ENGINES.get(engine_name)
+    return engine_class is not None and engine_class.supports_native_speed()
+
+def _synthesize_with_engine(active_engine, engine_name, text, language, voice, reference,
+                            temperature, top_k, top_p, gpt_cond_len, speed=1.0):
+    """
+    Run the engine itself and return (float32 samples, sample_rate).
+    
+    XTTS uses the cached conditioning latents (and the micro-batcher when
+    enabled); every other engine goes through BaseTTSEngine.synthesize_array.
+    speed is passed to the model, so it must stay 1.0 for engines without
+    native speed control (see _native_speed).
+    """
+    if isinstance(active_engine, XTTSEngine):
+        # Check if TTS model is loaded (for backward compatibility)
+        if not tts_model:
+            raise RuntimeError("TTS model not loaded!")
+        
+        # Get conditioning latents (cached per voice + reference hash + conditioning params)
+        with stage("conditioning"):
+            gpt_cond_latent, speaker_embedding = _get_conditioning_latents(reference, gpt_cond_len)
+        
+        # Generate audio directly from the precomputed latents
+        request_item = {
+            "text": text,
+            "gpt_cond_latent": gpt_cond_latent,
+            "speaker_embedding": speaker_embedding,
+            "temperature": temperature,
+            "top_k": top_k,
+            "top_p": top_p,
+            "speed": speed
+        }
+        if GPU_OPTIMIZATIONS["batch_processing"] and micro_batcher is not None:
+            # Joins other requests for the same engine/language arriving in the window
+            # (the batch runs on this executor thread or another caller's; only the
+            # vocoder pass is shared by the batch)
+            with stage("batch"):
+                return micro_batcher.run((engine_name, language), request_item), SAMPLE_RATE
+        with stage("gpt"):
+            return active_engine.inference_with_latents(language=language, **request_item), SAMPLE_RATE
+    
+    with stage("model"):
+        return active_engine.synthesize_array(
+            text,
+            language=language,
+            voice=voice_manager.get_voice_file(voice),
+            speed=speed,
+            temperature=temperature,
+            top_k=top_k,
+            top_p=top_p
+        )
+
+def _do_synthesis(text, language, voice, speed, temperature, top_k, top_p, length_scale, gpt_cond_len, engine=None, use_cache=None, latency_budget_ms=None, timer=None):
     """
     Helper function to perform TTS synthesis (runs in thread pool to avoid blocking)
     Includes robust CUDA error handling with automatic fallback to CPU
-    Supports multiple engines (XTTS v2, StyleTTS2, etc)
+    Dispatches to the requested engine (XTTS v2, StyleTTS2, etc); engine="auto"
+    lets the router pick one within latency_budget_ms.
+    
+    The result is stored in the output cache unless use_cache is False (None
+    follows OUTPUT_CACHE_CONFIG["enabled"]); callers look repeats up with
+    _lookup_output_cache before queueing this job.
+    
+    timer (StageTimer) receives the per-stage breakdown; its "queue" stage,
+    begun by the endpoint, ends when the executor starts this job.
+    """
+    with activate(timer):
+        end_stage("queue")
+        return _synthesize_with_retries(
+            text, language, voice, speed, temperature, top_k, top_p, length_scale, gpt_cond_len,
+            engine, use_cache, latency_budget_ms
+        )
+
+def _output_cache_key(engine, reference, language, text, speed, temperature, top_k, top_p, length_scale, gpt_cond_len):
     """
+    Output cache key: reference content (not voice name), sampling parameters and
+    the model options/conditioning config, so a reload to INT8/bf16 misses.
+    """
+    model_options = _model_options()
+    return make_cache_key(
+        engine, reference.content_hash, language, text,
+        speed=speed, temperature=temperature, top_k=top_k, top_p=top_p,
+        length_scale=length_scale, gpt_cond_len=gpt_cond_len,
+        gpt_cond_chunk_len=SYNTHESIS_CONFIG["gpt_cond_chunk_len"],
+        max_ref_len=SYNTHESIS_CONFIG["max_ref_len"],
+        int8=model_options["int8"],
+        precision=model_options["precision"],
+        compile=model_options["compile"]
+    )
+
+def _lookup_output_cache(text, language, voice, speed, temperature, top_k, top_p, length_scale, gpt_cond_len, engine, use_cache=None, timer=None):
+    """
+    Output cache lookup on the request path, before the job is queued on the
+    engine executor, so repeats never wait behind (or get a 503 from) syntheses.
+    
+    Returns:
+        Cached AudioResult, or None (cache off, voice not resolvable, miss).
+        Voice errors are left to _do_synthesis to report.
+    """
+    if not output_cache.is_enabled(use_cache) or not voice_manager:
+        return None
+    with activate(timer):
+        with stage("cache"):
+            try:
+                reference = voice_manager.get_reference(voice, XTTS_REFERENCE_SR)
+            except Exception:
+                return None
+            if reference is None:
+                return None
+            cache_key = _output_cache_key(
+                engine, reference, language, text,
+                speed, temperature, top_k, top_p, length_scale, gpt_cond_len
+            )
+            cached = output_cache.get(cache_key, SAMPLE_RATE)
+    if cached is not None:
+        voice_manager.record_use(voice)
+        print(f"⚡ Output cache hit: '{text[:50]}...' with voice '{voice}'")
+    return cached
+
+def _synthesize_with_retries(text, language, voice, speed, temperature, top_k, top_p, length_scale, gpt_cond_len, engine=None, use_cache=None, latency_budget_ms=None):
+    """Body of _do_synthesis: routing, engine stage, post-processing, output cache store and CUDA retries."""
     if engine is None:
         engine = DEFAULT_ENGINE
+    engine = _route_engine(engine, text, language, latency_budget_ms)
     
     retry_count = 0
     max_retries = 2
@@ -1057,93 +1636,83 @@ def _do_synthesis(text, language, voice, speed, temperature, top_k, top_p, lengt
     
     while retry_count < max_retries:
         try:
-            # Get the active engine instance
-            active_engine = get_active_engine(engine)
-            if not active_engine:
-                raise RuntimeError(f"Failed to load engine: {engine}")
-            
-            # Check if TTS model is loaded (for backward compatibility)
-            if not tts_model:
-                raise RuntimeError("TTS model not loaded!")
-            
             if not voice_manager:
                 raise RuntimeError("Voice manager not initialized!")
             
-            # Get voice speaker embedding
-            speaker_wav = voice_manager.get_voice_file(voice)
-            if not speaker_wav:
-                raise RuntimeError(f"Voice '{voice}' not found")
-            
-            # Validate speaker WAV file to prevent CUDA device-side asserts
-            print(f"🎤 Validating speaker WAV: {speaker_wav}")
+            # Get normalized reference (sanitized/resampled once at ingest, memory-mapped here)
             try:
-                normalized_wav = normalize_audio_file(speaker_wav, target_sr=22050)
-                speaker_wav = normalized_wav
-                print(f"✅ Speaker WAV validated and normalized: {speaker_wav}")
-                
-                # Pre-load and sanitize speaker audio buffer
-                sr_speaker, speaker_data = wavfile.read(speaker_wav)
-                speaker_data = speaker_data.astype(np.float32) / np.iinfo(speaker_data.dtype).max if speaker_data.dtype != np.float32 else speaker_data
-                speaker_data = np.clip(speaker_data, -1.0, 1.0)
-                speaker_data = np.nan_to_num(speaker_data, nan=0.0, posinf=1.0, neginf=-1.0)
-                print(f"✅ Speaker audio buffer sanitized: range [{speaker_data.min():.4f}, {speaker_data.max():.4f}]")
-                
+                with stage("voice"):
+                    reference = voice_manager.get_reference(voice, XTTS_REFERENCE_SR)
             except Exception as validate_error:
-                print(f"⚠️ Speaker WAV validation failed: {validate_error}")
+                print(f"⚠️ Speaker reference preparation failed: {validate_error}")
                 raise RuntimeError(f"Invalid speaker voice file: {validate_error}")
+            if reference is None:
+                raise RuntimeError(f"Voice '{voice}' not found")
+            voice_manager.record_use(voice)
             
-            # Synthesize
-            print(f"🎤 Synthesizing: '{text[:50]}...' with voice '{voice}' in {language}")
-            
-            # Generate audio using TTS v0.22+ API with inference parameters
-            wav = tts_model.tts(  # type: ignore
-                text=text,
-                speaker_wav=speaker_wav,
-                language=language,
-                temperature=temperature,
-                top_k=top_k,
-                top_p=top_p
-            )
-            
-            # Sanitize generated audio buffer to prevent CUDA asserts
-            if isinstance(wav, torch.Tensor):
-                wav = wav.cpu()  # Move to CPU for sanitization
-                wav_np = wav.numpy()
-            else:
-                wav_np = np.asarray(wav)
+            # Stored for repeats (looked up by _lookup_output_cache before queueing)
+            cache_key = None
+            if output_cache.is_enabled(use_cache):
+                cache_key = _output_cache_key(
+                    engine, reference, language, text,
+                    speed, temperature, top_k, top_p, length_scale, gpt_cond_len
+                )
             
-            # Remove NaN, Inf, and clamp to valid range
-            wav_np = np.nan_to_num(wav_np, nan=0.0, posinf=1.0, neginf=-1.0)
-            wav_np = np.clip(wav_np, -1.0, 1.0)
-            print(f"✅ Generated audio sanitized: range [{wav_np.min():.4f}, {wav_np.max():.4f}], shape {wav_np.shape}")
+            # Synthesize
+            print(f"🎤 Synthesizing: '{text[:50]}...' with voice '{voice}' in {language} ({engine})")
             
-            # Convert back to tensor (keep on CPU)
-            wav = torch.from_numpy(wav_np).float()
+            # speed > 1 is faster, length_scale > 1 is longer: one combined factor,
+            # applied by the model when it can and by resampling otherwise
+            speed_factor = speed / length_scale
+            model_speed = speed_factor if _native_speed(engine) else 1.0
             
-            # Apply length scale adjustment if needed (affects phoneme duration)
-            if length_scale != 1.0:
-                print(f"⏱️ Adjusting length scale to {length_scale}x")
-                wav = apply_speed_adjustment(wav, 1.0 / length_scale)
+            # Lease keeps the engine resident (no idle unload / eviction) while synthesizing
+            # (with the worker pool enabled the engine stage runs in a worker process)
+            with engine_router.track(engine):
+                synth_start = time.perf_counter()
+                if _pool_serves(engine):
+                    with stage("pool"):
+                        wav, engine_sample_rate, worker_timings = inference_pool.submit({
+                            "kind": "synthesis", "text": text, "language": language, "voice": voice,
+                            "temperature": temperature, "top_k": top_k, "top_p": top_p,
+                            "gpt_cond_len": gpt_cond_len,
+                            "gpt_cond_chunk_len": SYNTHESIS_CONFIG["gpt_cond_chunk_len"],
+                            "max_ref_len": SYNTHESIS_CONFIG["max_ref_len"],
+                            "sample_rate": SAMPLE_RATE,
+                            "speed": model_speed
+                        }).result()
+                    # Worker stages count as themselves; "pool" keeps only the IPC overhead
+                    merge_stages(worker_timings, within="pool")
+                else:
+                    with engine_manager.lease(engine) as active_engine:
+                        wav, engine_sample_rate = _synthesize_with_engine(
+                            active_engine, engine, text, language, voice, reference,
+                            temperature, top_k, top_p, gpt_cond_len, model_speed
+                        )
+                wav = np.asarray(wav, dtype=np.float32).reshape(-1)
+                engine_router.record(
+                    engine, time.perf_counter() - synth_start, wav.shape[0] / engine_sample_rate
+                )
             
-            # Apply speed adjustment if needed (speed != 1.0)
-            if speed != 1.0:
-                print(f"⏱️ Adjusting speed to {speed}x")
-                wav = apply_speed_adjustment(wav, speed)
+            # One pass: sanitize + engine rate -> SAMPLE_RATE (+ resampled speed fallback)
+            # (everything downstream - streaming headers, OBS, cache - runs at SAMPLE_RATE)
+            resample_speed = speed_factor / model_speed
+            if resample_speed != 1.0:
+                print(f"⏱️ Adjusting speed to {speed}x, length scale {length_scale}x by resampling ({engine} has no native speed)")
+            with stage("post"):
+                wav = postprocess(wav, engine_sample_rate, SAMPLE_RATE, resample_speed)
             
-            # Ensure tensor is on CPU before saving
-            if isinstance(wav, torch.Tensor):
-                wav = wav.cpu().detach()
+            # Encode once in memory (shared by the HTTP response and OBS broadcast)
+            with stage("encode"):
+                result = AudioResult(wav, SAMPLE_RATE)
+                result.wav_bytes
             
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-            if isinstance(wav, torch.Tensor):
-                torchaudio.save(temp_file.name, wav.unsqueeze(0) if wav.dim() == 1 else wav, SAMPLE_RATE)
-            else:
-                torchaudio.save(temp_file.name, torch.tensor(wav).unsqueeze(0), SAMPLE_RATE)
+            if cache_key is not None:
+                output_cache.put(cache_key, result)
             
-            print(f"✅ Synthesis complete: {len(wav) if isinstance(wav, (list, torch.Tensor)) else 'variable'} samples")
+            print(f"✅ Synthesis complete: {result.num_samples} samples ({result.duration:.2f}s)")
             
-            return temp_file.name
+            return result
         
         except RuntimeError as e:
             error_str = str(e)
@@ -1198,8 +1767,45 @@ def _do_synthesis(text, language, voice, speed, temperature, top_k, top_p, lengt
             traceback.print_exc()
             raise
 
+def _validate_synthesis_params(text, language, speed, temperature, top_k, top_p, length_scale, gpt_cond_len, engine=None):
+    """
+    Validate text/language and clamp synthesis parameters to their valid ranges.
+    
+    Shared by /v1/synthesize and /v1/synthesize/stream.
+    
+    Returns:
+        Dict with the clamped parameters
+    
+    Raises:
+        HTTPException: 400 on invalid text or language
+    """
+    if not text or len(text.strip()) == 0:
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
+    
+    if len(text) > 1000:
+        raise HTTPException(status_code=400, detail="Text exceeds maximum length of 1000 characters")
+    
+    if language not in LANGUAGE_SUPPORT:
+        raise HTTPException(status_code=400, detail=f"Language '{language}' not supported")
+    
+    if engine is not None and engine != AUTO_ENGINE and engine not in ENGINES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown engine: {engine}. Available: {list(ENGINES.keys()) + [AUTO_ENGINE]}"
+        )
+    
+    return {
+        "speed": max(0.5, min(2.0, speed)),
+        "temperature": max(0.1, min(1.0, temperature)),
+        "top_k": max(0, min(100, top_k)),
+        "top_p": max(0.0, min(1.0, top_p)),
+        "length_scale": max(0.5, min(2.0, length_scale)),
+        "gpt_cond_len": max(3.0, min(30.0, gpt_cond_len))  # 3-30 seconds
+    }
+
 @app.post("/v1/synthesize")
 async def synthesize_tts(
+    request: Request,
     text: str = Form(...),
     language: str = Form("pt"),
     voice: str = Form("default"),
@@ -1209,7 +1815,11 @@ async def synthesize_tts(
     top_p: float = Form(0.85),
     length_scale: float = Form(1.0),
     gpt_cond_len: float = Form(12.0),
-    engine: str = Form(DEFAULT_ENGINE)
+    engine: str = Form(DEFAULT_ENGINE),
+    cache: Optional[bool] = Form(None),
+    latency_budget_ms: Optional[float] = Form(None),
+    format: Optional[str] = Form(None),
+    sample_rate: Optional[int] = Form(None)
 ):
     """
     Synthesize speech from text using specified voice and language.
@@ -1225,10 +1835,16 @@ async def synthesize_tts(
         top_p: Cumulative probability (0.0 to 1.0)
         length_scale: Phoneme duration multiplier (0.5 to 2.0)
         gpt_cond_len: GPT conditioning length in seconds (3 to 30, default 12)
-        engine: TTS engine to use ('xtts-v2' or 'stylets2'), default from DEFAULT_ENGINE
+        engine: TTS engine to use ('xtts-v2', 'stylets2' or 'auto'), default from DEFAULT_ENGINE
+        latency_budget_ms: With engine='auto', target latency used to pick the engine
+        cache: Use the output cache (true/false); omitted follows the server default.
+               Pass false for intentionally varied output at high temperature.
+        format: Output format ('wav', 'flac', 'opus', 'mp3'); omitted follows the
+                Accept header, then WAV
+        sample_rate: Output sample rate (8000 to 48000); omitted keeps 24000
     
     Returns:
-        WAV audio file
+        Audio file in the negotiated format
     """
     print(f"\n🎤 POST /v1/synthesize called")
     print(f"   text={text[:50]}..., language={language}, voice={voice}")
@@ -1238,129 +1854,281 @@ async def synthesize_tts(
     if tts_model:
         print(f"   tts_model={type(tts_model).__name__}, voice_manager={type(voice_manager).__name__}")
     
+    timer = StageTimer()
     try:
-        # Validate inputs
-        if not text or len(text.strip()) == 0:
-            raise HTTPException(status_code=400, detail="Text cannot be empty")
-        
-        if len(text) > 1000:
-            raise HTTPException(status_code=400, detail="Text exceeds maximum length of 1000 characters")
-        
-        if language not in LANGUAGE_SUPPORT:
-            raise HTTPException(status_code=400, detail=f"Language '{language}' not supported")
-        
-        # Validate and clamp synthesis parameters
-        speed = max(0.5, min(2.0, speed))
-        temperature = max(0.1, min(1.0, temperature))
-        top_k = max(0, min(100, top_k))
-        top_p = max(0.0, min(1.0, top_p))
-        length_scale = max(0.5, min(2.0, length_scale))
-        gpt_cond_len = max(3.0, min(30.0, gpt_cond_len))  # 3-30 seconds
-        
-        # Run synthesis in thread pool to avoid blocking
-        temp_file_path = await run_in_threadpool(
-            _do_synthesis,
-            text,
-            language,
-            voice,
-            speed,
-            temperature,
-            top_k,
-            top_p,
-            length_scale,
-            gpt_cond_len,
-            engine
+        params = _validate_synthesis_params(
+            text, language, speed, temperature, top_k, top_p, length_scale, gpt_cond_len, engine
+        )
+        output_format = _negotiate_output(request, format, sample_rate)
+        
+        # Resolve engine=auto here so the request queues on the engine that serves it
+        engine = _route_engine(engine or DEFAULT_ENGINE, text, language, latency_budget_ms)
+        
+        # Repeats are answered here; only misses take an executor slot
+        result = await run_in_threadpool(
+            _lookup_output_cache,
+            text, language, voice,
+            params["speed"], params["temperature"], params["top_k"], params["top_p"],
+            params["length_scale"], params["gpt_cond_len"],
+            engine, cache, timer
         )
         
-        # Enviar áudio para OBS se houver conexões
-        if obs_connections:
-            with open(temp_file_path, 'rb') as f:
-                audio_data = f.read()
-            await broadcast_audio_to_obs(audio_data)
+        # Run synthesis on the engine's bounded executor
+        if result is None:
+            timer.begin("queue")
+            result = await inference_executors.get(engine).run(
+                _do_synthesis,
+                text,
+                language,
+                voice,
+                params["speed"],
+                params["temperature"],
+                params["top_k"],
+                params["top_p"],
+                params["length_scale"],
+                params["gpt_cond_len"],
+                engine,
+                cache,
+                latency_budget_ms,
+                timer
+            )
         
-        return FileResponse(
-            path=temp_file_path,
-            media_type="audio/wav",
-            filename=f"output_{voice}_{int(time.time())}.wav"
-        )
+        # Enviar áudio para OBS se houver conexões (mesmo buffer da resposta)
+        if obs_hub:
+            with timer.stage("obs"):
+                await broadcast_audio_to_obs(result)
+        
+        with timer.stage("encode"):
+            response = await _audio_response(result, output_format, f"output_{voice}_{int(time.time())}")
+        _finish_timing(response, timer, "synthesize", engine, result)
+        return response
     
     except HTTPException:
         raise
+    except ExecutorBusy as e:
+        raise _busy_error(e)
     except Exception as e:
         print(f"❌ Synthesis error: {str(e)}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Synthesis failed: {str(e)}")
 
+@app.post("/v1/synthesize/stream")
+async def synthesize_tts_stream(
+    text: str = Form(...),
+    language: str = Form("pt"),
+    voice: str = Form("default"),
+    speed: float = Form(1.0),
+    temperature: float = Form(0.75),
+    top_k: int = Form(50),
+    top_p: float = Form(0.85),
+    length_scale: float = Form(1.0),
+    gpt_cond_len: float = Form(12.0),
+    engine: str = Form(DEFAULT_ENGINE),
+    format: str = Form("wav"),
+    cache: Optional[bool] = Form(None),
+    latency_budget_ms: Optional[float] = Form(None)
+):
+    """
+    Synthesize speech sentence by sentence and stream audio as it is produced.
+    
+    The text is split into sentences; each one is synthesized and written to
+    the response immediately, so playback can start after the first sentence.
+    The next sentence is synthesized while the current one is being sent.
+    
+    Args:
+        Same as /v1/synthesize, plus:
+        format: 'wav' (streaming WAV header + PCM) or 'pcm' (raw s16le mono)
+        cache: Use the output cache per sentence (true/false/omitted)
+    
+    Returns:
+        Chunked audio stream (sample rate in the X-Sample-Rate header)
+    """
+    print(f"\n🎤 POST /v1/synthesize/stream called")
+    print(f"   text={text[:50]}..., language={language}, voice={voice}, engine={engine}, format={format}")
+    
+    params = _validate_synthesis_params(
+        text, language, speed, temperature, top_k, top_p, length_scale, gpt_cond_len, engine
+    )
+    
+    format = format.lower()
+    if format not in ("wav", "pcm"):
+        raise HTTPException(status_code=400, detail="format must be 'wav' or 'pcm'")
+    
+    if not voice_manager or not voice_manager.get_voice_metadata(voice):
+        raise HTTPException(status_code=404, detail=f"Voice '{voice}' not found")
+    
+    segments = split_sentences(text)
+    print(f"   📝 {len(segments)} segment(s)")
+    
+    # Resolve engine=auto once so every sentence uses the same voice timbre
+    engine = _route_engine(engine, text, language, latency_budget_ms)
+    
+    def synthesize_segment(segment: str, wait: bool = False):
+        cached = _lookup_output_cache(
+            segment, language, voice,
+            params["speed"], params["temperature"], params["top_k"], params["top_p"],
+            params["length_scale"], params["gpt_cond_len"],
+            engine, cache
+        )
+        if cached is not None:
+            done = Future()
+            done.set_result(cached)
+            return done
+        return inference_executors.get(engine).submit(
+            _do_synthesis,
+            segment,
+            language,
+            voice,
+            params["speed"],
+            params["temperature"],
+            params["top_k"],
+            params["top_p"],
+            params["length_scale"],
+            params["gpt_cond_len"],
+            engine,
+            cache,
+            latency_budget_ms,
+            wait=wait
+        )
+    
+    async def next_segment(segment: str):
+        try:
+            future = await run_in_threadpool(synthesize_segment, segment)
+        except ExecutorBusy:
+            # A stream that already started waits for room instead of failing mid-way
+            future = await run_in_threadpool(synthesize_segment, segment, True)
+        return await asyncio.wrap_future(future)
+    
+    # Queue the first sentence now so a full queue is still a clean 503
+    start_time = time.time()
+    try:
+        first = await run_in_threadpool(synthesize_segment, segments[0])
+    except ExecutorBusy as e:
+        raise _busy_error(e)
+    
+    async def audio_stream():
+        results = []
+        obs_stream_id = None
+        first_audio_seconds = None
+        pending = asyncio.wrap_future(first)
+        try:
+            if format == "wav":
+                yield wav_header(SAMPLE_RATE, None)
+            
+            for index in range(len(segments)):
+                result = await pending
+                
+                # Start the next sentence before sending this one
+                if index + 1 < len(segments):
+                    pending = asyncio.ensure_future(next_segment(segments[index + 1]))
+                
+                if index == 0:
+                    first_audio_seconds = time.time() - start_time
+                    print(f"   ⚡ First audio after {first_audio_seconds:.2f}s")
+                    obs_stream_id = await obs_hub.start_stream(SAMPLE_RATE)
+                
+                results.append(result)
+                yield bytes(result.pcm_view)
+                
+                # Binary OBS clients play along with the HTTP client
+                await obs_hub.send_chunks(result.pcm_view)
+            
+            print(f"   ✅ Stream complete: {len(segments)} segment(s) in {time.time() - start_time:.2f}s")
+            server_metrics.observe_request(
+                "synthesize/stream", engine or DEFAULT_ENGINE, time.time() - start_time,
+                sum(r.duration for r in results), first_audio_seconds
+            )
+            
+            await obs_hub.end_stream(obs_stream_id, sum(r.num_samples for r in results))
+            obs_stream_id = None
+            
+            # JSON clients and non-PCM binary clients need the full message as one file
+            if results:
+                full_audio = AudioResult(np.concatenate([r.samples for r in results]), SAMPLE_RATE)
+                await obs_hub.send_complete(full_audio)
+        
+        except Exception as e:
+            # Headers are already sent; the only option is to end the stream
+            print(f"❌ Streaming synthesis error: {str(e)}")
+            traceback.print_exc()
+            await obs_hub.end_stream(obs_stream_id, sum(r.num_samples for r in results))
+        
+        finally:
+            if not pending.done():
+                pending.cancel()
+    
+    media_type = "audio/wav" if format == "wav" else f"audio/L16;rate={SAMPLE_RATE};channels=1"
+    return StreamingResponse(
+        audio_stream(),
+        media_type=media_type,
+        headers={
+            "X-Sample-Rate": str(SAMPLE_RATE),
+            "X-Audio-Format": "pcm_s16le" if format == "pcm" else "wav",
+            "X-Segments": str(len(segments)),
+            "Cache-Control": "no-cache"
+        }
+    )
+
 # ============================================================================
 # VOICE CLONING ENDPOINTS
 # ============================================================================
 
-def _do_voice_cloning(text, language, speaker_wav_files, speed, temperature, top_k, top_p, length_scale, gpt_cond_len):
+def _do_voice_cloning(text, language, speaker_wav_contents, speed, temperature, top_k, top_p, length_scale, gpt_cond_len, timer=None):
     """
     Helper function to perform voice cloning (runs in thread pool to avoid blocking)
     Includes robust CUDA error handling with automatic recovery
+    
+    timer (StageTimer) receives the per-stage breakdown, as in _do_synthesis.
     """
-    normalized_wavs = []
+    with activate(timer):
+        end_stage("queue")
+        return _clone_with_retries(
+            text, language, speaker_wav_contents, speed, temperature, top_k, top_p, length_scale, gpt_cond_len
+        )
+
+def _clone_with_retries(text, language, speaker_wav_contents, speed, temperature, top_k, top_p, length_scale, gpt_cond_len):
+    """Body of _do_voice_cloning: engine stage, post-processing and CUDA retries."""
     retry_count = 0
     max_retries = 2
     last_error = None
+    job = {
+        "kind": "clone", "text": text, "language": language,
+        "speaker_wav_contents": speaker_wav_contents,
+        "temperature": temperature, "top_k": top_k, "top_p": top_p,
+        "gpt_cond_len": gpt_cond_len,
+        "gpt_cond_chunk_len": SYNTHESIS_CONFIG["gpt_cond_chunk_len"],
+        "max_ref_len": SYNTHESIS_CONFIG["max_ref_len"],
+        "sample_rate": SAMPLE_RATE,
+        # XTTS applies speed/length scale to its latents (no resampling)
+        "speed": speed / length_scale
+    }
     
     while retry_count < max_retries:
         try:
-            # Normalize and validate all speaker files
-            for speaker_file in speaker_wav_files:
-                try:
-                    normalized_wav = normalize_audio_file(speaker_file)
-                except Exception as e:
-                    print(f"   ⚠️ Normalization error: {str(e)}")
-                    normalized_wav = speaker_file
-                
-                # Validate WAV file
-                try:
-                    wav_data, sr = torchaudio.load(normalized_wav)
-                    if wav_data.shape[0] == 0 or wav_data.shape[1] == 0:
-                        raise ValueError("Invalid WAV file")
-                except Exception as e:
-                    raise RuntimeError(f"Invalid WAV file: {str(e)}")
-                
-                normalized_wavs.append(normalized_wav)
+            print(f"🎤 Voice cloning: '{text[:50]}...' in {language} with {len(speaker_wav_contents)} reference(s)")
             
-            # Compute embedding
-            print(f"🎤 Voice cloning: '{text[:50]}...' in {language} with {len(normalized_wavs)} reference(s)")
-            
-            # Synthesize using TTS v0.22+ API with inference parameters
-            # XTTS v2 accepts speaker_wav as list for multiple references
-            speaker_wav_input = normalized_wavs if len(normalized_wavs) > 1 else normalized_wavs[0]
-            
-            wav = tts_model.tts(  # type: ignore
-                text=text,
-                speaker_wav=speaker_wav_input,
-                language=language,
-                temperature=temperature,
-                top_k=top_k,
-                top_p=top_p
-            )
-            
-            # Apply length scale adjustment if needed (affects phoneme duration)
-            if length_scale != 1.0:
-                print(f"⏱️ Adjusting length scale to {length_scale}x")
-                wav = apply_speed_adjustment(wav, 1.0 / length_scale)
+            # Decode references, compute latents and generate (worker process when the pool serves XTTS)
+            if _pool_serves(DEFAULT_ENGINE):
+                with stage("pool"):
+                    wav, _, worker_timings = inference_pool.submit(job).result()
+                merge_stages(worker_timings, within="pool")
+            else:
+                # Lease keeps the engine resident (no reload drain / eviction) while cloning
+                with engine_manager.lease(DEFAULT_ENGINE) as active_engine:
+                    wav, _ = run_clone_job(job, active_engine)
             
-            # Apply speed adjustment if needed (speed != 1.0)
-            if speed != 1.0:
-                print(f"⏱️ Adjusting speed to {speed}x")
-                wav = apply_speed_adjustment(wav, speed)
+            # One pass: sanitize
+            with stage("post"):
+                wav = postprocess(wav, SAMPLE_RATE, SAMPLE_RATE)
             
-            # Save to temporary output file
-            temp_output_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-            if isinstance(wav, torch.Tensor):
-                torchaudio.save(temp_output_file.name, wav.unsqueeze(0) if wav.dim() == 1 else wav, SAMPLE_RATE)
-            else:
-                torchaudio.save(temp_output_file.name, torch.tensor(wav).unsqueeze(0), SAMPLE_RATE)
+            # Encode once in memory
+            with stage("encode"):
+                result = AudioResult(wav, SAMPLE_RATE)
+                result.wav_bytes
             
-            print(f"✅ Voice cloning complete: {len(wav) if isinstance(wav, (list, torch.Tensor)) else 'variable'} samples")
+            print(f"✅ Voice cloning complete: {result.num_samples} samples ({result.duration:.2f}s)")
             
-            return temp_output_file.name
+            return result
         
         except RuntimeError as e:
             error_str = str(e)
@@ -1379,7 +2147,6 @@ def _do_voice_cloning(text, language, speaker_wav_files, speed, temperature, top
                             torch.cuda.reset_peak_memory_stats()
                             torch.cuda.synchronize()
                             print("✅ CUDA cache cleared, retrying...")
-                            normalized_wavs = []  # Reset for retry
                             time.sleep(1)
                             continue
                     except Exception as recovery_error:
@@ -1400,6 +2167,7 @@ def _do_voice_cloning(text, language, speaker_wav_files, speed, temperature, top
 
 @app.post("/v1/clone-voice")
 async def clone_voice(
+    request: Request,
     text: str = Form(...),
     language: str = Form("pt"),
     speaker_wav: UploadFile = File(None),
@@ -1409,7 +2177,9 @@ async def clone_voice(
     top_k: int = Form(50),
     top_p: float = Form(0.85),
     length_scale: float = Form(1.0),
-    gpt_cond_len: float = Form(12.0)
+    gpt_cond_len: float = Form(12.0),
+    format: Optional[str] = Form(None),
+    sample_rate: Optional[int] = Form(None)
 ):
     """
     Clone a voice and synthesize speech in one step.
@@ -1426,16 +2196,16 @@ async def clone_voice(
         top_p: Cumulative probability (0.0 to 1.0)
         length_scale: Phoneme duration multiplier (0.5 to 2.0)
         gpt_cond_len: GPT conditioning length in seconds (3 to 30, default 12)
+        format: Output format ('wav', 'flac', 'opus', 'mp3'); omitted follows the
+                Accept header, then WAV
+        sample_rate: Output sample rate (8000 to 48000); omitted keeps 24000
     
     Returns:
-        WAV audio file with cloned voice
+        Audio file with cloned voice in the negotiated format
     """
-    temp_speaker_files = []
-    temp_output_file = None
-    
     try:
         # Check if TTS model is initialized
-        if not tts_model:
+        if not _xtts_ready():
             raise HTTPException(status_code=503, detail="TTS model not loaded. Server not ready.")
         
         # Validate inputs
@@ -1448,6 +2218,9 @@ async def clone_voice(
         if language not in LANGUAGE_SUPPORT:
             raise HTTPException(status_code=400, detail=f"Language '{language}' not supported")
         
+        output_format = _negotiate_output(request, format, sample_rate)
+        timer = StageTimer()
+        
         # Validate and clamp synthesis parameters
         speed = max(0.5, min(2.0, speed))
         temperature = max(0.1, min(1.0, temperature))
@@ -1457,7 +2230,8 @@ async def clone_voice(
         gpt_cond_len = max(3.0, min(30.0, gpt_cond_len))  # 3-30 seconds
         
         # Handle multiple speaker references (XTTS v2 supports list of WAV files)
-        speaker_wav_files = []
+        # References stay in memory; they are decoded directly from the upload bytes
+        speaker_wav_contents = []
         
         # Check for multiple files (speaker_wavs) - preferred method
         if speaker_wavs:
@@ -1483,74 +2257,55 @@ async def clone_voice(
                 if total_size > 150:
                     raise HTTPException(status_code=400, detail="Total speaker files exceed 150MB limit")
                 
-                await wav_file.seek(0)
-                
-                # Save temporary file
-                temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-                temp_file.write(file_content)
-                temp_file.close()
-                speaker_wav_files.append(temp_file.name)
-                temp_speaker_files.append(temp_file.name)
+                speaker_wav_contents.append(file_content)
             
-            print(f"📚 Using {len(speaker_wav_files)} reference files for voice cloning")
+            print(f"📚 Using {len(speaker_wav_contents)} reference files for voice cloning")
         
         # Fallback to single file (backward compatibility)
         elif speaker_wav:
             if not speaker_wav.filename or not speaker_wav.filename.lower().endswith('.wav'):
                 raise HTTPException(status_code=400, detail="Only WAV files supported")
             
-            file_size = len(await speaker_wav.read()) / (1024 * 1024)
-            await speaker_wav.seek(0)
+            content = await speaker_wav.read()
+            file_size = len(content) / (1024 * 1024)
             
             if file_size > 50:
                 raise HTTPException(status_code=400, detail="Speaker WAV file exceeds 50MB limit")
             
-            # Save temporary speaker file
-            temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-            content = await speaker_wav.read()
-            temp_file.write(content)
-            temp_file.close()
-            speaker_wav_files.append(temp_file.name)
-            temp_speaker_files.append(temp_file.name)
+            speaker_wav_contents.append(content)
         
         else:
             raise HTTPException(status_code=400, detail="No speaker reference file provided")
         
-        # Run voice cloning in thread pool to avoid blocking
-        temp_file_path = await run_in_threadpool(
+        # Run voice cloning on the XTTS executor (shares the model with /v1/synthesize)
+        timer.begin("queue")
+        result = await inference_executors.get(DEFAULT_ENGINE).run(
             _do_voice_cloning,
             text,
             language,
-            speaker_wav_files,
+            speaker_wav_contents,
             speed,
             temperature,
             top_k,
             top_p,
             length_scale,
-            gpt_cond_len
+            gpt_cond_len,
+            timer
         )
         
-        return FileResponse(
-            path=temp_file_path,
-            media_type="audio/wav",
-            filename=f"cloned_{int(time.time())}.wav"
-        )
+        with timer.stage("encode"):
+            response = await _audio_response(result, output_format, f"cloned_{int(time.time())}")
+        _finish_timing(response, timer, "clone-voice", DEFAULT_ENGINE, result)
+        return response
     
     except HTTPException:
         raise
+    except ExecutorBusy as e:
+        raise _busy_error(e)
     except Exception as e:
         print(f"❌ Voice cloning error: {str(e)}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Voice cloning failed: {str(e)}")
-    
-    finally:
-        # Cleanup temporary speaker files
-        for temp_file in temp_speaker_files:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
 
 # ============================================================================
 # VOICE MANAGEMENT ENDPOINTS
@@ -1573,7 +2328,8 @@ async def upload_voice(
     Returns:
         Voice metadata
     """
-    temp_file = None
+    spooled_path = None
+    normalized_path = None
     
     try:
         # Check if voice manager is initialized
@@ -1599,22 +2355,20 @@ async def upload_voice(
             raise HTTPException(status_code=400, detail="File exceeds 50MB limit")
         
         # Validate WAV content (BUG FIX #5: WAV validation)
-        temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+        # The voice library copies from a path, so the upload goes through the bounded spool
         content = await wav_file.read()
-        temp_file.write(content)
-        temp_file.close()
+        spooled_path = audio_spool.write(content, suffix=".wav")
         
-        # Normalize audio for XTTS
+        # Normalize audio for XTTS (in memory; the result is a spool file of its own)
         try:
-            normalized_path = normalize_audio_file(temp_file.name)
+            normalized = load_normalized_audio(io.BytesIO(content), XTTS_REFERENCE_SR)
+            normalized_path = audio_spool.write(encode_wav(normalized, XTTS_REFERENCE_SR), suffix=".wav")
         except Exception as e:
             print(f"   ⚠️ Normalization error: {str(e)}")
-            normalized_path = temp_file.name
+            normalized_path = spooled_path
         
         try:
-            wav, sr = torchaudio.load(normalized_path)
-            if wav.shape[0] == 0 or wav.shape[1] == 0:
-                raise ValueError("Invalid WAV file")
+            decode_audio(normalized_path)  # Raises on empty/undecodable files
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid WAV file: {str(e)}")
         
@@ -1645,20 +2399,9 @@ async def upload_voice(
     
     finally:
         # Cleanup (BUG FIX #4: try/finally for cleanup)
-        if temp_file and os.path.exists(temp_file.name):
-            try:
-                os.unlink(temp_file.name)
-            except:
-                pass
-        
-        # Cleanup normalized file if it was created
-        if temp_file and 'normalized_path' in locals() and normalized_path != temp_file.name:
-            try:
-                normalized_file = normalized_path.replace('.wav', '_normalized.wav')
-                if os.path.exists(normalized_file):
-                    os.unlink(normalized_file)
-            except:
-                pass
+        audio_spool.release(spooled_path)
+        if normalized_path != spooled_path:
+            audio_spool.release(normalized_path)
 
 
 @app.get("/v1/voices")
@@ -1723,33 +2466,54 @@ async def delete_voice(voice_id: str):
 # BATCH & ADVANCED ENDPOINTS
 # ============================================================================
 
-def _do_batch_synthesis(texts, language, voice_id, voice_manager, tts_model):
+def _do_batch_synthesis(texts, language, voice_id, use_cache=None):
     """
     Helper function to perform batch synthesis (runs in thread pool to avoid blocking)
+    Uses the same path as /v1/synthesize, so repeated texts hit the output cache.
+    With batch_processing enabled the texts are submitted concurrently so the
+    micro-batcher can group them.
     """
-    results = []
-    for i, text in enumerate(texts):
+    executor = inference_executors.get(DEFAULT_ENGINE)
+    
+    def synthesize_one(i, text):
         try:
-            speaker_wav = voice_manager.get_voice_file(voice_id)
-            if not speaker_wav:
-                raise RuntimeError(f"Voice '{voice_id}' not found")
-            
-            wav = tts_model.tts(text=text, speaker_wav=speaker_wav, language=language)  # type: ignore
-            results.append({
+            result = _lookup_output_cache(
+                text, language, voice_id,
+                1.0, 0.75, 50, 0.85, 1.0,
+                SYNTHESIS_CONFIG["gpt_cond_len"],
+                DEFAULT_ENGINE,
+                use_cache
+            )
+            # Batch items wait for room in the queue instead of being rejected
+            if result is None:
+                result = executor.call(
+                    _do_synthesis,
+                    text, language, voice_id,
+                    1.0, 0.75, 50, 0.85, 1.0,
+                    SYNTHESIS_CONFIG["gpt_cond_len"],
+                    DEFAULT_ENGINE,
+                    use_cache
+                )
+            return {
                 "index": i,
                 "text": text,
-                "duration": len(wav) / SAMPLE_RATE,
+                "duration": result.duration,
                 "status": "success"
-            })
+            }
         except Exception as e:
-            results.append({
+            return {
                 "index": i,
                 "text": text,
                 "error": str(e),
                 "status": "failed"
-            })
+            }
     
-    return results
+    if GPU_OPTIMIZATIONS["batch_processing"] and micro_batcher is not None:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=micro_batcher.max_batch_size()) as pool:
+            return list(pool.map(synthesize_one, range(len(texts)), texts))
+    
+    return [synthesize_one(i, text) for i, text in enumerate(texts)]
 
 @app.post("/v1/batch-synthesize")
 async def batch_synthesize(request_body: Dict[str, Any]):
@@ -1760,19 +2524,21 @@ async def batch_synthesize(request_body: Dict[str, Any]):
         request_body: {
             "texts": ["text1", "text2", ...],
             "language": "pt",
-            "voice": "default"
+            "voice": "default",
+            "cache": true        # optional, output cache opt-in/out
         }
     
     Returns:
         List of WAV files
     """
     try:
-        if not tts_model or not voice_manager:
+        if not _xtts_ready() or not voice_manager:
             raise HTTPException(status_code=503, detail="TTS model or voice manager not initialized.")
         
         texts = request_body.get("texts", [])
         language = request_body.get("language", "pt")
         voice = request_body.get("voice", "default")
+        use_cache = request_body.get("cache")
         
         if not texts or len(texts) == 0:
             raise HTTPException(status_code=400, detail="No texts provided")
@@ -1786,8 +2552,7 @@ async def batch_synthesize(request_body: Dict[str, Any]):
             texts,
             language,
             voice,
-            voice_manager,
-            tts_model
+            use_cache
         )
         
         return {"results": results, "total": len(results), "successful": sum(1 for r in results if r["status"] == "success")}
@@ -1807,15 +2572,93 @@ def _do_precompute_embeddings(voice_manager, embedding_manager):
     
     for voice in voices:
         try:
-            voice_file = voice_manager.get_voice_file(voice["id"])
-            if voice_file:
-                embedding_manager.get_or_compute_embedding(voice_file, voice["id"])
+            reference = voice_manager.get_reference(voice["id"], XTTS_REFERENCE_SR)
+            if reference is not None:
+                embedding_manager.get_or_compute_latents(
+                    reference,
+                    gpt_cond_len=SYNTHESIS_CONFIG["gpt_cond_len"],
+                    gpt_cond_chunk_len=SYNTHESIS_CONFIG["gpt_cond_chunk_len"],
+                    max_ref_len=SYNTHESIS_CONFIG["max_ref_len"]
+                )
                 count += 1
         except Exception as e:
             print(f"⚠️ Failed to precompute embedding for {voice['id']}: {str(e)}")
     
     return count, len(voices)
 
+@app.get("/v1/output-cache")
+async def get_output_cache_stats():
+    """Output cache statistics (hits per tier, sizes, budgets)."""
+    return output_cache.get_statistics()
+
+@app.delete("/v1/output-cache")
+async def clear_output_cache():
+    """Remove every cached synthesis result (memory and disk)."""
+    await run_in_threadpool(output_cache.clear)
+    return {"status": "cleared"}
+
+@app.get("/v1/timings")
+async def get_timings():
+    """Recent per-stage timings and real-time factors of /v1/synthesize and /v1/clone-voice."""
+    return timing_stats.get_statistics()
+
+def _collect_metrics(metrics: ServerMetrics):
+    """Scrape-time values: text queues, executors, OBS, engines and caches."""
+    now = time.time()
+    
+    # Per-context text queues (rebuilt so cleared contexts disappear)
+    for gauge in (metrics.queue_depth, metrics.queue_age, metrics.queue_processing):
+        gauge.clear()
+    for context_id, queue in list(text_processing_queues.items()):
+        items = list(queue)
+        lock = text_processing_locks.get(context_id)
+        metrics.queue_depth.set(len(items), context_id=context_id)
+        metrics.queue_age.set(now - items[0]["timestamp"] if items else 0.0, context_id=context_id)
+        metrics.queue_processing.set(1 if lock is not None and lock.locked() else 0, context_id=context_id)
+    
+    for gauge in (metrics.executor_queued, metrics.executor_running):
+        gauge.clear()
+    for name, stats in inference_executors.get_statistics().items():
+        metrics.executor_queued.set(stats["queued"], engine=name)
+        metrics.executor_running.set(stats["running"], engine=name)
+        metrics.executor_rejected.set(stats["rejected"], engine=name)
+    
+    for mode, count in obs_hub.count_by_mode().items():
+        metrics.obs_connections.set(count, mode=mode)
+    metrics.obs_send_failures.set(obs_hub.stats["send_failures"])
+    
+    metrics.engine_loaded.clear()
+    metrics.engine_memory.clear()
+    states = engine_manager.get_states()
+    for name in engine_manager.loaded():
+        metrics.engine_loaded.set(1, engine=name)
+        metrics.engine_memory.set(states[name].get("memory_mb", 0.0) * 1024 * 1024, engine=name)
+    process_mb = measure_memory_mb("cpu")
+    if process_mb is not None:
+        metrics.process_memory.set(process_mb * 1024 * 1024)
+    
+    # Counters only: no directory scans and no lock held across cache file I/O
+    output = output_cache.counters()
+    metrics.set_cache("output", {"memory": output["memory_hits"], "disk": output["disk_hits"]}, output["misses"])
+    if embedding_manager:
+        stats = embedding_manager.counters()
+        metrics.set_cache(
+            "embedding",
+            {"memory": stats["memory_hits"], "disk": stats["disk_hits"], "shared": stats["shared"]},
+            stats["misses"]
+        )
+    if voice_manager:
+        stats = dict(voice_manager.reference_store.stats)
+        metrics.set_cache("reference", {"memory": stats["hits"]}, stats["misses"])
+
+server_metrics.add_collector(_collect_metrics)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition (latency/TTFA/RTF histograms, queues, OBS, engines, caches)."""
+    # Rendered on the event loop: the collectors read the text queues it mutates
+    return Response(content=server_metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.post("/v1/precompute-embeddings")
 async def precompute_embeddings():
     """Precompute embeddings for all voices."""
@@ -1826,8 +2669,8 @@ async def precompute_embeddings():
         if not embedding_manager:
             raise HTTPException(status_code=503, detail="Embedding manager not initialized.")
         
-        # Run embedding precomputation in thread pool to avoid blocking
-        count, total = await run_in_threadpool(
+        # Run embedding precomputation on the XTTS executor (uses the model)
+        count, total = await inference_executors.get(DEFAULT_ENGINE).run(
             _do_precompute_embeddings,
             voice_manager,
             embedding_manager
@@ -1841,6 +2684,8 @@ async def precompute_embeddings():
     
     except HTTPException:
         raise
+    except ExecutorBusy as e:
+        raise _busy_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Precomputation failed: {str(e)}")
 
@@ -1848,7 +2693,6 @@ async def precompute_embeddings():
 # TEXT PROCESSING QUEUE SYSTEM
 # ============================================================================
 
-import asyncio
 from collections import deque
 
 # Fila de processamento de texto e locks para sincronização
@@ -2106,7 +2950,7 @@ async def monitor_select_engine(engine: str = Form(DEFAULT_ENGINE)):
     O engine selecionado será usado para todas as sínteses via /v1/monitor/process-queue.
     
     Args:
-        engine: Nome do engine ("xtts-v2" ou "stylets2")
+        engine: Nome do engine ("xtts-v2", "stylets2" ou "auto")
     
     Returns:
         {
@@ -2122,7 +2966,7 @@ async def monitor_select_engine(engine: str = Form(DEFAULT_ENGINE)):
     print(f"   Requested engine: {engine}")
     
     # Validar engine
-    if engine not in ENGINES:
+    if engine not in ENGINES and engine != AUTO_ENGINE:
         print(f"   ❌ Invalid engine: {engine}")
         return {
             "success": False,
@@ -2163,14 +3007,33 @@ async def monitor_get_status():
 # ============================================================================
 
 # Gerenciar conexões WebSocket para streaming de áudio para OBS
-obs_connections: List[WebSocket] = []
+# (ver obs_stream.py para os protocolos binary e json)
+obs_hub = ObsAudioHub(encoder=encoder_pool)
 
 @app.websocket("/ws/audio")
 async def websocket_audio(websocket: WebSocket):
-    """WebSocket endpoint para streaming de áudio para OBS"""
+    """
+    WebSocket endpoint para streaming de áudio para OBS
+    
+    Query params:
+        mode: 'binary' (cabeçalho JSON + chunks PCM) ou 'json' (WAV base64, padrão)
+        format: 'wav' (padrão), 'flac', 'opus' ou 'mp3'
+        sample_rate: Taxa de saída (8000 a 48000, padrão 24000)
+    """
+    mode = websocket.query_params.get("mode", MODE_JSON)
     await websocket.accept()
-    obs_connections.append(websocket)
-    print(f"✅ OBS WebSocket conectado (total: {len(obs_connections)})")
+    try:
+        requested_rate = websocket.query_params.get("sample_rate")
+        output_format = negotiate(
+            websocket.query_params.get("format"),
+            sample_rate=int(requested_rate) if requested_rate else None
+        )
+    except (UnsupportedFormat, ValueError) as e:
+        await websocket.send_text(json.dumps({"type": "error", "detail": str(e)}))
+        await websocket.close(code=1008)
+        return
+    obs_hub.connect(websocket, mode, output_format)
+    print(f"✅ OBS WebSocket conectado (mode={mode}, format={output_format.name}, total: {len(obs_hub)})")
     
     try:
         while True:
@@ -2178,38 +3041,15 @@ async def websocket_audio(websocket: WebSocket):
             data = await websocket.receive_text()
             # Ignorar mensagens recebidas (conexão é apenas para enviar)
     except WebSocketDisconnect:
-        obs_connections.remove(websocket)
-        print(f"❌ OBS WebSocket desconectado (total: {len(obs_connections)})")
+        obs_hub.disconnect(websocket)
+        print(f"❌ OBS WebSocket desconectado (total: {len(obs_hub)})")
     except Exception as e:
         print(f"❌ Erro WebSocket: {e}")
-        if websocket in obs_connections:
-            obs_connections.remove(websocket)
+        obs_hub.disconnect(websocket)
 
-async def broadcast_audio_to_obs(audio_data: bytes):
+async def broadcast_audio_to_obs(result: AudioResult):
     """Enviar áudio para todos os clientes OBS conectados"""
-    if not obs_connections:
-        return
-    
-    import base64
-    audio_b64 = base64.b64encode(audio_data).decode('utf-8')
-    message = json.dumps({
-        "type": "audio",
-        "audio": audio_b64,
-        "timestamp": datetime.now().isoformat()
-    })
-    
-    disconnected = []
-    for connection in obs_connections:
-        try:
-            await connection.send_text(message)
-        except Exception as e:
-            print(f"❌ Erro ao enviar para OBS: {e}")
-            disconnected.append(connection)
-    
-    # Remover conexões com erro
-    for conn in disconnected:
-        if conn in obs_connections:
-            obs_connections.remove(conn)
+    await obs_hub.broadcast(result)
 
 @app.get("/obs-config")
 async def get_obs_config(request_url: Optional[str] = None):
@@ -2238,8 +3078,12 @@ async def get_obs_config(request_url: Optional[str] = None):
             "pt": "1. Copie a URL do audio_player_url\n2. No OBS, adicione uma nova Source do tipo 'Browser'\n3. Cole a URL em 'URL'\n4. Configure: Largura=1, Altura=1\n5. Marque 'Controlar áudio via OBS'",
             "en": "1. Copy the audio_player_url\n2. In OBS, add a new 'Browser' source\n3. Paste the URL in 'URL'\n4. Set: Width=1, Height=1\n5. Check 'Control audio via OBS'"
         },
-        "active_connections": len(obs_connections),
+        "active_connections": len(obs_hub),
+        "connections_by_mode": obs_hub.count_by_mode(),
+        "connections_by_format": obs_hub.count_by_format(),
+        "output_formats": available_formats(),
         "features": {
+            "binary_chunked_streaming": True,
             "real_time_streaming": True,
             "audio_only": True,
             "no_ui_required": True,
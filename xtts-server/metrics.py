@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Metrics - Prometheus text exposition for /metrics
+
+Lets an ops dashboard scrape what /v1/timings, /health and the various
+statistics endpoints only show as JSON, and alert when synthesis falls
+behind chat:
+
+- Request latency, time to first audio and real-time factor histograms per
+  endpoint and engine (recorded as requests finish)
+- Text queue depth and age of the oldest item per context_id, executor
+  queues, OBS connections and send failures, loaded engines with their
+  resident memory and cache hit ratios (read from their owners at scrape
+  time by the collectors main.py registers)
+
+Writes the text format (version 0.0.4) itself, so prometheus_client is not
+needed. Stdlib only.
+"""
+
+import math
+import threading
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRIC_PREFIX = "tts_"
+
+# Histogram upper bounds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 30.0, 60.0)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0)
+
+# ============================================================================
+# METRIC TYPES
+# ============================================================================
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Metric:
+    """A named family of samples keyed by label values (counter or gauge)."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = METRIC_PREFIX + name
+        self.help = help
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.samples: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple("" if labels[n] is None else str(labels[n]) for n in self.labels)
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.samples[self._key(labels)] = float(value)
+
+    def clear(self):
+        """Drop every sample (collectors rebuild label sets on each scrape)."""
+        with self.lock:
+            self.samples.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for key, value in sorted(self.samples.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonic total. set() mirrors a counter kept elsewhere (e.g. a stats dict)."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.samples[key] = self.samples.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Current value, usually set by a collector at scrape time."""
+
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    """Cumulative buckets plus sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        bucket_labels = self.labels + ("le",)
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, series["counts"]):
+                    labels = _label_text(bucket_labels, key + (_format_value(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _label_text(bucket_labels, key + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {series['count']}")
+                labels = _label_text(self.labels, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+                lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+# ============================================================================
+# SERVER METRICS CLASS
+# ============================================================================
+
+class ServerMetrics:
+    """Every metric the server exports, plus the collectors run on scrape."""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[["ServerMetrics"], None]] = []
+        self.collect_lock = threading.Lock()
+
+        # Recorded as requests finish
+        self.request_seconds = self._add(Histogram(
+            "request_duration_seconds", "Time from request to complete audio",
+            ("endpoint", "engine"), LATENCY_BUCKETS))
+        self.first_audio_seconds = self._add(Histogram(
+            "time_to_first_audio_seconds", "Time from request to the first audio sent",
+            ("endpoint", "engine"), LATENCY_BUCKETS))
+        self.real_time_factor = self._add(Histogram(
+            "real_time_factor", "Processing time / audio duration (> 1 is slower than playback)",
+            ("endpoint", "engine"), RTF_BUCKETS))
+        self.audio_seconds = self._add(Counter(
+            "audio_seconds_total", "Seconds of audio synthesized", ("endpoint", "engine")))
+
+        # Set by collectors at scrape time
+        self.queue_depth = self._add(Gauge(
+            "text_queue_depth", "Texts waiting in the processing queue", ("context_id",)))
+        self.queue_age = self._add(Gauge(
+            "text_queue_oldest_age_seconds", "Age of the oldest waiting text (0 when empty)", ("context_id",)))
+        self.queue_processing = self._add(Gauge(
+            "text_queue_processing", "1 while a text of the context is being synthesized", ("context_id",)))
+        self.executor_queued = self._add(Gauge(
+            "executor_queued", "Inference jobs waiting for an engine slot", ("engine",)))
+        self.executor_running = self._add(Gauge(
+            "executor_running", "Inference jobs running", ("engine",)))
+        self.executor_rejected = self._add(Counter(
+            "executor_rejected_total", "Jobs rejected with 503 because the queue was full", ("engine",)))
+        self.obs_connections = self._add(Gauge(
+            "obs_connections", "Connected OBS WebSocket clients", ("mode",)))
+        self.obs_send_failures = self._add(Counter(
+            "obs_send_failures_total", "OBS WebSocket sends that failed (client dropped)"))
+        self.engine_loaded = self._add(Gauge(
+            "engine_loaded", "1 for each engine resident in memory", ("engine",)))
+        self.engine_memory = self._add(Gauge(
+            "engine_resident_memory_bytes", "Resident memory attributed to a loaded engine", ("engine",)))
+        self.process_memory = self._add(Gauge(
+            "process_resident_memory_bytes", "Resident memory of the server process"))
+        self.cache_hits = self._add(Counter(
+            "cache_hits_total", "Cache lookups served from a cache level", ("cache", "level")))
+        self.cache_misses = self._add(Counter(
+            "cache_misses_total", "Cache lookups that had to compute", ("cache",)))
+        self.cache_hit_ratio = self._add(Gauge(
+            "cache_hit_ratio", "Hits / lookups since start (0 before the first lookup)", ("cache",)))
+
+    def _add(self, metric: Metric) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[["ServerMetrics"], None]):
+        """Register collector(metrics), called before every render()."""
+        self.collectors.append(collector)
+
+    def observe_request(self, endpoint: str, engine: Optional[str], seconds: float,
+                        audio_seconds: Optional[float], first_audio_seconds: Optional[float] = None):
+        """
+        Record a finished synthesis.
+
+        Args:
+            endpoint: e.g. "synthesize", "synthesize/stream", "clone-voice"
+            engine: Engine that served it
+            seconds: Request to complete audio
+            audio_seconds: Duration of the audio produced
+            first_audio_seconds: Request to first audio sent (defaults to seconds,
+                                 for responses delivered in one piece)
+        """
+        labels = {"endpoint": endpoint, "engine": engine or "unknown"}
+        self.request_seconds.observe(seconds, **labels)
+        self.first_audio_seconds.observe(seconds if first_audio_seconds is None else first_audio_seconds, **labels)
+        if audio_seconds:
+            self.real_time_factor.observe(seconds / audio_seconds, **labels)
+            self.audio_seconds.inc(audio_seconds, **labels)
+
+    def set_cache(self, cache: str, hits: Dict[str, int], misses: int):
+        """Mirror a cache's counters; hits is level -> count."""
+        for level, count in hits.items():
+            self.cache_hits.set(count, cache=cache, level=level)
+        self.cache_misses.set(misses, cache=cache)
+        lookups = sum(hits.values()) + misses
+        self.cache_hit_ratio.set(sum(hits.values()) / lookups if lookups else 0.0, cache=cache)
+
+    def render(self) -> str:
+        """Run the collectors and return the exposition text."""
+        with self.collect_lock:
+            for collector in self.collectors:
+                try:
+                    collector(self)
+                except Exception as e:
+                    print(f"⚠️ Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+            lines = []
+            for metric in self.metrics:
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Micro Batcher - Dynamic batching of concurrent synthesis requests
+
+Requests for the same (engine, language) that arrive within a short window
+are collected and run as one batch, then the results are handed back to
+each caller.
+
+There is no scheduler thread: the first caller for a key leads. It collects
+the batch for the window and runs it on its own thread, while the others
+wait for their results. Callers are inference executor jobs, so batches run
+on executor threads (per-thread CPU setup applied) and count against the
+engine's concurrency limit.
+
+Batch sizing:
+- GPU: up to max_batch_size items per batch
+- CPU: from the measured cost of a single item and of each extra item in a
+  batch, the largest n whose throughput (items/s) beats unbatched runs by
+  cpu_min_gain, with a predicted batch time within cpu_latency_cap_seconds.
+  XTTS generates the GPT codes item by item and only shares the vocoder
+  pass (see XTTSEngine.inference_batch), so on CPU the limit often settles
+  at 1 and requests run unbatched instead of waiting for each other. The
+  extra-item cost is re-probed with a small batch once it is older than
+  cpu_reprobe_seconds, so a limit of 1 is not permanent
+"""
+
+import time
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List, Tuple, Hashable, Optional
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+BATCH_CONFIG = {
+    "window_ms": 30,              # Collect requests arriving within this window
+    "max_batch_size": 8,          # Upper bound per batch (GPU)
+    "cpu_max_batch_size": 4,      # Upper bound per batch (CPU)
+    "cpu_min_gain": 0.2,          # CPU: batch only if items/s improves by at least this fraction
+    "cpu_latency_cap_seconds": 8.0,  # CPU: predicted batch time may not exceed this
+    "cpu_probe_batch_size": 2,    # CPU: limit while the extra-item cost is unmeasured or stale
+    "cpu_reprobe_seconds": 120,   # CPU: re-measure the extra-item cost after this long
+    "ewma_alpha": 0.3,            # Smoothing for the cost estimates
+}
+
+# run_batch(key, items) -> list of results (same order as items)
+BatchRunner = Callable[[Hashable, List[Dict[str, Any]]], List[Any]]
+
+# ============================================================================
+# MICRO BATCHER CLASS
+# ============================================================================
+
+class MicroBatcher:
+    """Collects concurrent requests per key and runs them in batches."""
+
+    def __init__(self, run_batch: BatchRunner, device: str = "cpu", config: Optional[Dict[str, Any]] = None,
+                 on_resize: Optional[Callable[[int], None]] = None):
+        """
+        Initialize batcher.
+
+        Args:
+            run_batch: Function that processes a list of items for one key
+            device: "cuda" or "cpu" (selects the batch sizing policy)
+            config: Overrides for BATCH_CONFIG
+            on_resize: Called with the new limit when max_batch_size() changes
+                       (the caller sizes its concurrency to it)
+        """
+        self.run_batch = run_batch
+        self.device = device
+        self.on_resize = on_resize
+        self.config = {**BATCH_CONFIG, **(config or {})}
+
+        self.condition = threading.Condition()
+        self.pending: Dict[Hashable, List[List[Any]]] = {}  # key -> [item, future, leads]
+        self.single_seconds: Optional[float] = None  # EWMA of a one-item batch
+        self.extra_seconds: Optional[float] = None   # EWMA of each additional item in a batch
+        self.extra_measured_at: Optional[float] = None  # monotonic time of the last multi-item batch
+        self.stats = {"batches": 0, "items": 0, "max_batch": 0, "fallbacks": 0}
+
+        self._running = False
+        self._limit = self.max_batch_size()  # Last limit reported to on_resize
+
+    def start(self):
+        """Accept requests (idempotent)."""
+        with self.condition:
+            self._running = True
+
+    def stop(self):
+        """Refuse new requests; collecting leaders run their batches right away."""
+        with self.condition:
+            self._running = False
+            self.condition.notify_all()
+
+    def max_batch_size(self) -> int:
+        """Current batch size limit for this device."""
+        if self.device == "cuda":
+            return self.config["max_batch_size"]
+        limit = self.config["cpu_max_batch_size"]
+        if self.single_seconds is None:
+            return 1  # Measure one item first
+        if self._extra_stale():
+            return max(1, min(limit, self.config["cpu_probe_batch_size"]))
+        # n items take single + (n - 1) * extra instead of n * single one by one
+        best = 1
+        for n in range(2, limit + 1):
+            predicted = self.single_seconds + (n - 1) * self.extra_seconds
+            if predicted > self.config["cpu_latency_cap_seconds"]:
+                break
+            if n * self.single_seconds >= (1 + self.config["cpu_min_gain"]) * predicted:
+                best = n
+        return best
+
+    def _extra_stale(self) -> bool:
+        """True when the extra-item cost is unmeasured or older than cpu_reprobe_seconds."""
+        if self.extra_measured_at is None:
+            return True
+        return time.monotonic() - self.extra_measured_at >= self.config["cpu_reprobe_seconds"]
+
+    def _ewma(self, previous: Optional[float], value: float) -> float:
+        alpha = self.config["ewma_alpha"]
+        return value if previous is None else alpha * value + (1 - alpha) * previous
+
+    def run(self, key: Hashable, item: Dict[str, Any]) -> Any:
+        """
+        Run an item as part of a batch and return its result (blocking).
+
+        The caller that finds no pending items for key collects the batch
+        and runs it on its own thread; later callers wait for their result.
+
+        Args:
+            key: Batch compatibility key, e.g. (engine, language)
+            item: Payload passed to run_batch
+
+        Returns:
+            This item's result (or raises its exception)
+        """
+        future: Future = Future()
+        with self.condition:
+            if not self._running:
+                raise RuntimeError("MicroBatcher not started")
+            queue = self.pending.setdefault(key, [])
+            entry = [item, future, not queue]
+            queue.append(entry)
+            self.condition.notify_all()
+
+            while not entry[2] and not future.done():
+                self.condition.wait()
+            if future.done():
+                return future.result()
+
+            # Leading: collect until the batch is full or the window closes
+            deadline = time.monotonic() + self.config["window_ms"] / 1000.0
+            while self._running and len(queue) < self.max_batch_size():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(timeout=remaining)
+            size = self.max_batch_size()
+            batch = queue[:size]
+            del queue[:size]
+            if queue:
+                queue[0][2] = True  # Overflow gets its own leader
+            else:
+                del self.pending[key]
+            self.condition.notify_all()
+
+        try:
+            self._run(key, [(item, future) for item, future, _ in batch])
+        finally:
+            with self.condition:
+                self.condition.notify_all()
+        return future.result()
+
+    def _run(self, key: Hashable, batch: List[Tuple[Dict[str, Any], Future]]):
+        """Run one batch and resolve its futures."""
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+
+        start = time.perf_counter()
+        try:
+            results = self.run_batch(key, items)
+            if len(results) != len(items):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(items)} items")
+        except Exception as batch_error:
+            # Isolate the failing item: retry one by one
+            print(f"⚠️ Batch of {len(items)} failed ({batch_error}), retrying individually")
+            with self.condition:
+                self.stats["fallbacks"] += 1
+            for item, future in zip(items, futures):
+                try:
+                    future.set_result(self.run_batch(key, [item])[0])
+                except Exception as e:
+                    future.set_exception(e)
+            return
+
+        elapsed = time.perf_counter() - start
+        with self.condition:
+            if len(items) == 1:
+                self.single_seconds = self._ewma(self.single_seconds, elapsed)
+            elif self.single_seconds is not None:
+                extra = max(0.0, elapsed - self.single_seconds) / (len(items) - 1)
+                # A stale estimate is replaced, not blended, so a re-probe takes effect at once
+                previous = None if self._extra_stale() else self.extra_seconds
+                self.extra_seconds = self._ewma(previous, extra)
+                self.extra_measured_at = time.monotonic()
+            limit = self.max_batch_size()
+            resized = limit != self._limit
+            self._limit = limit
+            self.stats["batches"] += 1
+            self.stats["items"] += len(items)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(items))
+        if resized and self.on_resize is not None:
+            self.on_resize(limit)
+        if len(items) > 1:
+            print(f"📦 Batched {len(items)} requests for {key} in {elapsed:.2f}s")
+
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get batcher statistics."""
+        with self.condition:
+            queued = sum(len(q) for q in self.pending.values())
+        return {
+            **self.stats,
+            "running": self._running,
+            "device": self.device,
+            "queued": queued,
+            "avg_batch": self.stats["items"] / self.stats["batches"] if self.stats["batches"] else 0.0,
+            "current_max_batch_size": self.max_batch_size(),
+            "single_seconds_ewma": self.single_seconds,
+            "extra_item_seconds_ewma": self.extra_seconds,
+            "window_ms": self.config["window_ms"]
+        }
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+OBS Audio Stream - Fan-out of synthesized audio to /ws/audio clients
+
+Two protocols are supported on the same endpoint:
+
+- binary (``/ws/audio?mode=binary``): a small JSON text frame announces the
+  stream, raw PCM chunks follow as binary frames, and a JSON text frame
+  closes it. Players can start playback on the first chunk.
+
+      {"type": "audio_start", "stream_id": "...", "format": "pcm_s16le",
+       "sample_rate": 24000, "channels": 1, "timestamp": "..."}
+      <binary PCM chunk> ...
+      {"type": "audio_end", "stream_id": "...", "samples": 48000}
+
+- json (default, legacy overlays): one text frame per message with the whole
+  WAV base64-encoded, ``{"type": "audio", "audio": "...", "timestamp": "..."}``.
+  The payload is built once per message, off the event loop, and only when
+  at least one legacy client is connected.
+
+Clients may also ask for another output format/sample rate
+(``/ws/audio?format=opus&sample_rate=48000``, see audio_formats.py). Binary
+clients with a non-default format receive the whole encoded file, in
+chunks, once the message is complete (``"format": "opus"`` in audio_start);
+json clients receive it base64-encoded with ``"format"`` and ``"mime"``.
+Each format is encoded once per message, in the encoder pool, and shared by
+every client that asked for it.
+"""
+
+import json
+import uuid
+import base64
+import asyncio
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from fastapi import WebSocket
+from starlette.concurrency import run_in_threadpool
+
+from audio_buffer import AudioResult
+from audio_formats import OutputFormat, EncoderPool, encode_result
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+MODE_JSON = "json"
+MODE_BINARY = "binary"
+OBS_MODES = (MODE_JSON, MODE_BINARY)
+
+OBS_STREAM_CONFIG = {
+    "chunk_samples": 4800,        # 200ms at 24kHz per binary frame
+    "send_timeout_seconds": 5.0,  # Slow clients are dropped instead of stalling others
+}
+
+# ============================================================================
+# OBS CLIENT
+# ============================================================================
+
+class ObsClient:
+    """One connected /ws/audio client, the protocol it speaks and its output format."""
+
+    def __init__(self, websocket: WebSocket, mode: str = MODE_JSON,
+                 output_format: Optional[OutputFormat] = None):
+        self.websocket = websocket
+        self.mode = mode if mode in OBS_MODES else MODE_JSON
+        self.output_format = output_format or OutputFormat()
+
+    @property
+    def streams_pcm(self) -> bool:
+        """Binary client playing raw PCM chunks as they are synthesized."""
+        return self.mode == MODE_BINARY and self.output_format == OutputFormat()
+
+# ============================================================================
+# OBS AUDIO HUB CLASS
+# ============================================================================
+
+class ObsAudioHub:
+    """Tracks OBS clients and broadcasts audio to them in their own protocol."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, encoder: Optional[EncoderPool] = None):
+        """
+        Args:
+            config: Overrides for OBS_STREAM_CONFIG
+            encoder: Pool for non-WAV encodings (None encodes in the default threadpool)
+        """
+        self.config = {**OBS_STREAM_CONFIG, **(config or {})}
+        self.encoder = encoder
+        self.clients: List[ObsClient] = []
+        self.stats = {"send_failures": 0}
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def __bool__(self) -> bool:
+        return bool(self.clients)
+
+    def connect(self, websocket: WebSocket, mode: str = MODE_JSON,
+                output_format: Optional[OutputFormat] = None) -> ObsClient:
+        """Register an accepted WebSocket."""
+        client = ObsClient(websocket, mode, output_format)
+        self.clients.append(client)
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        """Forget a WebSocket (no-op if already removed)."""
+        self.clients = [c for c in self.clients if c.websocket is not websocket]
+
+    def _clients(self, mode: str) -> List[ObsClient]:
+        return [c for c in self.clients if c.mode == mode]
+
+    def _pcm_clients(self) -> List[ObsClient]:
+        return [c for c in self.clients if c.streams_pcm]
+
+    def _by_format(self, clients: List[ObsClient]) -> Dict[OutputFormat, List[ObsClient]]:
+        groups: Dict[OutputFormat, List[ObsClient]] = {}
+        for client in clients:
+            groups.setdefault(client.output_format, []).append(client)
+        return groups
+
+    def count_by_mode(self) -> Dict[str, int]:
+        return {mode: len(self._clients(mode)) for mode in OBS_MODES}
+
+    def count_by_format(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for client in self.clients:
+            fmt = client.output_format
+            label = fmt.name if fmt.sample_rate is None else f"{fmt.name}@{fmt.sample_rate}"
+            counts[label] = counts.get(label, 0) + 1
+        return counts
+
+    async def _encode(self, result: AudioResult, output_format: OutputFormat) -> bytes:
+        """Encoded bytes for one format (memoized in the result, shared by all clients)."""
+        if self.encoder is not None:
+            return await self.encoder.encode(result, output_format)
+        return await run_in_threadpool(encode_result, result, output_format)
+
+    async def _send(self, clients: List[ObsClient], payload) -> None:
+        """Send one frame to many clients concurrently, dropping the ones that fail."""
+        if not clients:
+            return
+        timeout = self.config["send_timeout_seconds"]
+
+        async def send_one(client: ObsClient):
+            if isinstance(payload, str):
+                await asyncio.wait_for(client.websocket.send_text(payload), timeout)
+            else:
+                await asyncio.wait_for(client.websocket.send_bytes(payload), timeout)
+
+        results = await asyncio.gather(*(send_one(c) for c in clients), return_exceptions=True)
+        for client, result in zip(clients, results):
+            if isinstance(result, BaseException):
+                print(f"❌ Erro ao enviar para OBS: {result!r}")
+                self.stats["send_failures"] += 1
+                self.disconnect(client.websocket)
+
+    # ------------------------------------------------------------------------
+    # Binary streaming
+    # ------------------------------------------------------------------------
+
+    async def start_stream(self, sample_rate: int, clients: Optional[List[ObsClient]] = None,
+                           audio_format: str = "pcm_s16le", mime: Optional[str] = None) -> Optional[str]:
+        """
+        Announce a new audio stream to binary clients (PCM clients by default).
+
+        Returns:
+            stream_id, or None if no such client is connected
+        """
+        if clients is None:
+            clients = self._pcm_clients()
+        if not clients:
+            return None
+        stream_id = uuid.uuid4().hex[:12]
+        header = {
+            "type": "audio_start",
+            "stream_id": stream_id,
+            "format": audio_format,
+            "sample_rate": sample_rate,
+            "channels": 1,
+            "timestamp": datetime.now().isoformat()
+        }
+        if mime is not None:
+            header["mime"] = mime
+        await self._send(clients, json.dumps(header))
+        return stream_id
+
+    async def send_chunks(self, pcm: memoryview, chunk_bytes: Optional[int] = None,
+                          clients: Optional[List[ObsClient]] = None) -> None:
+        """Send raw int16 PCM to PCM binary clients, split into chunk_samples frames."""
+        if clients is None:
+            clients = self._pcm_clients()
+        if not clients:
+            return
+        chunk_bytes = chunk_bytes or self.config["chunk_samples"] * 2
+        for offset in range(0, len(pcm), chunk_bytes):
+            # Clients that failed on a previous chunk were disconnected
+            clients = [c for c in clients if c in self.clients]
+            await self._send(clients, bytes(pcm[offset:offset + chunk_bytes]))
+
+    async def end_stream(self, stream_id: Optional[str], num_samples: int,
+                         clients: Optional[List[ObsClient]] = None) -> None:
+        """Close a stream opened with start_stream."""
+        if stream_id is None:
+            return
+        if clients is None:
+            clients = self._pcm_clients()
+        await self._send([c for c in clients if c in self.clients], json.dumps({
+            "type": "audio_end",
+            "stream_id": stream_id,
+            "samples": num_samples
+        }))
+
+    async def send_encoded(self, result: AudioResult) -> None:
+        """Send the whole message, encoded, to binary clients with a non-PCM format."""
+        clients = [c for c in self._clients(MODE_BINARY) if not c.streams_pcm]
+        for output_format, group in self._by_format(clients).items():
+            try:
+                data = await self._encode(result, output_format)
+            except Exception as e:
+                print(f"❌ Erro ao codificar {output_format.name} para OBS: {e}")
+                continue
+            stream_id = await self.start_stream(
+                output_format.target_rate(result.sample_rate), group,
+                audio_format=output_format.name, mime=output_format.media_type
+            )
+            await self.send_chunks(memoryview(data), self.config["chunk_samples"] * 2, group)
+            await self.end_stream(stream_id, result.num_samples, group)
+
+    # ------------------------------------------------------------------------
+    # Legacy JSON
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def _legacy_message(data: bytes, output_format: OutputFormat, sample_rate: int) -> str:
+        return json.dumps({
+            "type": "audio",
+            "audio": base64.b64encode(data).decode('ascii'),
+            "format": output_format.name,
+            "mime": output_format.media_type,
+            "sample_rate": sample_rate,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    async def send_legacy(self, result: AudioResult) -> None:
+        """Send the whole message as base64 JSON (WAV unless negotiated) to json clients."""
+        for output_format, group in self._by_format(self._clients(MODE_JSON)).items():
+            try:
+                data = await self._encode(result, output_format)
+            except Exception as e:
+                print(f"❌ Erro ao codificar {output_format.name} para OBS: {e}")
+                continue
+            message = await run_in_threadpool(
+                self._legacy_message, data, output_format, output_format.target_rate(result.sample_rate)
+            )
+            await self._send(group, message)
+
+    async def send_complete(self, result: AudioResult) -> None:
+        """Deliver a finished message to every client that does not stream PCM."""
+        await self.send_encoded(result)
+        await self.send_legacy(result)
+
+    # ------------------------------------------------------------------------
+    # Whole-result broadcast
+    # ------------------------------------------------------------------------
+
+    async def broadcast(self, result: AudioResult) -> None:
+        """Broadcast a complete synthesis result to every client."""
+        if not self.clients:
+            return
+        stream_id = await self.start_stream(result.sample_rate)
+        if stream_id is not None:
+            await self.send_chunks(result.pcm_view)
+            await self.end_stream(stream_id, result.num_samples)
+        await self.send_complete(result)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self.clients),
+            "by_mode": self.count_by_mode(),
+            "by_format": self.count_by_format(),
+            **self.stats,
+            "chunk_samples": self.config["chunk_samples"]
+        }
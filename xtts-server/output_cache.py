@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Output Cache - Content-addressed cache of synthesized audio
+
+Chat alerts, bot commands and copypasta repeat constantly. A repeat with the
+same engine, voice reference, language, text and sampling parameters is
+served from this cache instead of re-running inference.
+
+Two tiers, each with its own byte budget and LRU eviction:
+- memory: AudioResult objects holding the samples and the encoded WAV
+  (a hit reuses the WAV bytes; other formats are encoded per response)
+- disk: float32 .npy files under .tts-cache/output, survive restarts
+
+The lock only guards the in-memory indexes; reading, writing and deleting
+.npy files happens outside it, so memory hits never wait behind disk I/O.
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+
+from audio_buffer import AudioResult
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+OUTPUT_CACHE_DIR = Path(__file__).parent / ".tts-cache" / "output"
+
+OUTPUT_CACHE_CONFIG = {
+    "enabled": True,                          # Default when a request does not say
+    "memory_max_bytes": 128 * 1024 * 1024,    # 128MB of AudioResults
+    "disk_max_bytes": 1024 * 1024 * 1024,     # 1GB of .npy files
+}
+
+# Sampling params are rounded so 0.7500001 and 0.75 share an entry
+PARAM_DECIMALS = 4
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# ============================================================================
+# KEY HELPERS
+# ============================================================================
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys (NFC, collapsed whitespace, stripped)."""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def make_cache_key(engine: str, voice_hash: str, language: str, text: str, **params) -> str:
+    """
+    Build a content-addressed key for a synthesis request.
+
+    Args:
+        engine: Engine name
+        voice_hash: Content hash of the voice reference (not the voice name,
+            so re-uploading a voice under the same id invalidates entries)
+        language: Language code
+        text: Input text (normalized here)
+        **params: Sampling/post-processing parameters that change the audio
+
+    Returns:
+        Hex SHA-256 key
+    """
+    payload = {
+        "engine": engine,
+        "voice": voice_hash,
+        "language": language,
+        "text": normalize_text(text),
+        "params": {
+            k: round(v, PARAM_DECIMALS) if isinstance(v, float) else v
+            for k, v in sorted(params.items())
+        }
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+# ============================================================================
+# OUTPUT CACHE CLASS
+# ============================================================================
+
+class OutputCache:
+    """Two-tier (memory + disk) LRU cache of AudioResults keyed by content."""
+
+    def __init__(self, cache_dir: Path = OUTPUT_CACHE_DIR, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize output cache.
+
+        Args:
+            cache_dir: Directory for the disk tier
+            config: Overrides for OUTPUT_CACHE_CONFIG
+        """
+        self.cache_dir = Path(cache_dir)
+        self.config = {**OUTPUT_CACHE_CONFIG, **(config or {})}
+        self.lock = threading.RLock()
+
+        self.memory: "OrderedDict[str, AudioResult]" = OrderedDict()
+        self.memory_bytes = 0
+        self.disk: "OrderedDict[str, int]" = OrderedDict()  # key -> file size, LRU order
+        self.disk_bytes = 0
+        self._writing: set = set()  # Disk entries being written by put()
+
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self.stats_lock = threading.Lock()  # Counters only, so counters() never waits on self.lock
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._scan_disk()
+
+    def _path(self, key: str, sample_rate: int) -> Path:
+        return self.cache_dir / f"{key}_{sample_rate}.npy"
+
+    def _scan_disk(self):
+        """Rebuild the disk LRU index from file mtimes."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.npy') and '.tmp' not in entry.name:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        entries.sort()
+        for _, name, size in entries:
+            self.disk[name] = size
+            self.disk_bytes += size
+        self._unlink(self._evict_disk())
+
+    @staticmethod
+    def _result_bytes(result: AudioResult) -> int:
+        # Entries are detached, so samples + WAV are all they can hold
+        return result.samples.nbytes + (len(result.wav_bytes) if result.wav_ready else 0)
+
+    def _count(self, name: str):
+        with self.stats_lock:
+            self.stats[name] += 1
+
+    def counters(self) -> Dict[str, int]:
+        """Hit/miss/store/eviction counters (cheap: does not take the cache lock)."""
+        with self.stats_lock:
+            return dict(self.stats)
+
+    def is_enabled(self, requested: Optional[bool] = None) -> bool:
+        """Resolve a per-request opt-in/opt-out against the default."""
+        return self.config["enabled"] if requested is None else bool(requested)
+
+    def get(self, key: str, sample_rate: int) -> Optional[AudioResult]:
+        """
+        Look up a result, promoting disk hits to memory.
+
+        Returns:
+            AudioResult or None on miss
+        """
+        name = f"{key}_{sample_rate}"
+        with self.lock:
+            result = self.memory.get(key)
+            if result is not None and result.sample_rate == sample_rate:
+                self.memory.move_to_end(key)
+                self._count("memory_hits")
+                return result.detached()
+            on_disk = name in self.disk
+            if not on_disk:
+                self._count("misses")
+                return None
+
+        path = self._path(key, sample_rate)
+        try:
+            samples = np.load(path)
+            os.utime(path)  # Keep LRU order across restarts
+        except (OSError, ValueError) as e:
+            # Also reached when the entry was evicted after the index check
+            with self.lock:
+                dropped = self._unindex_disk(name)
+                self._count("misses")
+            if dropped:
+                print(f"⚠️ Output cache entry unreadable, dropping: {e}")
+                self._unlink([name])
+            return None
+
+        result = AudioResult(samples, sample_rate)
+        with self.lock:
+            if name in self.disk:
+                self.disk.move_to_end(name)
+            self._put_memory(key, result)
+            self._count("disk_hits")
+        return result.detached()
+
+    def put(self, key: str, result: AudioResult):
+        """
+        Store a result in both tiers.
+
+        Memory keeps a detached copy (samples + WAV only) and hits return
+        detached copies, so encodings memoized by callers stay out of the
+        cache and out of its byte accounting.
+        """
+        result = result.detached()
+        name = f"{key}_{result.sample_rate}"
+        with self.lock:
+            self._put_memory(key, result)
+            if name in self.disk or name in self._writing:
+                return
+            self._writing.add(name)
+
+        path = self._path(key, result.sample_rate)
+        tmp_path = path.with_suffix('.tmp.npy')
+        try:
+            np.save(tmp_path, result.samples)
+            os.replace(tmp_path, path)
+            size = path.stat().st_size
+        except OSError as e:
+            print(f"⚠️ Failed to write output cache entry: {e}")
+            with self.lock:
+                self._writing.discard(name)
+            return
+
+        with self.lock:
+            self._writing.discard(name)
+            self.disk[name] = size
+            self.disk_bytes += size
+            self._count("stores")
+            evicted = self._evict_disk()
+        self._unlink(evicted)
+
+    def _put_memory(self, key: str, result: AudioResult):
+        size = self._result_bytes(result)
+        if size > self.config["memory_max_bytes"]:
+            return
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.memory_bytes -= self._result_bytes(old)
+        self.memory[key] = result
+        self.memory_bytes += size
+        while self.memory_bytes > self.config["memory_max_bytes"] and self.memory:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= self._result_bytes(evicted)
+            self._count("evictions")
+
+    def _unindex_disk(self, name: str) -> bool:
+        """Remove a disk entry from the index (lock held); True if it was indexed."""
+        if name not in self.disk:
+            return False
+        self.disk_bytes -= self.disk.pop(name)
+        return True
+
+    def _evict_disk(self) -> List[str]:
+        """Unindex LRU disk entries over budget (lock held); returns names to unlink."""
+        evicted = []
+        while self.disk_bytes > self.config["disk_max_bytes"] and self.disk:
+            name = next(iter(self.disk))
+            self._unindex_disk(name)
+            evicted.append(name)
+            self._count("evictions")
+        return evicted
+
+    def _unlink(self, names: List[str]):
+        """Delete unindexed disk entries (called without the lock)."""
+        for name in names:
+            try:
+                (self.cache_dir / f"{name}.npy").unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self.lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+            names = list(self.disk)
+            self.disk.clear()
+            self.disk_bytes = 0
+        self._unlink(names)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        stats = self.counters()
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        with self.lock:
+            return {
+                **stats,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "memory_mb": self.memory_bytes / (1024 * 1024),
+                "memory_max_mb": self.config["memory_max_bytes"] / (1024 * 1024),
+                "disk_entries": len(self.disk),
+                "disk_mb": self.disk_bytes / (1024 * 1024),
+                "disk_max_mb": self.config["disk_max_bytes"] / (1024 * 1024),
+                "enabled_by_default": self.config["enabled"]
+            }
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Reference Audio Store - Normalized voice references prepared once at ingest
+
+Every voice reference is decoded, converted to mono, resampled and peak
+normalized a single time, when the voice is registered. The result is kept
+as float32 .npy files (one per engine sample rate) that are memory-mapped on
+read, so synthesis requests never decode, resample or write audio.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Optional, Dict, Any, NamedTuple, Iterable
+from datetime import datetime
+
+import numpy as np
+
+from dsp import decode_audio, normalize_reference
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+REFERENCES_DIR = Path(__file__).parent / "voices" / "references"
+
+XTTS_REFERENCE_SR = 22050       # XTTS conditioning (get_conditioning_latents load_sr)
+STYLETTS2_REFERENCE_SR = 24000  # StyleTTS2 style encoder
+REFERENCE_SAMPLE_RATES = (XTTS_REFERENCE_SR, STYLETTS2_REFERENCE_SR)
+
+# ============================================================================
+# DATA TYPES
+# ============================================================================
+
+class ReferenceAudio(NamedTuple):
+    """Normalized reference audio for one voice at one sample rate."""
+    voice_id: str
+    samples: np.ndarray  # float32 mono, read-only memmap
+    sample_rate: int
+    content_hash: str    # SHA-256 of the source file contents
+
+# ============================================================================
+# AUDIO HELPERS
+# ============================================================================
+
+def load_normalized_audio(source, target_sr: int = XTTS_REFERENCE_SR) -> np.ndarray:
+    """Decode and normalize a reference (path or file-like) entirely in memory."""
+    samples, sr = decode_audio(source)
+    return normalize_reference(samples, sr, target_sr)
+
+# ============================================================================
+# REFERENCE AUDIO STORE CLASS
+# ============================================================================
+
+class ReferenceAudioStore:
+    """
+    Stores normalized voice references on disk and serves them memory-mapped.
+
+    Layout (per voice):
+        {voice_id}.json           manifest (content hash, source stat, rates)
+        {voice_id}_{sr}.npy       float32 mono samples at each sample rate
+    """
+
+    def __init__(self, references_dir: Path = REFERENCES_DIR,
+                 sample_rates: Iterable[int] = REFERENCE_SAMPLE_RATES):
+        """
+        Initialize reference store.
+
+        Args:
+            references_dir: Directory for manifests and .npy files
+            sample_rates: Sample rates to prepare for every voice
+        """
+        self.references_dir = Path(references_dir)
+        self.sample_rates = tuple(sample_rates)
+        self.lock = threading.RLock()
+        self._loaded: Dict[tuple, ReferenceAudio] = {}  # (voice_id, sr) -> memmap
+        self._sources: Dict[str, tuple] = {}            # voice_id -> (size, mtime_ns) of the mapped source
+        self._ingesting: Dict[str, Future] = {}         # voice_id -> ingest in progress
+        self.stats = {"hits": 0, "misses": 0}  # get(): already mapped / mapped from disk
+
+        self.references_dir.mkdir(parents=True, exist_ok=True)
+
+    def _manifest_path(self, voice_id: str) -> Path:
+        return self.references_dir / f"{voice_id}.json"
+
+    def _samples_path(self, voice_id: str, sample_rate: int) -> Path:
+        return self.references_dir / f"{voice_id}_{sample_rate}.npy"
+
+    def _read_manifest(self, voice_id: str) -> Optional[Dict[str, Any]]:
+        manifest_path = self._manifest_path(voice_id)
+        if not manifest_path.exists():
+            return None
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Failed to read reference manifest for {voice_id}: {str(e)}")
+            return None
+
+    def ingest(self, voice_id: str, wav_path: str) -> Dict[str, Any]:
+        """
+        Decode, normalize and store a voice reference at every sample rate.
+
+        Concurrent calls for the same voice share one ingest. Decoding and
+        normalization run outside the lock; the .npy files are swapped in
+        before the manifest, so a reader that sees the new content hash
+        always maps the new samples.
+
+        Args:
+            voice_id: Voice identifier
+            wav_path: Path to the source WAV file
+
+        Returns:
+            Manifest dictionary
+
+        Raises:
+            ValueError: If the audio cannot be decoded
+        """
+        with self.lock:
+            future = self._ingesting.get(voice_id)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._ingesting[voice_id] = future
+        if not owner:
+            return future.result()
+
+        try:
+            manifest = self._ingest(voice_id, wav_path)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(manifest)
+            return manifest
+        finally:
+            with self.lock:
+                self._ingesting.pop(voice_id, None)
+
+    def _ingest(self, voice_id: str, wav_path: str) -> Dict[str, Any]:
+        """Body of ingest() (one caller per voice at a time)."""
+        stat = os.stat(wav_path)
+        with open(wav_path, 'rb') as f:
+            content = f.read()
+        content_hash = hashlib.sha256(content).hexdigest()
+
+        samples, sr = decode_audio(wav_path)
+
+        # Prepare every rate off-lock as temporary files
+        prepared = []
+        for target_sr in self.sample_rates:
+            normalized = normalize_reference(samples.copy(), sr, target_sr)
+            samples_path = self._samples_path(voice_id, target_sr)
+            tmp_path = samples_path.with_suffix(".tmp.npy")
+            np.save(tmp_path, normalized)
+            prepared.append((target_sr, tmp_path, samples_path))
+
+        with self.lock:
+            for target_sr, tmp_path, samples_path in prepared:
+                os.replace(tmp_path, samples_path)
+                self._loaded.pop((voice_id, target_sr), None)
+
+            self._sources[voice_id] = (stat.st_size, stat.st_mtime_ns)
+            manifest = {
+                "voice_id": voice_id,
+                "content_hash": content_hash,
+                "source_file": str(wav_path),
+                "source_size": stat.st_size,
+                "source_mtime_ns": stat.st_mtime_ns,
+                "source_sample_rate": sr,
+                "duration_seconds": samples.shape[0] / sr,
+                "sample_rates": list(self.sample_rates),
+                "created_at": datetime.now().isoformat()
+            }
+            manifest_path = self._manifest_path(voice_id)
+            tmp_manifest = manifest_path.with_suffix(".tmp")
+            with open(tmp_manifest, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_manifest, manifest_path)
+
+        print(f"✅ Reference normalized: {voice_id} ({manifest['duration_seconds']:.1f}s, rates={list(self.sample_rates)})")
+        return manifest
+
+    def is_current(self, voice_id: str, wav_path: str) -> bool:
+        """Check whether the stored reference matches the source file on disk."""
+        manifest = self._read_manifest(voice_id)
+        if not manifest:
+            return False
+        try:
+            stat = os.stat(wav_path)
+        except OSError:
+            return False
+        if manifest.get("source_size") != stat.st_size or manifest.get("source_mtime_ns") != stat.st_mtime_ns:
+            return False
+        return all(self._samples_path(voice_id, sr).exists() for sr in self.sample_rates)
+
+    def get(self, voice_id: str, sample_rate: int = XTTS_REFERENCE_SR,
+            source_path: Optional[str] = None) -> Optional[ReferenceAudio]:
+        """
+        Get a stored reference as a read-only memory-mapped array.
+
+        Args:
+            voice_id: Voice identifier
+            sample_rate: One of the store's sample rates
+            source_path: Source WAV; when given, a reference whose source changed
+                         on disk (size/mtime) is treated as missing
+
+        Returns:
+            ReferenceAudio or None if the voice was never ingested (or is stale)
+        """
+        key = (voice_id, sample_rate)
+        source = None
+        if source_path is not None:
+            try:
+                stat = os.stat(source_path)
+                source = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                return None
+
+        with self.lock:
+            cached = self._loaded.get(key)
+            if cached is not None and (source is None or self._sources.get(voice_id) == source):
+                self.stats["hits"] += 1
+                return cached
+
+            manifest = self._read_manifest(voice_id)
+            samples_path = self._samples_path(voice_id, sample_rate)
+            if not manifest or not samples_path.exists():
+                return None
+            recorded = (manifest.get("source_size"), manifest.get("source_mtime_ns"))
+            if source is not None and recorded != source:
+                for stale in [k for k in self._loaded if k[0] == voice_id]:
+                    del self._loaded[stale]
+                return None
+
+            reference = ReferenceAudio(
+                voice_id=voice_id,
+                samples=np.load(samples_path, mmap_mode='r'),
+                sample_rate=sample_rate,
+                content_hash=manifest["content_hash"]
+            )
+            self._loaded[key] = reference
+            self._sources[voice_id] = recorded
+            self.stats["misses"] += 1
+            return reference
+
+    def delete(self, voice_id: str) -> bool:
+        """
+        Delete all stored data for a voice.
+
+        Returns:
+            True if anything was deleted
+        """
+        deleted = False
+        with self.lock:
+            for key in [k for k in self._loaded if k[0] == voice_id]:
+                del self._loaded[key]
+            self._sources.pop(voice_id, None)
+
+            paths = [self._manifest_path(voice_id)]
+            paths.extend(self._samples_path(voice_id, sr) for sr in self.sample_rates)
+            for path in paths:
+                if path.exists():
+                    try:
+                        path.unlink()
+                        deleted = True
+                    except Exception as e:
+                        print(f"⚠️ Failed to delete reference file {path.name}: {str(e)}")
+        return deleted
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get store statistics."""
+        npy_files = list(self.references_dir.glob("*.npy"))
+        return {
+            "voices": len(list(self.references_dir.glob("*.json"))),
+            "sample_rates": list(self.sample_rates),
+            "files": len(npy_files),
+            "size_mb": sum(f.stat().st_size for f in npy_files) / (1024 * 1024),
+            "mapped": len(self._loaded),
+            **self.stats
+        }
+
+# ============================================================================
+# MAIN (for testing)
+# ============================================================================
+
+if __name__ == "__main__":
+    store = ReferenceAudioStore()
+    print("📊 Reference Store Statistics:")
+    for key, value in store.get_statistics().items():
+        print(f"  {key}: {value}")
@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
 """
-Speaker Embedding Manager - Manages speaker embeddings with 3-level cache
+Speaker Embedding Manager - Manages XTTS conditioning latents with 3-level cache
+
+XTTS conditions every synthesis on a pair of tensors computed from the
+reference audio: the GPT conditioning latent and the speaker embedding.
+Computing them is the expensive part of voice cloning, so they are cached
+per voice and reused by every request that uses the same reference.
 """
 
 import os
 import pickle
+import threading
 import numpy as np
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import torch
 
 # ============================================================================
@@ -15,7 +22,39 @@ import torch
 # ============================================================================
 
 EMBEDDINGS_DIR = Path(__file__).parent / "voices" / "embeddings"
-EMBEDDING_CACHE_SIZE = 100  # Keep 100 embeddings in memory
+EMBEDDING_CACHE_SIZE = 100  # Keep 100 latent pairs in memory
+
+# Default conditioning parameters (mirrors SYNTHESIS_CONFIG in main.py)
+DEFAULT_GPT_COND_LEN = 12
+DEFAULT_GPT_COND_CHUNK_LEN = 4
+DEFAULT_MAX_REF_LEN = 10
+
+# Separator between voice id and the rest of the cache key
+KEY_SEPARATOR = "__"
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def normalize_conditioning_params(
+    gpt_cond_len: float,
+    gpt_cond_chunk_len: float,
+    max_ref_len: float
+) -> Tuple[int, int, int]:
+    """
+    Normalize conditioning parameters to the integer seconds XTTS expects.
+
+    XTTS truncates the reference to max_ref_len before computing the GPT
+    latent, so max_ref_len is raised to at least gpt_cond_len; otherwise
+    gpt_cond_len values above max_ref_len would have no effect.
+
+    Returns:
+        (gpt_cond_len, gpt_cond_chunk_len, max_ref_len)
+    """
+    cond_len = max(1, int(round(gpt_cond_len)))
+    chunk_len = max(1, min(int(round(gpt_cond_chunk_len)), cond_len))
+    ref_len = max(int(round(max_ref_len)), cond_len)
+    return cond_len, chunk_len, ref_len
 
 # ============================================================================
 # SPEAKER EMBEDDING MANAGER CLASS
@@ -23,154 +62,241 @@ EMBEDDING_CACHE_SIZE = 100  # Keep 100 embeddings in memory
 
 class SpeakerEmbeddingManager:
     """
-    Manages speaker embeddings with 3-level cache:
-    1. Memory cache (fast, limited size)
-    2. Disk cache (pickle files)
-    3. GPU computation (compute on demand)
+    Manages XTTS conditioning latents with 3-level cache:
+    1. Memory cache (fast, limited size, tensors kept on the model device)
+    2. Disk cache (pickle files with CPU numpy arrays)
+    3. Model computation (compute on demand)
+
+    Entries are keyed by voice id, reference content hash and the
+    conditioning parameters, so editing a voice or changing gpt_cond_len
+    never serves stale latents.
     """
-    
-    def __init__(self, tts_model):
+
+    def __init__(self, engine):
         """
         Initialize embedding manager.
-        
+
         Args:
-            tts_model: TTS model instance with speaker encoder
+            engine: XTTSEngine instance (provides compute_conditioning_latents_from_audio)
         """
-        self.tts_model = tts_model
+        self.engine = engine
         self.embeddings_dir = EMBEDDINGS_DIR
-        self.memory_cache: Dict[str, np.ndarray] = {}
+        self.memory_cache: Dict[str, Tuple[torch.Tensor, torch.Tensor]] = {}
         self.cache_order = []  # Track cache insertion order for LRU
-        
+        self.lock = threading.RLock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "shared": 0}
+        self._inflight: Dict[str, Future] = {}  # cache_key -> disk load/computation in progress
+
         # Ensure directory exists
         self.embeddings_dir.mkdir(parents=True, exist_ok=True)
-    
-    def _get_cache_key(self, voice_id: str) -> str:
-        """Get cache key for voice."""
-        return f"embedding_{voice_id}"
-    
-    def _get_disk_cache_path(self, voice_id: str) -> Path:
-        """Get disk cache file path for voice."""
-        return self.embeddings_dir / f"{voice_id}.pkl"
-    
-    def get_or_compute_embedding(self, speaker_wav: str, voice_id: str) -> np.ndarray:
+
+    def _get_cache_key(
+        self,
+        voice_id: str,
+        content_hash: str,
+        gpt_cond_len: int,
+        gpt_cond_chunk_len: int,
+        max_ref_len: int
+    ) -> str:
+        """Get cache key for voice + reference content + conditioning params."""
+        return (
+            f"{voice_id}{KEY_SEPARATOR}{content_hash[:16]}"
+            f"_c{gpt_cond_len}_k{gpt_cond_chunk_len}_r{max_ref_len}"
+        )
+
+    def _get_disk_cache_path(self, cache_key: str) -> Path:
+        """Get disk cache file path for a cache key."""
+        return self.embeddings_dir / f"{cache_key}.pkl"
+
+    def get_or_compute_latents(
+        self,
+        reference,
+        gpt_cond_len: float = DEFAULT_GPT_COND_LEN,
+        gpt_cond_chunk_len: float = DEFAULT_GPT_COND_CHUNK_LEN,
+        max_ref_len: float = DEFAULT_MAX_REF_LEN
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
         """
-        Get speaker embedding, using 3-level cache.
-        
+        Get conditioning latents, using 3-level cache.
+
         Level 1: Memory cache (fastest)
         Level 2: Disk cache (pickle)
-        Level 3: GPU computation (slowest)
-        
+        Level 3: Model computation (slowest)
+
+        Concurrent misses for the same key share one disk load/computation:
+        the first caller publishes a Future and the others wait on it.
+
         Args:
-            speaker_wav: Path to speaker WAV file
-            voice_id: Voice identifier for caching
-        
+            reference: ReferenceAudio (normalized samples + content hash)
+            gpt_cond_len: Seconds of reference used for the GPT latent
+            gpt_cond_chunk_len: Chunk size for the GPT latent
+            max_ref_len: Maximum seconds of reference audio
+
         Returns:
-            Speaker embedding array
+            (gpt_cond_latent, speaker_embedding) on the engine device
         """
+        params = normalize_conditioning_params(gpt_cond_len, gpt_cond_chunk_len, max_ref_len)
+        voice_id = reference.voice_id
+        cache_key = self._get_cache_key(voice_id, reference.content_hash, *params)
+
         # Level 1: Check memory cache
-        cache_key = self._get_cache_key(voice_id)
-        if cache_key in self.memory_cache:
-            print(f"💾 Embedding cache hit (memory): {voice_id}")
-            return self.memory_cache[cache_key]
-        
+        with self.lock:
+            if cache_key in self.memory_cache:
+                self._touch(cache_key)
+                self.stats["memory_hits"] += 1
+                return self.memory_cache[cache_key]
+            future = self._inflight.get(cache_key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[cache_key] = future
+            else:
+                self.stats["shared"] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            latents = self._load_or_compute(cache_key, reference, params)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(latents)
+            return latents
+        finally:
+            with self.lock:
+                self._inflight.pop(cache_key, None)
+
+    def _load_or_compute(self, cache_key: str, reference, params: Tuple[int, int, int]) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Levels 2 and 3 of get_or_compute_latents (one caller per key at a time)."""
+        voice_id = reference.voice_id
+
         # Level 2: Check disk cache
-        disk_cache_path = self._get_disk_cache_path(voice_id)
+        disk_cache_path = self._get_disk_cache_path(cache_key)
         if disk_cache_path.exists():
             try:
                 with open(disk_cache_path, 'rb') as f:
-                    embedding = pickle.load(f)
-                print(f"💾 Embedding cache hit (disk): {voice_id}")
-                # Store in memory cache
-                self._add_to_memory_cache(cache_key, embedding)
-                return embedding
+                    stored = pickle.load(f)
+                latents = self._to_device(stored["gpt_cond_latent"], stored["speaker_embedding"])
+                print(f"💾 Latent cache hit (disk): {voice_id}")
+                self._add_to_memory_cache(cache_key, latents)
+                with self.lock:
+                    self.stats["disk_hits"] += 1
+                return latents
             except Exception as e:
                 print(f"⚠️ Failed to load disk cache: {str(e)}")
-        
-        # Level 3: Compute embedding on GPU
-        print(f"🎤 Computing speaker embedding: {voice_id}")
+
+        # Level 3: Compute latents with the model
+        print(f"🎤 Computing conditioning latents: {voice_id} (gpt_cond_len={params[0]}s)")
+        with self.lock:
+            self.stats["misses"] += 1
         try:
-            embedding = self.compute_embedding(speaker_wav)
-            
+            latents = self.compute_latents(reference, *params)
+
             # Store in both memory and disk caches
-            self._add_to_memory_cache(cache_key, embedding)
-            self._save_to_disk_cache(voice_id, embedding)
-            
-            print(f"✅ Embedding computed and cached: {voice_id}")
-            return embedding
-        
+            self._add_to_memory_cache(cache_key, latents)
+            self._save_to_disk_cache(cache_key, latents)
+
+            print(f"✅ Latents computed and cached: {voice_id}")
+            return latents
+
         except Exception as e:
-            print(f"❌ Failed to compute embedding: {str(e)}")
+            print(f"❌ Failed to compute latents: {str(e)}")
             raise
-    
-    def compute_embedding(self, speaker_wav: str) -> np.ndarray:
+
+    def compute_latents(
+        self,
+        reference,
+        gpt_cond_len: int,
+        gpt_cond_chunk_len: int,
+        max_ref_len: int
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
         """
-        Compute speaker embedding from WAV file using TTS model.
-        
+        Compute conditioning latents from normalized reference audio.
+
         Args:
-            speaker_wav: Path to speaker WAV file
-        
+            reference: ReferenceAudio at the XTTS conditioning sample rate
+            gpt_cond_len: Seconds of reference used for the GPT latent
+            gpt_cond_chunk_len: Chunk size for the GPT latent
+            max_ref_len: Maximum seconds of reference audio
+
         Returns:
-            Speaker embedding as numpy array
+            (gpt_cond_latent, speaker_embedding)
         """
         try:
-            # Use TTS model's speaker encoder to compute embedding
-            # The speaker encoder is typically part of the TTS model
-            embedding = self.tts_model.speaker_encoder.compute_embedding(speaker_wav)
-            
-            # Ensure it's a numpy array
-            if isinstance(embedding, torch.Tensor):
-                embedding = embedding.cpu().numpy()
-            
-            return embedding.astype(np.float32)
-        
+            return self.engine.compute_conditioning_latents_from_audio(
+                [reference.samples],
+                sample_rate=reference.sample_rate,
+                gpt_cond_len=gpt_cond_len,
+                gpt_cond_chunk_len=gpt_cond_chunk_len,
+                max_ref_len=max_ref_len
+            )
         except Exception as e:
-            print(f"❌ Embedding computation error: {str(e)}")
+            print(f"❌ Latent computation error: {str(e)}")
             raise
-    
-    def _add_to_memory_cache(self, cache_key: str, embedding: np.ndarray):
+
+    def _to_device(self, gpt_cond_latent, speaker_embedding) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Convert stored numpy arrays back to tensors on the engine device."""
+        device = getattr(self.engine, "device", "cpu")
+        return (
+            torch.from_numpy(np.asarray(gpt_cond_latent)).to(device),
+            torch.from_numpy(np.asarray(speaker_embedding)).to(device),
+        )
+
+    def _touch(self, cache_key: str):
+        """Mark cache entry as most recently used."""
+        if cache_key in self.cache_order:
+            self.cache_order.remove(cache_key)
+        self.cache_order.append(cache_key)
+
+    def _add_to_memory_cache(self, cache_key: str, latents: Tuple[torch.Tensor, torch.Tensor]):
         """
-        Add embedding to memory cache with LRU eviction.
-        
+        Add latents to memory cache with LRU eviction.
+
         Args:
             cache_key: Cache key
-            embedding: Speaker embedding
+            latents: (gpt_cond_latent, speaker_embedding)
         """
-        # Remove if already exists (for LRU update)
-        if cache_key in self.cache_order:
-            self.cache_order.remove(cache_key)
-        
-        # Add to cache
-        self.memory_cache[cache_key] = embedding
-        self.cache_order.append(cache_key)
-        
-        # Evict oldest if cache is full
-        if len(self.memory_cache) > EMBEDDING_CACHE_SIZE:
-            oldest_key = self.cache_order.pop(0)
-            del self.memory_cache[oldest_key]
-            print(f"🗑️  Memory cache evicted: {oldest_key}")
-    
-    def _save_to_disk_cache(self, voice_id: str, embedding: np.ndarray):
+        with self.lock:
+            # Add to cache (moves key to most recently used)
+            self.memory_cache[cache_key] = latents
+            self._touch(cache_key)
+
+            # Evict oldest if cache is full
+            if len(self.memory_cache) > EMBEDDING_CACHE_SIZE:
+                oldest_key = self.cache_order.pop(0)
+                del self.memory_cache[oldest_key]
+                print(f"🗑️  Memory cache evicted: {oldest_key}")
+
+    def _save_to_disk_cache(self, cache_key: str, latents: Tuple[torch.Tensor, torch.Tensor]):
         """
-        Save embedding to disk cache.
-        
+        Save latents to disk cache.
+
         Args:
-            voice_id: Voice identifier
-            embedding: Speaker embedding
+            cache_key: Cache key
+            latents: (gpt_cond_latent, speaker_embedding)
         """
         try:
-            cache_path = self._get_disk_cache_path(voice_id)
-            with open(cache_path, 'wb') as f:
-                pickle.dump(embedding, f)
-            print(f"💾 Embedding saved to disk: {voice_id}")
+            gpt_cond_latent, speaker_embedding = latents
+            cache_path = self._get_disk_cache_path(cache_key)
+            tmp_path = cache_path.with_suffix(".tmp")
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({
+                    "gpt_cond_latent": gpt_cond_latent.detach().float().cpu().numpy(),
+                    "speaker_embedding": speaker_embedding.detach().float().cpu().numpy(),
+                }, f)
+            os.replace(tmp_path, cache_path)
+            print(f"💾 Latents saved to disk: {cache_key}")
         except Exception as e:
             print(f"⚠️ Failed to save disk cache: {str(e)}")
-    
+
     def clear_memory_cache(self):
         """Clear memory cache."""
-        self.memory_cache.clear()
-        self.cache_order.clear()
+        with self.lock:
+            self.memory_cache.clear()
+            self.cache_order.clear()
         print("🗑️  Memory cache cleared")
-    
+
     def clear_disk_cache(self):
         """Clear disk cache."""
         try:
@@ -179,20 +305,30 @@ class SpeakerEmbeddingManager:
             print("🗑️  Disk cache cleared")
         except Exception as e:
             print(f"⚠️ Failed to clear disk cache: {str(e)}")
-    
+
     def clear_all_cache(self):
         """Clear all caches."""
         self.clear_memory_cache()
         self.clear_disk_cache()
-    
-    def precompute_embeddings(self, voices: list, voice_manager):
+
+    def precompute_embeddings(
+        self,
+        voices: list,
+        voice_manager,
+        gpt_cond_len: float = DEFAULT_GPT_COND_LEN,
+        gpt_cond_chunk_len: float = DEFAULT_GPT_COND_CHUNK_LEN,
+        max_ref_len: float = DEFAULT_MAX_REF_LEN
+    ):
         """
-        Precompute embeddings for multiple voices.
-        
+        Precompute conditioning latents for multiple voices.
+
         Args:
             voices: List of voice metadata dictionaries
             voice_manager: VoiceManager instance
-        
+            gpt_cond_len: Seconds of reference used for the GPT latent
+            gpt_cond_chunk_len: Chunk size for the GPT latent
+            max_ref_len: Maximum seconds of reference audio
+
         Returns:
             Dictionary with precomputation results
         """
@@ -203,37 +339,38 @@ class SpeakerEmbeddingManager:
             "failed": 0,
             "details": []
         }
-        
+        params = normalize_conditioning_params(gpt_cond_len, gpt_cond_chunk_len, max_ref_len)
+
         for voice in voices:
             voice_id = voice.get("id")
             try:
-                # Check if already cached
-                disk_cache_path = self._get_disk_cache_path(voice_id)
-                if disk_cache_path.exists():
-                    results["cached"] += 1
+                reference = voice_manager.get_reference(voice_id)
+                if reference is None:
+                    results["failed"] += 1
                     results["details"].append({
                         "voice_id": voice_id,
-                        "status": "cached"
+                        "status": "failed",
+                        "error": "Voice file not found"
                     })
                     continue
-                
-                # Get voice file and compute embedding
-                voice_file = voice_manager.get_voice_file(voice_id)
-                if voice_file:
-                    embedding = self.get_or_compute_embedding(voice_file, voice_id)
-                    results["computed"] += 1
-                    results["details"].append({
-                        "voice_id": voice_id,
-                        "status": "computed"
-                    })
-                else:
-                    results["failed"] += 1
+
+                # Check if already cached
+                cache_key = self._get_cache_key(voice_id, reference.content_hash, *params)
+                if cache_key in self.memory_cache or self._get_disk_cache_path(cache_key).exists():
+                    results["cached"] += 1
                     results["details"].append({
                         "voice_id": voice_id,
-                        "status": "failed",
-                        "error": "Voice file not found"
+                        "status": "cached"
                     })
-            
+                    continue
+
+                self.get_or_compute_latents(reference, *params)
+                results["computed"] += 1
+                results["details"].append({
+                    "voice_id": voice_id,
+                    "status": "computed"
+                })
+
             except Exception as e:
                 results["failed"] += 1
                 results["details"].append({
@@ -241,51 +378,67 @@ class SpeakerEmbeddingManager:
                     "status": "failed",
                     "error": str(e)
                 })
-        
+
         return results
-    
+
+    def counters(self) -> Dict[str, int]:
+        """Hit/miss counters (no disk scan, unlike get_cache_statistics)."""
+        with self.lock:
+            return dict(self.stats)
+
     def get_cache_statistics(self) -> Dict[str, Any]:
         """Get cache statistics."""
         disk_cache_files = list(self.embeddings_dir.glob("*.pkl"))
         total_disk_size = sum(f.stat().st_size for f in disk_cache_files)
-        
+        stats = self.counters()
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+
         return {
+            **stats,
+            "hit_ratio": hits / lookups if lookups else 0.0,
             "memory_cache_size": len(self.memory_cache),
             "memory_cache_max": EMBEDDING_CACHE_SIZE,
             "disk_cache_files": len(disk_cache_files),
             "disk_cache_size_mb": total_disk_size / (1024 * 1024),
             "memory_embeddings": list(self.memory_cache.keys())
         }
-    
+
     def delete_embedding_cache(self, voice_id: str) -> bool:
         """
-        Delete embedding cache for a voice.
-        
+        Delete all cached latents for a voice.
+
         Args:
             voice_id: Voice identifier
-        
+
         Returns:
-            True if deleted, False otherwise
+            True if anything was deleted, False otherwise
         """
+        prefix = f"{voice_id}{KEY_SEPARATOR}"
+
         # Remove from memory cache
-        cache_key = self._get_cache_key(voice_id)
-        if cache_key in self.memory_cache:
-            del self.memory_cache[cache_key]
-            if cache_key in self.cache_order:
-                self.cache_order.remove(cache_key)
-        
-        # Remove from disk cache
-        disk_cache_path = self._get_disk_cache_path(voice_id)
-        if disk_cache_path.exists():
-            try:
-                disk_cache_path.unlink()
-                print(f"🗑️  Embedding cache deleted: {voice_id}")
-                return True
-            except Exception as e:
-                print(f"⚠️ Failed to delete embedding cache: {str(e)}")
-                return False
-        
-        return False
+        with self.lock:
+            for cache_key in [k for k in self.memory_cache if k.startswith(prefix)]:
+                del self.memory_cache[cache_key]
+                if cache_key in self.cache_order:
+                    self.cache_order.remove(cache_key)
+
+        # Remove from disk cache (including legacy "{voice_id}.pkl" files)
+        deleted = False
+        disk_files = list(self.embeddings_dir.glob(f"{prefix}*.pkl"))
+        disk_files.append(self.embeddings_dir / f"{voice_id}.pkl")
+        for disk_cache_path in disk_files:
+            if disk_cache_path.exists():
+                try:
+                    disk_cache_path.unlink()
+                    deleted = True
+                except Exception as e:
+                    print(f"⚠️ Failed to delete embedding cache: {str(e)}")
+                    return False
+
+        if deleted:
+            print(f"🗑️  Embedding cache deleted: {voice_id}")
+        return deleted
 
 # ============================================================================
 # MAIN (for testing)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Stage Timing - Per-request breakdown of where synthesis time goes
+
+Each /v1/synthesize and /v1/clone-voice request carries a StageTimer. The
+endpoint times what runs on the event loop (OBS broadcast, encoding); the
+executor thread activates the timer, so deeper code (voice lookup,
+reference normalization, conditioning, engine inference and the vocoder
+forward hook) records into it with the module-level stage() without the
+timer being passed through every call. Inference worker processes time
+their part of a job the same way and send the stages back with the audio.
+
+Stages are exclusive: a stage nested in another (vocoder inside gpt) is
+subtracted from its parent, so the stages add up to the request time.
+
+The breakdown is returned in the Server-Timing header and recorded with
+the audio duration as a real-time factor in TimingStats (/v1/timings).
+
+Stdlib only; torch modules are instrumented through their forward hooks.
+"""
+
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Deque, Dict, Any, List, Optional
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+# Stage name -> Server-Timing description (in pipeline order)
+STAGES = {
+    "queue": "Executor queue wait",
+    "voice": "Voice lookup",
+    "reference": "Reference normalization",
+    "cache": "Output cache lookup",
+    "conditioning": "Conditioning latents",
+    "gpt": "GPT generation",
+    "model": "Engine inference",
+    "batch": "Micro-batched inference",
+    "vocoder": "Vocoder",
+    "pool": "Worker pool round trip",
+    "post": "Post-processing",
+    "encode": "Encoding",
+    "obs": "OBS broadcast",
+}
+
+TIMING_STATS_CONFIG = {
+    "history": 500,   # Recent requests kept for averages/percentiles
+}
+
+# ============================================================================
+# STAGE TIMER CLASS
+# ============================================================================
+
+class StageTimer:
+    """Exclusive time per stage for one request."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.lock = threading.Lock()
+        self.stages: Dict[str, float] = {}   # name -> seconds
+        self._open: Dict[str, float] = {}    # begin()/end() pairs
+        self._local = threading.local()      # Per-thread stack of open stages
+
+    def add(self, name: str, seconds: float):
+        with self.lock:
+            self.stages[name] = self.stages.get(name, 0.0) + max(0.0, seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block; time spent in nested stages is not counted twice."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [0.0]  # Seconds spent in nested stages
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            self.add(name, elapsed - frame[0])
+
+    def begin(self, name: str):
+        """Start a stage that ends in another thread (e.g. the executor queue)."""
+        with self.lock:
+            self._open[name] = time.perf_counter()
+
+    def end(self, name: str):
+        """End a stage started with begin() (no-op if it was not started)."""
+        with self.lock:
+            start = self._open.pop(name, None)
+        if start is not None:
+            self.add(name, time.perf_counter() - start)
+
+    def merge(self, timings: Optional[Dict[str, float]], within: Optional[str] = None):
+        """
+        Add stages measured elsewhere (worker process).
+
+        Args:
+            timings: name -> seconds
+            within: Stage that enclosed them here; their total is subtracted from it
+        """
+        if not timings:
+            return
+        for name, seconds in timings.items():
+            self.add(name, seconds)
+        if within is not None:
+            with self.lock:
+                if within in self.stages:
+                    self.stages[within] = max(0.0, self.stages[within] - sum(timings.values()))
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def as_dict(self) -> Dict[str, float]:
+        """name -> seconds, in pipeline order (STAGES), unknown stages last."""
+        order = list(STAGES)
+        with self.lock:
+            items = sorted(
+                self.stages.items(),
+                key=lambda item: order.index(item[0]) if item[0] in STAGES else len(order)
+            )
+        return dict(items)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (milliseconds, plus the total)."""
+        parts = [
+            f'{name};dur={seconds * 1000:.1f};desc="{STAGES.get(name, name)}"'
+            for name, seconds in self.as_dict().items()
+        ]
+        parts.append(f'total;dur={self.elapsed * 1000:.1f}')
+        return ", ".join(parts)
+
+    def summary(self, audio_seconds: Optional[float] = None) -> Dict[str, Any]:
+        total = self.elapsed
+        return {
+            "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in self.as_dict().items()},
+            "total_ms": round(total * 1000, 1),
+            "audio_seconds": round(audio_seconds, 3) if audio_seconds is not None else None,
+            "rtf": round(total / audio_seconds, 3) if audio_seconds else None
+        }
+
+# ============================================================================
+# ACTIVE TIMER (per thread)
+# ============================================================================
+
+_active = threading.local()
+
+
+@contextmanager
+def activate(timer: Optional[StageTimer]):
+    """Make timer the target of stage() in this thread (None disables timing)."""
+    previous = getattr(_active, "timer", None)
+    _active.timer = timer
+    _active.hook_stages = []
+    try:
+        yield timer
+    finally:
+        _active.timer = previous
+        _active.hook_stages = []
+
+
+def current() -> Optional[StageTimer]:
+    return getattr(_active, "timer", None)
+
+
+def stage(name: str):
+    """Time a block into the active timer, if any."""
+    timer = current()
+    return timer.stage(name) if timer is not None else nullcontext()
+
+
+def end(name: str):
+    """End a begin()-started stage on the active timer, if any."""
+    timer = current()
+    if timer is not None:
+        timer.end(name)
+
+
+def merge(timings: Optional[Dict[str, float]], within: Optional[str] = None):
+    """StageTimer.merge on the active timer, if any."""
+    timer = current()
+    if timer is not None:
+        timer.merge(timings, within)
+
+
+def instrument_module(module, name: str, synchronize: Optional[Callable[[], None]] = None) -> List[Any]:
+    """
+    Time every forward of a torch module as a nested stage of the active timer.
+
+    Args:
+        module: torch.nn.Module (e.g. the HiFi-GAN decoder)
+        name: Stage name
+        synchronize: Called before closing the stage when a timer is active
+                     (torch.cuda.synchronize, so async kernels are counted)
+
+    Returns:
+        Hook handles
+    """
+    def before(_module, _inputs):
+        timer = current()
+        if timer is None:
+            return
+        context = timer.stage(name)
+        context.__enter__()
+        _active.hook_stages.append(context)
+
+    def after(_module, _inputs, _output):
+        contexts = getattr(_active, "hook_stages", None)
+        if not contexts:
+            return
+        if synchronize is not None:
+            synchronize()
+        contexts.pop().__exit__(None, None, None)
+
+    return [module.register_forward_pre_hook(before), module.register_forward_hook(after)]
+
+# ============================================================================
+# TIMING STATS CLASS
+# ============================================================================
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class TimingStats:
+    """Recent per-request stage breakdowns and real-time factors."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            config: Overrides for TIMING_STATS_CONFIG
+        """
+        self.config = {**TIMING_STATS_CONFIG, **(config or {})}
+        self.lock = threading.Lock()
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=self.config["history"])
+
+    def record(self, endpoint: str, engine: Optional[str], timer: StageTimer,
+               audio_seconds: Optional[float]) -> Dict[str, Any]:
+        """Store a finished request; returns its summary."""
+        entry = {
+            "endpoint": endpoint,
+            "engine": engine,
+            "timestamp": time.time(),
+            **timer.summary(audio_seconds)
+        }
+        with self.lock:
+            self.history.append(entry)
+        return entry
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Per endpoint: request count, mean/p95 per stage and RTF, last request."""
+        with self.lock:
+            history = list(self.history)
+        by_endpoint: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in history:
+            by_endpoint.setdefault(entry["endpoint"], []).append(entry)
+
+        result = {}
+        for endpoint, entries in by_endpoint.items():
+            stage_values: Dict[str, List[float]] = {}
+            for entry in entries:
+                for name, ms in entry["stages_ms"].items():
+                    stage_values.setdefault(name, []).append(ms)
+            rtfs = [entry["rtf"] for entry in entries if entry["rtf"] is not None]
+            totals = [entry["total_ms"] for entry in entries]
+            result[endpoint] = {
+                "requests": len(entries),
+                "stages_ms": {
+                    name: {
+                        "mean": round(sum(values) / len(entries), 1),
+                        "p95": _percentile(values, 0.95)
+                    }
+                    for name, values in stage_values.items()
+                },
+                "total_ms": {"mean": round(sum(totals) / len(totals), 1), "p95": _percentile(totals, 0.95)},
+                "rtf": {
+                    "mean": round(sum(rtfs) / len(rtfs), 3) if rtfs else None,
+                    "p95": _percentile(rtfs, 0.95)
+                },
+                "last": entries[-1]
+            }
+        return {"window": self.config["history"], "endpoints": result}
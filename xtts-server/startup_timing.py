@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Startup Timing - Where boot time goes
+
+main.py records each boot stage here: light imports at module level, the
+startup event (which no longer waits for models) and the background model
+load, which also runs the heavy imports (torch, engines). The report is printed once models are ready and served under
+"startup" in /health and /v1/info.
+
+Stdlib only, so it can be imported before torch and measure it.
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# ============================================================================
+# STARTUP TIMELINE CLASS
+# ============================================================================
+
+class StartupTimeline:
+    """Ordered stage durations, measured from module import of main.py."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.lock = threading.Lock()
+        self.stages: List[Dict[str, Any]] = []
+        self.marks: Dict[str, float] = {}  # milestone -> seconds since t0
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block: `with timeline.stage("import torch"): import torch`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.stages.append({
+                    "stage": name,
+                    "seconds": round(time.perf_counter() - start, 3),
+                    "thread": threading.current_thread().name
+                })
+
+    def mark(self, milestone: str):
+        """Record a milestone (e.g. "accepting_connections", "models_ready")."""
+        with self.lock:
+            self.marks[milestone] = round(time.perf_counter() - self.t0, 3)
+
+    def _process_start_offset(self) -> Optional[float]:
+        """Seconds between process creation and t0 (interpreter + site imports)."""
+        if psutil is None:
+            return None
+        try:
+            created = psutil.Process(os.getpid()).create_time()
+        except Exception:
+            return None
+        return round(max(0.0, time.time() - (time.perf_counter() - self.t0) - created), 3)
+
+    def get_report(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "before_main_seconds": self._process_start_offset(),
+                "stages": list(self.stages),
+                "milestones": dict(self.marks)
+            }
+
+    def print_report(self):
+        report = self.get_report()
+        print("\n⏱️  Startup timing:")
+        if report["before_main_seconds"] is not None:
+            print(f"   {'interpreter start → main.py':<36} {report['before_main_seconds']:>7.2f}s")
+        for stage in report["stages"]:
+            print(f"   {stage['stage']:<36} {stage['seconds']:>7.2f}s")
+        for milestone, seconds in report["milestones"].items():
+            print(f"   ➜ {milestone:<34} at {seconds:>5.2f}s")
+        print()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Text Segmenter - Splits chat messages into sentence-sized synthesis units
+
+Used by the streaming endpoint: each segment is synthesized and sent as
+soon as it is ready, so playback starts after the first sentence instead
+of after the whole message.
+"""
+
+import re
+from typing import List
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+# XTTS v2 warns above ~250 chars per sentence (pt limit is 203)
+MAX_SEGMENT_CHARS = 200
+
+# Keep the first segment short so time-to-first-audio stays low
+FIRST_SEGMENT_CHARS = 100
+
+# Segments shorter than this are merged with the next one (avoids choppy audio)
+MIN_SEGMENT_CHARS = 12
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?…;:])\s+|\n+')
+CLAUSE_END_RE = re.compile(r'(?<=[,;:])\s+')
+
+# ============================================================================
+# SEGMENTATION
+# ============================================================================
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """Split a sentence longer than max_chars at clause boundaries, then words."""
+    if len(sentence) <= max_chars:
+        return [sentence]
+
+    parts: List[str] = []
+    current = ""
+    for clause in CLAUSE_END_RE.split(sentence):
+        for word in clause.split(" "):
+            candidate = f"{current} {word}".strip()
+            if len(candidate) > max_chars and current:
+                parts.append(current)
+                current = word
+            else:
+                current = candidate
+        # Prefer to break after a clause once we are past half the budget
+        if len(current) >= max_chars // 2:
+            parts.append(current)
+            current = ""
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_sentences(
+    text: str,
+    max_chars: int = MAX_SEGMENT_CHARS,
+    first_max_chars: int = FIRST_SEGMENT_CHARS,
+    min_chars: int = MIN_SEGMENT_CHARS
+) -> List[str]:
+    """
+    Split text into sentence segments suitable for incremental synthesis.
+
+    Args:
+        text: Input text
+        max_chars: Maximum characters per segment
+        first_max_chars: Maximum characters for the first segment
+        min_chars: Segments shorter than this are merged forward
+
+    Returns:
+        List of non-empty segments, in order
+    """
+    sentences = [s.strip() for s in SENTENCE_END_RE.split(text.strip()) if s and s.strip()]
+
+    # Merge very short sentences ("Oi!", "Ok.") into the following one
+    merged: List[str] = []
+    carry = ""
+    for sentence in sentences:
+        sentence = f"{carry} {sentence}".strip() if carry else sentence
+        if len(sentence) < min_chars:
+            carry = sentence
+            continue
+        merged.append(sentence)
+        carry = ""
+    if carry:
+        if merged and len(merged[-1]) + len(carry) + 1 <= max_chars:
+            merged[-1] = f"{merged[-1]} {carry}"
+        else:
+            merged.append(carry)
+
+    segments: List[str] = []
+    for sentence in merged:
+        limit = first_max_chars if not segments else max_chars
+        pieces = _split_long(sentence, limit)
+        if not segments and len(pieces) > 1:
+            # Only the very first piece uses the shorter budget
+            segments.append(pieces[0])
+            segments.extend(_split_long(" ".join(pieces[1:]), max_chars))
+        else:
+            segments.extend(pieces)
+
+    return segments
+
+
+# ============================================================================
+# MAIN (for testing)
+# ============================================================================
+
+if __name__ == "__main__":
+    sample = "Oi! Bem-vindo à live. Hoje vamos testar a síntese em streaming, frase por frase, para reduzir a latência."
+    for i, segment in enumerate(split_sentences(sample)):
+        print(f"{i}: {segment}")
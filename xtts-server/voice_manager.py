@@ -10,6 +10,10 @@ from pathlib import Path
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import uuid
+import threading
+
+from reference_store import ReferenceAudioStore, ReferenceAudio, XTTS_REFERENCE_SR
+from stage_timing import stage
 
 # ============================================================================
 # CONSTANTS
@@ -19,9 +23,11 @@ VOICES_DIR = Path(__file__).parent / "voices"
 CUSTOM_VOICES_DIR = VOICES_DIR / "custom"
 PRESET_VOICES_DIR = VOICES_DIR / "presets"
 EMBEDDINGS_DIR = VOICES_DIR / "embeddings"
+USAGE_FILE = VOICES_DIR / "usage.json"
 
 MAX_VOICE_SIZE = 50 * 1024 * 1024  # 50MB
 MAX_CUSTOM_VOICES = 100
+USAGE_SAVE_EVERY = 25  # Persist usage counts every N synthesis requests
 
 # ============================================================================
 # VOICE MANAGER CLASS
@@ -40,9 +46,17 @@ class VoiceManager:
         # Create directories
         self._ensure_directories()
         
+        # Normalized references (prepared once at ingest, memory-mapped on read)
+        self.reference_store = ReferenceAudioStore()
+        
         # Load voices
         self.voices = {}
         self._load_voices()
+        
+        # Synthesis counts per voice (startup warm-up primes the most used)
+        self.usage_lock = threading.Lock()
+        self.usage = self._load_usage()
+        self._unsaved_uses = 0
     
     def _ensure_directories(self):
         """Create necessary directory structure."""
@@ -136,6 +150,51 @@ class VoiceManager:
         with open(metadata_file, 'w', encoding='utf-8') as f:
             json.dump(custom_voices, f, indent=2, ensure_ascii=False)
     
+    def _load_usage(self) -> Dict[str, int]:
+        """Load persisted synthesis counts."""
+        if not USAGE_FILE.exists():
+            return {}
+        try:
+            with open(USAGE_FILE, 'r', encoding='utf-8') as f:
+                return {k: int(v) for k, v in json.load(f).items()}
+        except Exception as e:
+            print(f"⚠️ Failed to load voice usage: {str(e)}")
+            return {}
+    
+    def save_usage(self):
+        """Persist synthesis counts."""
+        with self.usage_lock:
+            usage = dict(self.usage)
+            self._unsaved_uses = 0
+        try:
+            with open(USAGE_FILE, 'w', encoding='utf-8') as f:
+                json.dump(usage, f, indent=2)
+        except Exception as e:
+            print(f"⚠️ Failed to save voice usage: {str(e)}")
+    
+    def record_use(self, voice_id: str):
+        """Count one synthesis with a voice (saved every USAGE_SAVE_EVERY uses)."""
+        with self.usage_lock:
+            self.usage[voice_id] = self.usage.get(voice_id, 0) + 1
+            self._unsaved_uses += 1
+            save = self._unsaved_uses >= USAGE_SAVE_EVERY
+        if save:
+            self.save_usage()
+    
+    def most_used(self, limit: int) -> List[str]:
+        """
+        Most used existing voices, most used first.
+        
+        Falls back to "default" (or the first voice) when nothing was
+        recorded yet.
+        """
+        with self.usage_lock:
+            ranked = sorted(self.usage.items(), key=lambda item: item[1], reverse=True)
+        voices = [voice_id for voice_id, _ in ranked if voice_id in self.voices][:limit]
+        if not voices and self.voices and limit > 0:
+            voices = ["default" if "default" in self.voices else next(iter(self.voices))]
+        return voices
+    
     def get_voice_file(self, voice_id: str) -> Optional[str]:
         """
         Get the file path for a voice.
@@ -163,6 +222,38 @@ class VoiceManager:
         
         return None
     
+    def get_reference(self, voice_id: str, sample_rate: int = XTTS_REFERENCE_SR) -> Optional[ReferenceAudio]:
+        """
+        Get the normalized reference audio for a voice.
+        
+        Voices registered before the reference store existed (or whose WAV
+        changed on disk) are ingested on first use; afterwards this is a
+        stat of the WAV plus a memory-mapped read with no decoding or
+        resampling. A replaced WAV gets a new content hash, so the latent and
+        output caches never serve the old voice.
+        
+        Args:
+            voice_id: Voice identifier
+            sample_rate: Target sample rate of the engine
+        
+        Returns:
+            ReferenceAudio or None if the voice has no audio file
+        """
+        voice_file = self.get_voice_file(voice_id)
+        if not voice_file:
+            # Source removed: keep serving what was ingested, if anything
+            return self.reference_store.get(voice_id, sample_rate)
+        
+        reference = self.reference_store.get(voice_id, sample_rate, voice_file)
+        if reference is not None:
+            return reference
+        
+        if not self.reference_store.is_current(voice_id, voice_file):
+            with stage("reference"):
+                self.reference_store.ingest(voice_id, voice_file)
+        
+        return self.reference_store.get(voice_id, sample_rate, voice_file)
+    
     def get_voice_metadata(self, voice_id: str) -> Optional[Dict[str, Any]]:
         """
         Get voice metadata.
@@ -226,6 +317,13 @@ class VoiceManager:
         dest_file = self.custom_dir / f"{voice_id}.wav"
         shutil.copy2(wav_file, dest_file)
         
+        # Normalize once for every engine sample rate
+        try:
+            self.reference_store.ingest(voice_id, str(dest_file))
+        except Exception:
+            dest_file.unlink()
+            raise
+        
         # Create metadata
         voice_info = {
             "id": voice_id,
@@ -270,13 +368,20 @@ class VoiceManager:
         if preset_file.exists():
             preset_file.unlink()
         
-        # Delete embedding cache if exists
+        # Delete normalized references
+        self.reference_store.delete(voice_id)
+        
+        # Delete cached conditioning latents (all conditioning variants + legacy file)
+        for embedding_file in self.embeddings_dir.glob(f"{voice_id}__*.pkl"):
+            embedding_file.unlink()
         embedding_file = self.embeddings_dir / f"{voice_id}.pkl"
         if embedding_file.exists():
             embedding_file.unlink()
         
         # Remove from metadata
         del self.voices[voice_id]
+        with self.usage_lock:
+            self.usage.pop(voice_id, None)
         
         # Save appropriate metadata file based on voice type
         if is_preset:
@@ -307,6 +412,11 @@ class VoiceManager:
         
         self.voices[voice_id] = voice_info
         self._save_preset_metadata()
+        
+        # Normalize the preset reference once, if its WAV is present
+        preset_file = self.preset_dir / f"{voice_id}.wav"
+        if preset_file.exists():
+            self.reference_store.ingest(voice_id, str(preset_file))
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get voice statistics."""
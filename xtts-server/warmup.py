@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Warmup - Startup warm-up pass before the server reports ready
+
+The first request after startup used to pay for every lazy initialization
+at once: kernel selection and allocator growth in torch, the language
+frontends of the tokenizer and the conditioning of the reference voice.
+The warm-up runs that work right after startup, in the background:
+
+1. Conditioning latents for the most used voices (from VoiceManager usage)
+2. One short dummy phrase per configured language, with the first voice
+
+While it runs /health reports status "warming". Failures are logged and do
+not block readiness; a step that fails is reported in get_status().
+
+Environment variables (read by main.py):
+    WARMUP_ENABLED      "0" disables the warm-up
+    WARMUP_LANGUAGES    comma-separated languages, e.g. "pt,en"
+    WARMUP_VOICES       number of most used voices to prime
+"""
+
+import time
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+WARMUP_CONFIG = {
+    "enabled": True,
+    "languages": ["pt"],          # Languages synthesized once at startup
+    "voices": 3,                  # Most used voices whose latents are primed
+}
+
+# Short phrases: long enough to exercise GPT + vocoder, short enough to be cheap
+WARMUP_PHRASES = {
+    "pt": "Olá, tudo bem?",
+    "en": "Hello, how are you?",
+    "es": "Hola, ¿qué tal?",
+    "fr": "Bonjour, comment ça va ?",
+    "de": "Hallo, wie geht es dir?",
+    "it": "Ciao, come stai?",
+    "pl": "Cześć, jak się masz?",
+    "tr": "Merhaba, nasılsın?",
+    "ru": "Привет, как дела?",
+    "nl": "Hallo, hoe gaat het?",
+    "cs": "Ahoj, jak se máš?",
+    "ar": "مرحبا، كيف حالك؟",
+    "zh-cn": "你好，最近怎么样？",
+    "ja": "こんにちは、お元気ですか？",
+    "hu": "Szia, hogy vagy?",
+    "ko": "안녕하세요, 잘 지내세요?",
+}
+
+# ============================================================================
+# WARMUP RUNNER CLASS
+# ============================================================================
+
+class WarmupRunner:
+    """Runs the startup warm-up in a background thread and tracks its state."""
+
+    def __init__(self,
+                 voices_for: Callable[[int], List[str]],
+                 prime_voice: Callable[[str], None],
+                 synthesize: Callable[[str, str, str], None],
+                 config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize runner.
+
+        Args:
+            voices_for: Returns up to N voice ids to prime (most used first)
+            prime_voice: Computes/caches conditioning latents for a voice
+            synthesize: Synthesizes (text, language, voice) and discards the audio
+            config: Overrides for WARMUP_CONFIG
+        """
+        self.voices_for = voices_for
+        self.prime_voice = prime_voice
+        self.synthesize = synthesize
+        self.config = {**WARMUP_CONFIG, **(config or {})}
+
+        self.lock = threading.Lock()
+        self.state = "pending" if self.config["enabled"] else "disabled"
+        self.steps: List[Dict[str, Any]] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def warming(self) -> bool:
+        with self.lock:
+            return self.state in ("pending", "warming")
+
+    def start(self):
+        """Start the warm-up thread (no-op when disabled or already started)."""
+        with self.lock:
+            if self.state != "pending":
+                return
+            self.state = "warming"
+            self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def _step(self, name: str, fn: Callable, *args):
+        start = time.perf_counter()
+        step = {"step": name}
+        try:
+            fn(*args)
+            step["ok"] = True
+        except Exception as e:
+            print(f"⚠️ Warm-up step '{name}' failed: {e}")
+            step["ok"] = False
+            step["error"] = str(e)
+        step["seconds"] = round(time.perf_counter() - start, 3)
+        with self.lock:
+            self.steps.append(step)
+        return step["ok"]
+
+    def _run(self):
+        print("🔥 Warming up...")
+        try:
+            voices = self.voices_for(self.config["voices"])
+            for voice in voices:
+                self._step(f"latents:{voice}", self.prime_voice, voice)
+
+            if voices:
+                for language in self.config["languages"]:
+                    phrase = WARMUP_PHRASES.get(language, WARMUP_PHRASES["en"])
+                    self._step(f"synthesis:{language}", self.synthesize, phrase, language, voices[0])
+            else:
+                print("⚠️ Warm-up: no voices available, skipping synthesis")
+        finally:
+            with self.lock:
+                self.finished_at = time.perf_counter()
+                failed = sum(1 for step in self.steps if not step["ok"])
+                self.state = "ready"
+            print(f"🔥 Warm-up finished in {self.finished_at - self.started_at:.1f}s "
+                  f"({len(self.steps)} steps, {failed} failed)")
+
+    def get_status(self) -> Dict[str, Any]:
+        """State, per-step timings and total duration for /health."""
+        with self.lock:
+            seconds = None
+            if self.started_at is not None:
+                end = self.finished_at if self.finished_at is not None else time.perf_counter()
+                seconds = round(end - self.started_at, 2)
+            return {
+                "state": self.state,
+                "seconds": seconds,
+                "languages": self.config["languages"],
+                "steps": list(self.steps)
+            }